@@ -0,0 +1,311 @@
+"""Span hooks around the task lifecycle, and a file exporter for trace viewers.
+
+Instrumented code opens spans with `span(name, **attributes)` or the `traced` decorator.
+Spans are only built while at least one hook is registered with `add_span_hook`; otherwise
+`span` returns a shared no-op context manager and `traced` calls the function directly,
+so the overhead is one list check.
+
+Example:
+    with TraceFileExporter("trace.json"):
+        my_func.run(data=inputs)
+    # Open trace.json in chrome://tracing or https://ui.perfetto.dev
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_FORMAT_CHROME = "chrome"
+TRACE_FORMAT_OTLP = "otlp"
+TRACE_FORMATS = (TRACE_FORMAT_CHROME, TRACE_FORMAT_OTLP)
+
+SpanHook = Callable[["Span"], None]
+
+_span_hooks: List[SpanHook] = []
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("starfish_current_span", default=None)
+
+
+@dataclass
+class Span:
+    """A timed operation, passed to the span hooks once it ended.
+
+    Attributes:
+        name (str): Operation name, e.g. `TaskRunner.run_task`
+        trace_id (int): 128-bit ID shared by a root span and its descendants
+        span_id (int): 64-bit ID of the span
+        parent_id (int): ID of the enclosing span, None for a root span
+        start_ns (int): Start time, in nanoseconds since the epoch
+        end_ns (int): End time, in nanoseconds since the epoch
+        lane (str): Asyncio task, or thread outside of a task, the span ran in
+        attributes (dict): Attributes given when the span was opened
+        error (str): Type and message of the exception that ended the span, if any
+    """
+
+    name: str
+    trace_id: int
+    span_id: int
+    parent_id: Optional[int]
+    start_ns: int
+    lane: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    end_ns: int = 0
+    error: Optional[str] = None
+
+    @property
+    def duration_ns(self) -> int:
+        """Return the duration of the span in nanoseconds."""
+        return self.end_ns - self.start_ns
+
+
+class _NoopSpan:
+    """Context manager returned by `span` while no hook is registered."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        """Do nothing; exceptions propagate."""
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _ActiveSpan:
+    """Context manager recording one span and handing it to the hooks on exit."""
+
+    __slots__ = ("_span", "_token")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self._span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else random.getrandbits(128),
+            span_id=random.getrandbits(64),
+            parent_id=parent.span_id if parent else None,
+            start_ns=0,
+            lane=_current_lane(),
+            attributes=attributes,
+        )
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self._span)
+        self._span.start_ns = time.time_ns()
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._span.end_ns = time.time_ns()
+        if exc_type is not None:
+            self._span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        for hook in list(_span_hooks):
+            hook(self._span)
+        return False
+
+
+def _current_lane() -> str:
+    """Return the name of the running asyncio task, or of the thread outside of a task."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task.get_name() if task is not None else threading.current_thread().name
+
+
+def add_span_hook(hook: SpanHook) -> None:
+    """Register a callable receiving every span once it ended."""
+    if hook not in _span_hooks:
+        _span_hooks.append(hook)
+
+
+def remove_span_hook(hook: SpanHook) -> None:
+    """Unregister a span hook, if registered."""
+    if hook in _span_hooks:
+        _span_hooks.remove(hook)
+
+
+def is_tracing() -> bool:
+    """Return True if at least one span hook is registered."""
+    return bool(_span_hooks)
+
+
+def span(name: str, **attributes: Any):
+    """Return a context manager timing the enclosed block as a span named `name`.
+
+    Args:
+        name: Operation name
+        **attributes: Attributes recorded on the span
+
+    Returns:
+        A context manager yielding the Span, or None while no hook is registered
+    """
+    if not _span_hooks:
+        return _NOOP_SPAN
+    return _ActiveSpan(name, attributes)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorate a function, sync or async, so each call is a span (named after its qualified name by default)."""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _span_hooks:
+                    return await func(*args, **kwargs)
+                with _ActiveSpan(span_name, {}):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _span_hooks:
+                return func(*args, **kwargs)
+            with _ActiveSpan(span_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_methods(cls: type) -> type:
+    """Class decorator tracing every public method defined on the class, as `ClassName.method`."""
+    for attr_name, attr in list(vars(cls).items()):
+        if not attr_name.startswith("_") and inspect.isfunction(attr):
+            setattr(cls, attr_name, traced(f"{cls.__name__}.{attr_name}")(attr))
+    return cls
+
+
+class TraceFileExporter:
+    """Span hook collecting the spans of a run and writing them to a local JSON file.
+
+    Two formats are supported:
+
+    - chrome: Chrome trace-event JSON, for chrome://tracing or Perfetto. Each asyncio task
+      gets its own row, so waits on shared resources show up as gaps between rows.
+    - otlp: OTLP/JSON `resourceSpans`, for OpenTelemetry collectors and viewers.
+
+    The file is written on `close()`, which also unregisters the hook. It can be used as a
+    context manager, which registers it on entry and closes it on exit.
+
+    Attributes:
+        path (str): File the trace is written to
+        format (str): chrome or otlp
+        spans (List[Span]): Spans collected so far
+    """
+
+    def __init__(self, path: str, format: str = TRACE_FORMAT_CHROME):
+        """Initialize the exporter.
+
+        Args:
+            path: File the trace is written to
+            format: chrome or otlp (default: chrome)
+
+        Raises:
+            ValueError: If the format is unknown
+        """
+        if format not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace format '{format}', expected one of {', '.join(TRACE_FORMATS)}")
+        self.path = path
+        self.format = format
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        """Collect a span (the hook interface)."""
+        with self._lock:
+            self.spans.append(span)
+
+    def __enter__(self) -> "TraceFileExporter":
+        """Register the exporter as a span hook."""
+        add_span_hook(self)
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        """Write the trace file, whether the block raised or not."""
+        self.close()
+        return False
+
+    def close(self) -> None:
+        """Unregister the hook and write the collected spans to the file."""
+        remove_span_hook(self)
+        with self._lock:
+            spans = list(self.spans)
+        payload = self._to_chrome(spans) if self.format == TRACE_FORMAT_CHROME else self._to_otlp(spans)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(payload, f)
+
+    @staticmethod
+    def _to_chrome(spans: List[Span]) -> Dict[str, Any]:
+        pid = os.getpid()
+        lanes: Dict[str, int] = {}
+        events = []
+        for s in spans:
+            tid = lanes.setdefault(s.lane, len(lanes) + 1)
+            args = {key: _json_value(value) for key, value in s.attributes.items()}
+            if s.error:
+                args["error"] = s.error
+            events.append(
+                {
+                    "name": s.name,
+                    "cat": "starfish",
+                    "ph": "X",
+                    "ts": s.start_ns / 1000,
+                    "dur": s.duration_ns / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+        events.extend({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": lane}} for lane, tid in lanes.items())
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    @staticmethod
+    def _to_otlp(spans: List[Span]) -> Dict[str, Any]:
+        otlp_spans = []
+        for s in spans:
+            attributes = dict(s.attributes, lane=s.lane)
+            otlp_span = {
+                "traceId": f"{s.trace_id:032x}",
+                "spanId": f"{s.span_id:016x}",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": key, "value": {"stringValue": str(value)}} for key, value in attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            }
+            if s.parent_id is not None:
+                otlp_span["parentSpanId"] = f"{s.parent_id:016x}"
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "starfish"}}]},
+                    "scopeSpans": [{"scope": {"name": "starfish"}, "spans": otlp_spans}],
+                }
+            ]
+        }
+
+
+def _json_value(value: Any) -> Any:
+    """Return the value if JSON can hold it as is, its string otherwise."""
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
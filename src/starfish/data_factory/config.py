@@ -2,5 +2,29 @@ PROGRESS_LOG_INTERVAL = 3
 TASK_RUNNER_TIMEOUT = 60
 
 MAX_CONCURRENT_TASKS = 10
+AUTO_CONCURRENCY_FLOOR = 1
+AUTO_CONCURRENCY_CEILING = 100
 
 NOT_COMPLETED_THRESHOLD = 3
+
+STREAM_BUFFER_SIZE = 100
+
+OUTPUT_BUFFER_SIZE = 100_000
+
+# Lease queue shared by the workers of a master job, in seconds
+LEASE_TIMEOUT = 300
+LEASE_POLL_INTERVAL = 1
+
+# Hedged re-execution of straggler tasks
+HEDGE_MAX_IN_FLIGHT = 5
+HEDGE_MIN_SAMPLES = 20
+HEDGE_CHECK_INTERVAL = 0.5
+
+# Seconds between two rewrites of the live metrics file
+METRICS_EXPORT_INTERVAL = 5
+
+# Size of the result cache shared across master jobs, in MB
+RESULT_CACHE_MAX_SIZE_MB = 1024
+
+# Seconds between two checkpoints of a running job
+CHECKPOINT_INTERVAL = 60
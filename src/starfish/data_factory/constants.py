@@ -21,11 +21,21 @@ RUN_MODE = "run_mode"
 RUN_MODE_NORMAL = "normal"
 RUN_MODE_RE_RUN = "resume_from_checkpoint"
 RUN_MODE_DRY_RUN = "dry_run"
+RUN_MODE_WORKER = "worker"
 
 STORAGE_TYPE_LOCAL = "local"
 STORAGE_TYPE_IN_MEMORY = "in_memory"
 
 IDX = "idx_index"
+# Optional input key holding a scheduling priority hint (higher first), not passed to the function
+PRIORITY = "priority_hint"
+
+SCHEDULE_RETRIES_FIRST = "retries_first"
+SCHEDULE_FRESH_FIRST = "fresh_first"
+SCHEDULE_INTERLEAVED = "interleaved"
+
+EXECUTOR_ASYNC = "async"
+EXECUTOR_PROCESS = "process"
 
 
 # Define the function directly in constants to avoid circular imports
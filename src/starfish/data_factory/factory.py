@@ -1,11 +1,23 @@
-from typing import Any, Callable, Dict, List, Optional, cast
+from typing import Any, Callable, Dict, List, Optional, Union, cast
 from starfish.common.logger import get_logger
-from starfish.data_factory.config import NOT_COMPLETED_THRESHOLD, TASK_RUNNER_TIMEOUT
-from starfish.data_factory.constants import STORAGE_TYPE_LOCAL
+from starfish.data_factory.config import (
+    AUTO_CONCURRENCY_CEILING,
+    AUTO_CONCURRENCY_FLOOR,
+    CHECKPOINT_INTERVAL,
+    HEDGE_MAX_IN_FLIGHT,
+    LEASE_TIMEOUT,
+    NOT_COMPLETED_THRESHOLD,
+    OUTPUT_BUFFER_SIZE,
+    TASK_RUNNER_TIMEOUT,
+)
+from starfish.data_factory.constants import EXECUTOR_ASYNC, SCHEDULE_RETRIES_FIRST, STORAGE_TYPE_LOCAL
 from starfish.data_factory.factory_ import Factory
 from starfish.data_factory.factory_wrapper import FactoryWrapper, DataFactoryProtocol, P, T
 from starfish.data_factory.factory_executor_manager import FactoryExecutorManager
+from starfish.data_factory.utils.circuit_breaker import CircuitBreakerPolicy
 from starfish.data_factory.utils.data_class import FactoryMasterConfig
+from starfish.data_factory.utils.result_cache import ResultCachePolicy
+from starfish.data_factory.utils.retry import RetryPolicy
 from starfish.data_factory.utils.state import MutableSharedState
 
 logger = get_logger(__name__)
@@ -16,27 +28,91 @@ def data_factory(
     batch_size: int = 1,
     target_count: int = 0,
     dead_queue_threshold: int = 3,
-    max_concurrency: int = 10,
+    max_concurrency: Union[int, str] = 10,
+    concurrency_floor: int = AUTO_CONCURRENCY_FLOOR,
+    concurrency_ceiling: int = AUTO_CONCURRENCY_CEILING,
     initial_state_values: Optional[Dict[str, Any]] = None,
     on_record_complete: Optional[List[Callable]] = None,
     on_record_error: Optional[List[Callable]] = None,
     show_progress: bool = True,
     task_runner_timeout: int = TASK_RUNNER_TIMEOUT,
     job_run_stop_threshold: int = NOT_COMPLETED_THRESHOLD,
+    output_buffer_size: int = OUTPUT_BUFFER_SIZE,
+    zero_copy: bool = False,
+    retry_policy: Optional[RetryPolicy] = None,
+    schedule_policy: str = SCHEDULE_RETRIES_FIRST,
+    executor: str = EXECUTOR_ASYNC,
+    workers: Optional[int] = None,
+    lease_queue: bool = False,
+    lease_timeout: float = LEASE_TIMEOUT,
+    worker_id: Optional[str] = None,
+    hedge_percentile: Optional[float] = None,
+    hedge_max_in_flight: int = HEDGE_MAX_IN_FLIGHT,
+    metrics_port: Optional[int] = None,
+    metrics_file: Optional[str] = None,
+    circuit_breaker: Optional[CircuitBreakerPolicy] = None,
+    max_cost: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    result_cache: Optional[ResultCachePolicy] = None,
+    checkpoint_interval: Optional[float] = CHECKPOINT_INTERVAL,
+    checkpoint_every: Optional[int] = None,
 ) -> Callable[[Callable[P, T]], DataFactoryProtocol[P, T]]:
     """Decorator for creating data processing pipelines.
 
     Args:
         storage: Storage backend to use ('local' or 'in_memory')
-        batch_size: Number of records to process in each batch
+        batch_size: Number of inputs passed to one call of the function (1 calls it per input; above 1 every
+            parameter is a list of values and the function returns a list with one output per input)
         target_count: Target number of records to generate (0 means process all input)
-        max_concurrency: Maximum number of concurrent tasks
+        max_concurrency: Maximum number of concurrent tasks, or "auto" to adapt the limit to the provider:
+            it grows while tasks succeed with stable latency and is cut on timeouts, rate limits or error spikes
+        concurrency_floor: Lowest limit in "auto" mode
+        concurrency_ceiling: Highest limit in "auto" mode
         initial_state_values: Initial values for shared state
         on_record_complete: Callbacks to execute after successful record processing
         on_record_error: Callbacks to execute after failed record processing
         show_progress: Whether to display progress bar
         task_runner_timeout: Timeout in seconds for task execution
         job_run_stop_threshold: Threshold for stopping job if too many records fail
+        output_buffer_size: Number of task results kept in memory before the rest spills to disk (0 never spills)
+        zero_copy: Pass read-only views of the input (mapping proxies, tuples) to the function instead of deep
+            copies. The function must not modify its input.
+        retry_policy: Backoff and error classification for failed tasks (default: RetryPolicy()). Timeouts,
+            rate limits and 5xx errors are retried with exponential backoff and jitter, honoring Retry-After;
+            validation and authentication errors go straight to the dead queue.
+        schedule_policy: Order between fresh inputs and retries: "retries_first" (default), "fresh_first" or
+            "interleaved". Inputs with a higher "priority_hint" value are dispatched first within each group.
+        executor: "async" runs the function on the job's event loop; "process" runs it in worker processes, each
+            with its own event loop and share of max_concurrency, for CPU-heavy functions. The function, its
+            inputs and outputs must be picklable. A worker that exits is replaced, and the rate limits set before
+            the run are divided between the workers.
+        workers: Number of worker processes with executor="process" (default: CPU count)
+        lease_queue: Store the inputs of a run as work items in the local storage, so that other processes or
+            hosts sharing it join the job with `run_worker(master_job_id)`. Every worker claims items with a
+            lease, and items whose lease expires are claimed again, so every input runs at least once.
+        lease_timeout: Seconds a claimed work item stays invisible to the other workers; held leases are renewed
+            while their tasks run
+        worker_id: Identifier of this worker in storage (default: hostname:pid)
+        hedge_percentile: Opt-in hedging of stragglers: a task still running after this percentile of the observed
+            latency (e.g. 95) gets a duplicate attempt, the first result wins and the other attempt is cancelled.
+            Hedging starts once enough tasks have succeeded. None disables it.
+        hedge_max_in_flight: Maximum number of duplicate attempts running at the same time, on top of max_concurrency
+        metrics_port: Serve live job metrics (counters, in-flight, throughput, latency quantiles, concurrency) in the
+            Prometheus text format on http://127.0.0.1:<port>/metrics while the job runs. None disables it.
+        metrics_file: Rewrite a JSON snapshot of the same metrics to this file every few seconds. None disables it.
+        circuit_breaker: Pause dispatch when one error category (auth, quota, timeout, ...) fails most tasks within
+            a window, then probe with one task after a cool-down; stop the job, to be resumed, after repeated trips.
+            None disables it (default). See CircuitBreakerPolicy.
+        max_cost: Budget of the LLM calls made through StructuredLLM / call_chat_model, in USD. No task is dispatched
+            once the spend plus the expected spend of the running tasks would exceed it, and the job stops. None for no limit.
+        max_tokens: Same budget in tokens. None for no limit.
+        result_cache: Cache the output of every completed input in storage, keyed by the code of the function (or
+            ResultCachePolicy.version) and the input, and serve it without calling the function when the same input
+            is run again, in any master job. None disables it (default). See ResultCachePolicy.
+        checkpoint_interval: Seconds between two checkpoints of the shared state, counters and dead queue, saved next
+            to the master job with local storage so resume_from_checkpoint can pick up a job whose process was killed.
+            Defaults to 60; None checkpoints only by record count (and when the job ends).
+        checkpoint_every: Also checkpoint after every this many final task results. None (default) checkpoints by time only.
 
     Returns:
         Decorated function with additional execution methods
@@ -53,11 +129,32 @@ def data_factory(
         target_count=target_count,
         dead_queue_threshold=dead_queue_threshold,
         max_concurrency=max_concurrency,
+        concurrency_floor=concurrency_floor,
+        concurrency_ceiling=concurrency_ceiling,
         show_progress=show_progress,
         task_runner_timeout=task_runner_timeout,
         on_record_complete=on_record_complete,
         on_record_error=on_record_error,
         job_run_stop_threshold=job_run_stop_threshold,
+        output_buffer_size=output_buffer_size,
+        zero_copy=zero_copy,
+        retry_policy=retry_policy,
+        schedule_policy=schedule_policy,
+        executor=executor,
+        workers=workers,
+        lease_queue=lease_queue,
+        lease_timeout=lease_timeout,
+        worker_id=worker_id,
+        hedge_percentile=hedge_percentile,
+        hedge_max_in_flight=hedge_max_in_flight,
+        metrics_port=metrics_port,
+        metrics_file=metrics_file,
+        circuit_breaker=circuit_breaker,
+        max_cost=max_cost,
+        max_tokens=max_tokens,
+        result_cache=result_cache,
+        checkpoint_interval=checkpoint_interval,
+        checkpoint_every=checkpoint_every,
     )
 
     # Initialize factory instance
@@ -96,7 +193,8 @@ def resume_from_checkpoint(*args, **kwargs) -> List[dict[str, Any]]:
     Args:
         master_job_id : resume for this master job
         storage: Storage backend to use ('local' or 'in_memory')
-        batch_size: Number of records to process in each batch
+        batch_size: Number of inputs passed to one call of the function (1 calls it per input; above 1 every
+            parameter is a list of values and the function returns a list with one output per input)
         target_count: Target number of records to generate (0 means process all input)
         max_concurrency: Maximum number of concurrent tasks
         initial_state_values: Initial values for shared state
@@ -1,10 +1,11 @@
 import asyncio
 from copy import deepcopy
 import datetime
+import inspect
 import uuid
 from inspect import Parameter, signature
 from asyncio import Queue, QueueFull
-from typing import Any, Callable, Dict, List
+from typing import Any, AsyncIterator, Callable, Dict, List
 
 import cloudpickle
 from starfish.data_factory.utils.errors import InputError, OutputError
@@ -14,16 +15,19 @@ from starfish.common.logger import get_logger
 from starfish.data_factory.config import PROGRESS_LOG_INTERVAL
 from starfish.data_factory.constants import (
     IDX,
+    PRIORITY,
     LOCAL_STORAGE_URI,
     RECORD_STATUS,
     RUN_MODE_DRY_RUN,
     RUN_MODE_NORMAL,
     RUN_MODE_RE_RUN,
+    RUN_MODE_WORKER,
     STATUS_COMPLETED,
     STATUS_DUPLICATE,
     STATUS_FAILED,
     STATUS_FILTERED,
     STORAGE_TYPE_LOCAL,
+    EXECUTOR_PROCESS,
 )
 from starfish.data_factory.job_manager import JobManager
 from starfish.data_factory.job_manager_dry_run import JobManagerDryRun
@@ -32,6 +36,8 @@ from starfish.data_factory.storage.in_memory.in_memory_storage import InMemorySt
 from starfish.data_factory.storage.local.local_storage import LocalStorage
 from starfish.data_factory.storage.models import GenerationMasterJob, Project
 from starfish.data_factory.utils.data_class import FactoryMasterConfig, TelemetryData
+from starfish.data_factory.utils.input_source import create_input_feeder, is_lazy_input
+from starfish.data_factory.utils.lease_queue import check_lease_queue_support
 from starfish.telemetry.posthog_client import Event, analytics
 from copy import deepcopy
 
@@ -52,6 +58,7 @@ class Factory:
         config (FactoryMasterConfig): Configuration for the data generation job
         func (Callable): The data processing function to be executed
         input_data_queue (Queue): Queue holding input data to be processed
+        input_feeder (InputFeeder): Feeder pulling lazy input data into the queue while the job runs, if any
         factory_storage: Storage backend instance
         config_ref: Reference to the stored configuration
         err: Error object if any occurred during processing
@@ -65,8 +72,8 @@ class Factory:
         Args:
             master_job_config (FactoryMasterConfig): Configuration object containing:
                 - storage: Storage backend to use ('local' or 'in_memory')
-                - batch_size: Number of records to process in each batch
-                - max_concurrency: Maximum number of concurrent tasks
+                - batch_size: Inputs per call of the function; above 1 its parameters are lists and it returns one output per input
+                - max_concurrency: Maximum number of concurrent tasks, or "auto" for an adaptive limit
                 - target_count: Target number of records to generate (0 means process all input)
                 - show_progress: Whether to display progress bar
                 - task_runner_timeout: Timeout in seconds for task execution
@@ -87,8 +94,11 @@ class Factory:
         self.job_manager = None
         self.same_session = False
         self.original_input_data = []
+        self.input_feeder = None
         self.result_idx = []
         self._output_cache = {}
+        # (function, its cloudpickle bytes), shared by the request config and the worker processes
+        self._func_pickle = None
 
     def _clean_up_in_same_session(self):
         # same session, reset err and factory_storage
@@ -97,6 +107,9 @@ class Factory:
         if self.same_session:
             self.err = None
             self.factory_storage = None
+            if self.job_manager:
+                # Release the spill files of the previous run
+                self.job_manager.job_output.close()
             # self.config_ref = None
             self.job_manager = None
             self.result_idx = []
@@ -115,6 +128,42 @@ class Factory:
         finally:
             return await self._finalize_and_cleanup_job()
 
+    async def stream(
+        self, *args, stream_filter: List[str] = None, stream_ordered: bool = False, stream_buffer_size: int = 0, **kwargs
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Execute the data processing pipeline and yield records while the job runs.
+
+        Args:
+            *args: Positional arguments to pass to the data processing function
+            stream_filter: Statuses whose records are yielded. None yields every status.
+            stream_ordered: Yield records by ascending input index
+            stream_buffer_size: Maximum number of records buffered ahead of the consumer (0 means unbounded)
+            **kwargs: Keyword arguments to pass to the data processing function
+
+        Yields:
+            dict[str, Any]: Records as soon as their task completes (error dicts for failed tasks)
+        """
+        job_task = None
+        try:
+            await self._initialize_job(*args, **kwargs)
+            await self._setup_job_execution()
+            result_stream = self.job_manager.attach_result_stream(maxsize=stream_buffer_size, status_filter=stream_filter, ordered=stream_ordered)
+            self._log_job_start()
+            job_task = asyncio.create_task(self.job_manager.arun_orchestration())
+            # End the stream once the job is over, successful or not, so the loop below terminates
+            job_task.add_done_callback(lambda task: task.cancelled() or asyncio.ensure_future(result_stream.close()))
+            async for record in result_stream:
+                yield record
+            await job_task
+        except (InputError, OutputError, KeyboardInterrupt, Exception) as e:
+            self.err = e
+        finally:
+            if job_task and not job_task.done():
+                # The consumer stopped iterating before the job finished
+                job_task.cancel()
+                await asyncio.gather(job_task, return_exceptions=True)
+            await self._finalize_and_cleanup_job()
+
     async def _initialize_job(self, *args, **kwargs) -> None:
         """Initialize job configuration and manager based on run mode."""
 
@@ -122,48 +171,100 @@ class Factory:
         job_manager_mapping = {
             RUN_MODE_RE_RUN: {
                 "manager": JobManagerRerun,
-                "setup": lambda: (),  # No additional setup needed for re-run
+                "setup": [],  # No additional setup needed for re-run
             },
             RUN_MODE_DRY_RUN: {
                 "manager": JobManagerDryRun,
-                "setup": lambda: (
-                    self._clean_up_in_same_session(),
-                    self._set_input_data(*args, **kwargs),
-                    self._check_parameter_match(),
-                    asyncio.create_task(self._storage_setup()),
-                ),
+                "setup": [
+                    self._clean_up_in_same_session,
+                    lambda: self._set_input_data(*args, **kwargs),
+                    self._prime_input_feeder,
+                    self._check_parameter_match,
+                    self._storage_setup,
+                ],
             },
             RUN_MODE_NORMAL: {
                 "manager": JobManager,
-                "setup": lambda: (
-                    self._clean_up_in_same_session(),
-                    self._set_input_data(*args, **kwargs),
-                    self._check_parameter_match(),
-                    asyncio.create_task(self._storage_setup()),
-                    self._generate_ids_and_update_target_count(),
-                ),
+                "setup": [
+                    self._clean_up_in_same_session,
+                    lambda: self._set_input_data(*args, **kwargs),
+                    self._prime_input_feeder,
+                    self._check_parameter_match,
+                    self._storage_setup,
+                    self._generate_ids_and_update_target_count,
+                ],
+            },
+            RUN_MODE_WORKER: {
+                "manager": JobManager,
+                "setup": [
+                    self._clean_up_in_same_session,
+                    self._storage_setup,
+                    self._join_master_job,
+                ],
             },
         }
 
         # Get the appropriate configuration
         config = job_manager_mapping.get(self.config.run_mode, job_manager_mapping[RUN_MODE_NORMAL])
 
-        # Execute setup steps
-        if config["setup"]:
-            setup_results = config["setup"]()
-            # Await any async tasks in the setup results
-            for result in setup_results:
-                if asyncio.isfuture(result) or isinstance(result, asyncio.Task):
-                    await result
+        # Execute setup steps in order, awaiting the async ones
+        for step in config["setup"]:
+            result = step()
+            if inspect.isawaitable(result):
+                await result
 
         # Initialize the job manager
         self.job_manager = config["manager"](
-            master_job_config=self.config, state=self.state, storage=self.factory_storage, user_func=self.func, input_data_queue=self.input_data_queue
+            master_job_config=self.config,
+            state=self.state,
+            storage=self.factory_storage,
+            user_func=self.func,
+            input_data_queue=self.input_data_queue,
+            input_feeder=self.input_feeder,
+            func_pickle=self._pickle_func() if self.config.executor == EXECUTOR_PROCESS else None,
         )
 
+    def _pickle_func(self) -> bytes:
+        """Return the function pickled with cloudpickle, pickling it only once while it is not replaced."""
+        if self._func_pickle is None or self._func_pickle[0] is not self.func:
+            self._func_pickle = (self.func, cloudpickle.dumps(self.func))
+        return self._func_pickle[1]
+
     def _set_input_data(self, *args, **kwargs) -> None:
-        """Helper method to set input data and original input data."""
-        self.input_data_queue, self.original_input_data = _default_input_converter(*args, **kwargs)
+        """Helper method to set input data and original input data.
+
+        Lazy inputs (generators, async generators, file sources or any non-list iterable)
+        are not materialized: a feeder pulls them into the input queue while the job runs.
+        """
+        data = args[0] if args else kwargs.get("data")
+        if is_lazy_input(data):
+            self.input_feeder = create_input_feeder(data, **{key: value for key, value in kwargs.items() if key != "data"})
+            self.input_data_queue, self.original_input_data = Queue(), []
+        else:
+            self.input_feeder = None
+            self.input_data_queue, records = _default_input_converter(*args, **kwargs)
+            # The saved copy must not follow later changes of the caller's data, unless zero-copy is requested
+            self.original_input_data = records if self.config.zero_copy else deepcopy(records)
+
+    async def _prime_input_feeder(self) -> None:
+        """Read the first record of a lazy input ahead of the job, for parameter validation."""
+        if self.input_feeder and await self.input_feeder.prime() is None:
+            raise InputError("Input source is empty")
+
+    async def _join_master_job(self) -> None:
+        """Prepare a worker joining the lease queue of an existing master job.
+
+        Raises:
+            InputError: If the storage has no lease queue or the master job does not exist
+        """
+        check_lease_queue_support(self.factory_storage)
+        if await self.factory_storage.get_master_job(self.config.master_job_id) is None:
+            raise InputError(f"Master job {self.config.master_job_id} not found in storage")
+        self.input_feeder = None
+        self.input_data_queue, self.original_input_data = Queue(), []
+        self.config.lease_queue = True
+        # A worker runs until the lease queue is drained
+        self.config.target_count = 0
 
     def _generate_ids_and_update_target_count(self) -> None:
         """Helper method to generate project and master job IDs."""
@@ -180,6 +281,8 @@ class Factory:
         if self.config.run_mode == RUN_MODE_NORMAL:
             await self._save_project()
             await self._log_master_job_start()
+            # Saved now, so a job whose process is killed can be resumed from its checkpoints
+            await self._save_request_config()
         await self.job_manager.setup_input_output_queue()
 
     async def _finalize_job(self) -> List[dict[str, Any]]:
@@ -187,7 +290,8 @@ class Factory:
         result = None
         if self.job_manager:
             result = self._process_output()
-            if len(result) == 0:
+            # An input or output error that stopped the job explains the missing records better
+            if len(result) == 0 and self.config.run_mode != RUN_MODE_WORKER and not isinstance(self.err, (InputError, OutputError)):
                 self.err = OutputError("No records generated")
 
             await self._complete_master_job()
@@ -230,6 +334,7 @@ class Factory:
                 "target_count": self.config.target_count,
                 "dead_queue_threshold": self.config.dead_queue_threshold,
                 "max_concurrency": self.config.max_concurrency,
+                "concurrency_limit": self.config.max_concurrency,
                 "task_runner_timeout": self.config.task_runner_timeout,
                 "job_run_stop_threshold": self.config.job_run_stop_threshold,
             },
@@ -245,6 +350,21 @@ class Factory:
                 "duplicate": self.job_manager.duplicate_count,
             }
             telemetry_data.execution_time = self.job_manager.execution_time
+            telemetry_data.latency_summary = self.job_manager.metrics.summary()
+            if hasattr(self.job_manager, "semaphore"):
+                # Final limit of the run, which differs from max_concurrency in "auto" mode
+                telemetry_data.config["concurrency_limit"] = self.job_manager.semaphore.limit
+            if self.job_manager.hedger is not None:
+                telemetry_data.config["hedge_percentile"] = self.job_manager.hedger.percentile
+                telemetry_data.count_summary["hedged"] = self.job_manager.hedger.hedged_count
+                telemetry_data.count_summary["hedge_wins"] = self.job_manager.hedger.hedge_win_count
+            telemetry_data.count_summary["llm_calls"] = self.job_manager.budget.usage.calls
+            telemetry_data.count_summary["total_tokens"] = self.job_manager.budget.usage.total_tokens
+            telemetry_data.count_summary["cost"] = self.job_manager.budget.usage.cost
+            if self.job_manager.result_cache is not None:
+                telemetry_data.count_summary["cache_hits"] = self.job_manager.result_cache.hit_count
+            if self.job_manager.circuit_breaker is not None:
+                telemetry_data.count_summary["circuit_breaker_trips"] = self.job_manager.circuit_breaker.trip_count
             telemetry_data.error_summary = {
                 "total_errors": self.job_manager.failed_count,
                 "error_types": self.job_manager.err_type_counter,
@@ -272,28 +392,18 @@ class Factory:
             else:
                 return result
 
-        # init the output_cache
-        self._output_cache = {
-            STATUS_COMPLETED: {"result": [], IDX: []},
-            STATUS_DUPLICATE: {"result": [], IDX: []},
-            STATUS_FAILED: {"result": [], IDX: []},
-            STATUS_FILTERED: {"result": [], IDX: []},
-        }
-        # Process records and populate cache
-        # Directly iterate through the underlying deque for performance
-        # 1,No Concurrency: no other coroutines or threads are modifying the queue (e.g., adding or removing items).
-        # 2. No Further Use of the Queue: The queue will not be used again after this step, so it doesn't matter if the items remain in the queue.
-        # 3,No Size Limits: The queue does not have a maxsize limit that could be violated by leaving items in the queue.
-        for record in self.job_manager.job_output._queue:
-            record_idx = record.get(IDX)
-            status = record.get(RECORD_STATUS)
-            record_output = record.get("output", []) if status != STATUS_FAILED else record.get("err", [])
-
-            # Update cache
-            self._output_cache[status][IDX].extend([record_idx] * len(record_output))
-            self._output_cache[status]["result"].extend(record_output)
-
-        result = self._output_cache[status_filter].get(IDX, []) if is_idx else self._output_cache[status_filter].get("result", [])
+        # Only the requested status is cached, so at most one extra copy of the output is held.
+        # The job output buffer is read lazily, spilled segments included.
+        status_cache = {"result": [], IDX: []}
+        for record in self.job_manager.job_output:
+            if record.get(RECORD_STATUS) != status_filter:
+                continue
+            record_output = record.get("output", []) if status_filter != STATUS_FAILED else record.get("err", [])
+            status_cache[IDX].extend([record.get(IDX)] * len(record_output))
+            status_cache["result"].extend(record_output)
+        self._output_cache = {status_filter: status_cache}
+
+        result = status_cache[IDX] if is_idx else status_cache["result"]
         return result
 
     def _check_process_out(self, status_filter: str):
@@ -317,7 +427,7 @@ class Factory:
         func_sig = signature(self.func)
 
         # Validate batch items against function parameters
-        batch_item = self.original_input_data[0]
+        batch_item = self.input_feeder.first_record if self.input_feeder else self.original_input_data[0]
         for param_name, param in func_sig.parameters.items():
             # Skip if parameter has a default value
             if param.default is not Parameter.empty:
@@ -327,7 +437,7 @@ class Factory:
                 raise InputError(f"Batch item is missing required parameter '{param_name}' " f"for function {self.func.__name__}")
         # Check 2: Ensure all batch parameters exist in function signature
         for batch_param in batch_item.keys():
-            if batch_param != IDX and batch_param not in func_sig.parameters:
+            if batch_param not in (IDX, PRIORITY) and batch_param not in func_sig.parameters:
                 raise InputError(f"Batch items contains unexpected parameter '{batch_param}' " f"not found in function {self.func.__name__}")
 
     def _execute_job(self):
@@ -335,6 +445,11 @@ class Factory:
         Note:
             Logs job start information and progress interval
         """
+        self._log_job_start()
+        self.job_manager.run_orchestration()
+
+    def _log_job_start(self):
+        """Log the job start information and progress interval."""
         if self.config.run_mode != RUN_MODE_RE_RUN:
             logger.info(
                 f"\033[1m[JOB START]\033[0m "
@@ -342,8 +457,6 @@ class Factory:
                 f"\033[33mLogging progress every {PROGRESS_LOG_INTERVAL} seconds\033[0m"
             )
 
-        self.job_manager.run_orchestration()
-
     async def _save_project(self):
         """Save project metadata to storage.
 
@@ -358,7 +471,7 @@ class Factory:
         Serializes and stores the function, configuration, state, and input data
         for potential re-runs.
         """
-        if self.config.run_mode != RUN_MODE_DRY_RUN:
+        if self.config.run_mode not in (RUN_MODE_DRY_RUN, RUN_MODE_WORKER):
             logger.debug("\n2. Creating master job...")
             # First save the request config
             config_data = {
@@ -366,11 +479,14 @@ class Factory:
                 "state": self.state.to_dict(),
                 "input_data": self.original_input_data,
             }
+            if self.input_feeder:
+                # Lazy inputs are resumed from the read position instead of a copy of the input
+                config_data["input_source"] = self.input_feeder.checkpoint()
             func_hex = None
             config_serialize = None
 
             try:
-                func_hex = cloudpickle.dumps(self.func).hex()
+                func_hex = self._pickle_func().hex()
             except TypeError as e:
                 logger.warning(f"Cannot serialize function for resume due to unsupported type: {str(e)}")
             except Exception as e:
@@ -416,8 +532,8 @@ class Factory:
         Raises:
             Exception: If there's an error during job completion
         """
-        #  Complete the master job
-        if self.config.run_mode != RUN_MODE_DRY_RUN:
+        #  Complete the master job; it belongs to the process that started it, not to the workers joining it
+        if self.config.run_mode not in (RUN_MODE_DRY_RUN, RUN_MODE_WORKER):
             try:
                 logger.debug("\n7. Stopping master job...")
                 now = datetime.datetime.now(datetime.timezone.utc)
@@ -428,6 +544,9 @@ class Factory:
                     STATUS_FILTERED: self.job_manager.filtered_count,
                     STATUS_DUPLICATE: self.job_manager.duplicate_count,
                     STATUS_FAILED: self.job_manager.failed_count,
+                    "usage": self.job_manager.budget.usage.to_dict(),
+                    # Includes the spend of the previous runs of a resumed job
+                    "budget": self.job_manager.budget.to_dict(),
                 }
                 if self.factory_storage:
                     await self.factory_storage.log_master_job_end(self.config.master_job_id, status, summary, now, now)
@@ -471,6 +590,32 @@ class Factory:
             f"InDeadQueue: {self.job_manager.dead_queue_count})"
         )
 
+        hedger = self.job_manager.hedger
+        if hedger is not None and hedger.hedged_count > 0:
+            logger.info(f"[HEDGING] {hedger.hedged_count} straggler tasks hedged, {hedger.hedge_win_count} won by the hedged attempt")
+
+        usage = self.job_manager.budget.usage
+        if usage.calls > 0:
+            logger.info(
+                f"[USAGE] {usage.calls} LLM calls | Tokens: {usage.total_tokens} "
+                f"(prompt {usage.prompt_tokens}, completion {usage.completion_tokens}) | Cost: ${usage.cost:.4f}"
+            )
+
+        result_cache = self.job_manager.result_cache
+        if result_cache is not None:
+            logger.info(f"[CACHE] {result_cache.hit_count} inputs served from the result cache, {result_cache.miss_count} run by the function")
+
+        circuit_breaker = self.job_manager.circuit_breaker
+        if circuit_breaker is not None and circuit_breaker.is_exhausted():
+            logger.warning(
+                f"[CIRCUIT BREAKER] Job stopped after {circuit_breaker.consecutive_trips} trips on '{circuit_breaker.tripped_category}' errors. "
+                f"Fix the cause, then resume with: \033[1mfunction_name.resume()\033[0m"
+            )
+
+        latency_summary = self.job_manager.metrics.format_summary()
+        if latency_summary:
+            logger.info(f"[LATENCY] {latency_summary}")
+
         # Add DLQ retrieval information if there are items in the dead queue
         if self.job_manager.dead_queue_count > 0:
             logger.warning(
@@ -487,7 +632,7 @@ def _default_input_converter(data: List[Dict[str, Any]] = None, **kwargs) -> tup
         **kwargs: Additional parameters that can be either parallel sources or broadcast values
 
     Returns:
-        asyncio.Queue[Dict[str, Any]]: Queue of records ready for processing
+        tuple[Queue, list]: Queue of records ready for processing, and the same records as a list
 
     Raises:
         ValueError: If parallel sources have different lengths
@@ -543,4 +688,4 @@ def _default_input_converter(data: List[Dict[str, Any]] = None, **kwargs) -> tup
         except QueueFull:
             raise InputError("Queue is full - cannot add more items")
 
-    return input_data_queue, deepcopy(records)
+    return input_data_queue, records
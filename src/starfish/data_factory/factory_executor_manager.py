@@ -1,6 +1,6 @@
 import asyncio
 import sys
-from typing import Any, Callable, List
+from typing import Any, AsyncIterator, Callable, Iterator, List, Union
 
 import cloudpickle
 from starfish.data_factory.utils.errors import InputError, NoResumeSupportError
@@ -8,6 +8,8 @@ from starfish.common.logger import get_logger
 from starfish.data_factory.constants import IDX, STORAGE_TYPE_LOCAL, STATUS_COMPLETED, STATUS_DUPLICATE, STATUS_FAILED, STATUS_FILTERED, RUN_MODE_RE_RUN
 from starfish.data_factory.factory_ import Factory
 from starfish.data_factory.utils.data_class import FactoryMasterConfig
+from starfish.data_factory.utils.input_source import InputFeeder
+from starfish.data_factory.utils.checkpoint import checkpoint_path, read_checkpoint
 from starfish.data_factory.utils.state import MutableSharedState
 
 logger = get_logger(__name__)
@@ -96,6 +98,32 @@ class FactoryExecutorManager:
                     loop.close()
                     logger.debug("Closed newly created event loop")
 
+        @staticmethod
+        def iterate(async_iterator: AsyncIterator[Any]) -> Iterator[Any]:
+            """Iterate over an async iterator from synchronous code, one item at a time."""
+            _ensure_nest_asyncio()
+
+            new_loop = False
+            try:
+                loop = asyncio.get_event_loop()
+                logger.debug("Using existing event loop for iteration")
+            except RuntimeError as e:
+                logger.debug(f"Creating new event loop: {str(e)}")
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                new_loop = True
+            try:
+                while True:
+                    try:
+                        yield loop.run_until_complete(async_iterator.__anext__())
+                    except StopAsyncIteration:
+                        break
+            finally:
+                loop.run_until_complete(async_iterator.aclose())
+                if new_loop:
+                    loop.close()
+                    logger.debug("Closed newly created event loop")
+
     class DeadQueue:
         """Handles dead queue operations"""
 
@@ -131,24 +159,56 @@ class FactoryExecutorManager:
                 await factory._close_storage()
                 raise InputError(f"Master job not found for master_job_id: {factory.config.master_job_id}")
 
-            master_job = {
-                "duplicate_count": master_job.duplicate_record_count,
-                "failed_count": master_job.failed_record_count,
-                "filtered_count": master_job.filtered_record_count,
-                "completed_count": master_job.completed_record_count,
-                "total_count": (
-                    master_job.duplicate_record_count + master_job.failed_record_count + master_job.filtered_record_count + master_job.completed_record_count
-                ),
-            }
-
-            factory.state = MutableSharedState(initial_data=master_job_config_data.get("state"))
+            # The checkpoint taken while the job ran (and when it stopped), if any
+            checkpoint = read_checkpoint(checkpoint_path(factory.factory_storage, factory.config.master_job_id))
+            if checkpoint and master_job.status == "running":
+                # The process was killed before completing the master job, its counters are only in the checkpoint
+                logger.info(
+                    f"Master job {factory.config.master_job_id} did not end, resuming from its checkpoint; "
+                    f"the {len(checkpoint['dead_queue'])} inputs of its dead queue are run again"
+                )
+                master_job = {key: value for key, value in checkpoint["counters"].items() if key != "dead_queue_count"}
+                master_job["budget"] = checkpoint.get("budget")
+            else:
+                master_job = {
+                    "duplicate_count": master_job.duplicate_record_count,
+                    "failed_count": master_job.failed_record_count,
+                    "filtered_count": master_job.filtered_record_count,
+                    "completed_count": master_job.completed_record_count,
+                    "total_count": sum(
+                        (
+                            master_job.duplicate_record_count,
+                            master_job.failed_record_count,
+                            master_job.filtered_record_count,
+                            master_job.completed_record_count,
+                        )
+                    ),
+                    "budget": (master_job.summary or {}).get("budget"),
+                }
+
+            # The checkpoint is more recent than the request config, saved when the job started
+            reservoir_counts = None
+            if checkpoint:
+                master_job_config_data = {**master_job_config_data, "state": checkpoint["state"]}
+                reservoir_counts = checkpoint.get("reservoir_counts")
+                if "input_source" in checkpoint:
+                    master_job_config_data["input_source"] = checkpoint["input_source"]
+            factory.state = MutableSharedState(initial_data=master_job_config_data.get("state"), reservoir_counts=reservoir_counts)
             factory.config = FactoryMasterConfig.from_dict(master_job_config_data.get("config"))
 
             if func_serialized := master_job_config_data.get("func"):
-                factory.func = cloudpickle.loads(bytes.fromhex(func_serialized))
+                func_pickle = bytes.fromhex(func_serialized)
+                factory.func = cloudpickle.loads(func_pickle)
+                factory._func_pickle = (factory.func, func_pickle)
 
             factory.config.prev_job = {"master_job": master_job, "input_data": master_job_config_data.get("input_data")}
             factory.original_input_data = [dict(item) for item in factory.config.prev_job["input_data"]]
+            if input_source := master_job_config_data.get("input_source"):
+                try:
+                    factory.input_feeder = InputFeeder.from_checkpoint(input_source)
+                except NoResumeSupportError:
+                    await factory._close_storage()
+                    raise
             return factory
 
         @staticmethod
@@ -160,6 +220,7 @@ class FactoryExecutorManager:
                 "filtered_count": factory.job_manager.filtered_count,
                 "completed_count": factory.job_manager.completed_count,
                 "total_count": factory.job_manager.total_count,
+                "budget": factory.job_manager.budget.to_dict(),
             }
             factory._clean_up_in_same_session()
             factory.config.prev_job = {"master_job": master_job, "input_data": factory.original_input_data}
@@ -192,6 +253,19 @@ class FactoryExecutorManager:
         """Execute an async callable"""
         return FactoryExecutorManager.EventLoop.execute(callable_func, *args, **kwargs)
 
+    @staticmethod
+    def stream(factory: Factory, *args, stream_filter: Union[str, List[str], None] = STATUS_COMPLETED, **kwargs) -> AsyncIterator[dict[str, Any]]:
+        """Run the job and stream its records, validating the status filter first."""
+        statuses = None
+        if stream_filter is not None:
+            statuses = []
+            for filter in [stream_filter] if isinstance(stream_filter, str) else stream_filter:
+                _filter = FactoryExecutorManager.Filters.convert(filter)
+                if not FactoryExecutorManager.Filters.is_valid(_filter):
+                    raise InputError(f"Invalid filter '{filter}'. Supported filters are: {list(FactoryExecutorManager.Filters.filter_mapping.keys())}")
+                statuses.append(_filter)
+        return factory.stream(*args, stream_filter=statuses, **kwargs)
+
     @staticmethod
     def resume(*args, **kwargs) -> List[dict[str, Any]]:
         """Re-run a previously executed data generation job"""
@@ -1,14 +1,15 @@
-from typing import Any, Callable, Dict, Generic, List, Optional, ParamSpec, TypeVar, Protocol
+from typing import Any, AsyncIterator, Callable, Dict, Generic, Iterator, List, Optional, ParamSpec, TypeVar, Protocol, Union
 from starfish.data_factory.constants import (
     RUN_MODE_DRY_RUN,
     RUN_MODE_NORMAL,
+    RUN_MODE_WORKER,
     STATUS_COMPLETED,
     STATUS_DUPLICATE,
     STATUS_FAILED,
     STATUS_FILTERED,
     STORAGE_TYPE_LOCAL,
 )
-from starfish.data_factory.config import NOT_COMPLETED_THRESHOLD, TASK_RUNNER_TIMEOUT
+from starfish.data_factory.config import NOT_COMPLETED_THRESHOLD, STREAM_BUFFER_SIZE, TASK_RUNNER_TIMEOUT
 from starfish.data_factory.factory_ import Factory
 from starfish.data_factory.factory_executor_manager import FactoryExecutorManager
 from starfish.common.logger import get_logger
@@ -59,6 +60,56 @@ class FactoryWrapper(Generic[T]):
         self.factory.config.run_mode = RUN_MODE_NORMAL
         return FactoryExecutorManager.execute(self.factory, *args, **kwargs)
 
+    def arun_stream(
+        self,
+        *args: P.args,
+        stream_filter: Union[str, List[str], None] = STATUS_COMPLETED,
+        stream_ordered: bool = False,
+        stream_buffer_size: int = STREAM_BUFFER_SIZE,
+        **kwargs: P.kwargs,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Execute the data processing pipeline and yield records while the job runs.
+
+        Args:
+            *args: Positional arguments to pass to the data processing function
+            stream_filter: Status or list of statuses to yield (default: completed). None yields every status.
+            stream_ordered: Yield records by ascending input index instead of completion order
+            stream_buffer_size: Maximum number of records buffered ahead of the consumer. The job
+                stops dispatching new tasks while the buffer is full (0 means unbounded).
+            **kwargs: Keyword arguments to pass to the data processing function
+
+        Returns:
+            AsyncIterator[dict[str, Any]]: Records as soon as their task completes
+        """
+        self.factory.config.run_mode = RUN_MODE_NORMAL
+        return FactoryExecutorManager.stream(
+            self.factory, *args, stream_filter=stream_filter, stream_ordered=stream_ordered, stream_buffer_size=stream_buffer_size, **kwargs
+        )
+
+    def run_stream(
+        self,
+        *args: P.args,
+        stream_filter: Union[str, List[str], None] = STATUS_COMPLETED,
+        stream_ordered: bool = False,
+        stream_buffer_size: int = STREAM_BUFFER_SIZE,
+        **kwargs: P.kwargs,
+    ) -> Iterator[dict[str, Any]]:
+        """Synchronous version of `arun_stream`, driving the event loop between records.
+
+        Args:
+            *args: Positional arguments to pass to the data processing function
+            stream_filter: Status or list of statuses to yield (default: completed). None yields every status.
+            stream_ordered: Yield records by ascending input index instead of completion order
+            stream_buffer_size: Maximum number of records buffered ahead of the consumer (0 means unbounded)
+            **kwargs: Keyword arguments to pass to the data processing function
+
+        Returns:
+            Iterator[dict[str, Any]]: Records as soon as their task completes
+        """
+        return FactoryExecutorManager.EventLoop.iterate(
+            self.arun_stream(*args, stream_filter=stream_filter, stream_ordered=stream_ordered, stream_buffer_size=stream_buffer_size, **kwargs)
+        )
+
     def dry_run(self, *args: P.args, **kwargs: P.kwargs) -> List[dict[str, Any]]:
         """Test run with limited data for validation purposes.
 
@@ -72,12 +123,29 @@ class FactoryWrapper(Generic[T]):
         self.factory.config.run_mode = RUN_MODE_DRY_RUN
         return FactoryExecutorManager.execute(self.factory, *args, **kwargs)
 
+    def run_worker(self, master_job_id: str) -> List[dict[str, Any]]:
+        """Join a master job started with lease_queue=True and run its work items until none is left.
+
+        The worker claims the items of the master job from the shared storage, runs them with
+        this factory's configuration and commits its records there. Items whose lease expired,
+        because their worker crashed or hung, are claimed again.
+
+        Args:
+            master_job_id: ID of the master job to join
+
+        Returns:
+            List[dict[str, Any]]: Records completed by this worker
+        """
+        self.factory.config.run_mode = RUN_MODE_WORKER
+        self.factory.config.master_job_id = master_job_id
+        return FactoryExecutorManager.execute(self.factory)
+
     def resume(
         self,
         storage: str = None,
         batch_size: int = None,
         target_count: int = None,
-        max_concurrency: int = None,
+        max_concurrency: Union[int, str] = None,
         initial_state_values: Optional[Dict[str, Any]] = None,
         on_record_complete: Optional[List[Callable]] = None,
         on_record_error: Optional[List[Callable]] = None,
@@ -143,19 +211,53 @@ class FactoryWrapper(Generic[T]):
     def get_index_dead_queue(self) -> List[int]:
         return FactoryExecutorManager.process_dead_queue(self.factory, is_idx=True)
 
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Return the latency statistics of the last run, per task phase.
+
+        Phases are queue_wait, user_func, hooks and storage_save, plus hook:<name> for each
+        hook; each has count, mean, p50, p90, p99 and max in seconds. Phases without samples
+        are left out.
+        """
+        if self.factory.job_manager is None:
+            return {}
+        return self.factory.job_manager.metrics.summary()
+
 
 class DataFactoryProtocol(Protocol[P, T]):
     """Protocol for the decorated function with additional methods."""
 
     def __call__(self, *args: P.args, **kwargs: P.kwargs) -> List[Dict[str, Any]]: ...
     def run(self, *args: P.args, **kwargs: P.kwargs) -> List[Dict[str, Any]]: ...
+    def arun_stream(
+        self,
+        *args: P.args,
+        stream_filter: Union[str, List[str], None] = STATUS_COMPLETED,
+        stream_ordered: bool = False,
+        stream_buffer_size: int = STREAM_BUFFER_SIZE,
+        **kwargs: P.kwargs,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Execute the data processing pipeline and yield records while the job runs."""
+
+    def run_stream(
+        self,
+        *args: P.args,
+        stream_filter: Union[str, List[str], None] = STATUS_COMPLETED,
+        stream_ordered: bool = False,
+        stream_buffer_size: int = STREAM_BUFFER_SIZE,
+        **kwargs: P.kwargs,
+    ) -> Iterator[Dict[str, Any]]:
+        """Synchronous version of `arun_stream`, driving the event loop between records."""
+
     def dry_run(self, *args: P.args, **kwargs: P.kwargs) -> List[Dict[str, Any]]: ...
+    def run_worker(self, master_job_id: str) -> List[Dict[str, Any]]:
+        """Join a master job started with lease_queue=True and run its work items until none is left."""
+
     def resume(
         self,
         storage: str = STORAGE_TYPE_LOCAL,
         batch_size: int = 1,
         target_count: int = 0,
-        max_concurrency: int = 10,
+        max_concurrency: Union[int, str] = 10,
         initial_state_values: Optional[Dict[str, Any]] = None,
         on_record_complete: Optional[List[Callable]] = None,
         on_record_error: Optional[List[Callable]] = None,
@@ -176,3 +278,5 @@ class DataFactoryProtocol(Protocol[P, T]):
     def get_index_filtered(self) -> List[int]: ...
     def get_index_failed(self) -> List[int]: ...
     def get_index_dead_queue(self) -> List[int]: ...
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Return the latency statistics of the last run, per task phase."""
@@ -1,19 +1,27 @@
 import asyncio
-import copy
 import datetime
 import hashlib
+import inspect
 import json
+import os
+import time
 import uuid
 from asyncio import Queue
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, Iterable, List, Optional
 import traceback
 
 from starfish.common.logger import get_logger
+from starfish.common.tracing import span
+from starfish.llm.proxy.usage import Usage, track_usage
 from starfish.data_factory.config import PROGRESS_LOG_INTERVAL
 from starfish.data_factory.constants import (
+    EXECUTOR_ASYNC,
+    EXECUTOR_PROCESS,
     IDX,
+    PRIORITY,
     RECORD_STATUS,
     RUN_MODE_DRY_RUN,
+    RUN_MODE_WORKER,
     STATUS_COMPLETED,
     STATUS_DUPLICATE,
     STATUS_FAILED,
@@ -22,10 +30,29 @@ from starfish.data_factory.constants import (
 from starfish.data_factory.event_loop import run_in_event_loop
 from starfish.data_factory.storage.base import Storage
 from starfish.data_factory.storage.models import GenerationJob, Record
+from starfish.data_factory.process_pool import ProcessPool
 from starfish.data_factory.task_runner import TaskRunner
+from starfish.data_factory.thread_pool import ThreadPool, is_async_callable
+from starfish.data_factory.utils.budget import UsageBudget
+from starfish.data_factory.utils.checkpoint import create_checkpointer
+from starfish.data_factory.utils.circuit_breaker import create_circuit_breaker
+from starfish.data_factory.utils.concurrency import create_concurrency_limiter
+from starfish.data_factory.utils.hedging import create_task_hedger
+from starfish.data_factory.utils.hooks import BatchedHook, hook_name
+from starfish.data_factory.utils.input_scheduler import InputScheduler
+from starfish.data_factory.utils.result_cache import create_result_cache
+from starfish.data_factory.utils.retry import categorize_error, resolve_retry_policy
 from starfish.data_factory.utils.data_class import FactoryJobConfig, FactoryMasterConfig
-from starfish.data_factory.utils.errors import TimeoutErrorAsyncio
+from starfish.data_factory.utils.dedup import NearDuplicateHook
+from starfish.data_factory.utils.errors import InputError, OutputError, TimeoutErrorAsyncio
+from starfish.data_factory.utils.input_source import InputFeeder
+from starfish.data_factory.utils.lease_queue import LeaseFeeder, default_worker_id
+from starfish.data_factory.utils.metrics_exporter import create_metrics_exporter
+from starfish.data_factory.utils.metrics import PHASE_HOOK_PREFIX, PHASE_HOOKS, PHASE_QUEUE_WAIT, PHASE_STORAGE_SAVE, PHASE_USER_FUNC, JobMetrics
+from starfish.data_factory.utils.output_buffer import OutputBuffer
+from starfish.data_factory.utils.result_stream import ResultStream
 from starfish.data_factory.utils.state import MutableSharedState
+from starfish.data_factory.utils.stop_condition import StopConditionTracker
 
 logger = get_logger(__name__)
 
@@ -42,18 +69,36 @@ class JobManager:
         job_config (FactoryJobConfig): Configuration for the job
         storage (Storage): Storage instance for persisting results
         state (dict): Current state of the job
-        semaphore (asyncio.Semaphore): Semaphore for concurrency control
+        semaphore (ConcurrencyLimiter): Concurrency limit, fixed or adaptive when max_concurrency is "auto"
         lock (asyncio.Lock): Lock for thread-safe operations
         task_runner (TaskRunner): Runner for executing tasks
-        job_input_queue (Queue): Queue for input data
-        job_output (Queue): Queue for output data
+        hedger (TaskHedger): Launches a duplicate attempt of straggler tasks, None unless hedge_percentile is set
+        circuit_breaker (CircuitBreaker): Pauses dispatch on failure spikes of one error category, None unless configured
+        budget (UsageBudget): LLM tokens and cost of the job, and its max_cost / max_tokens stop condition
+        result_cache (ResultCache): Outputs of inputs completed by the same function in any master job, None unless configured
+        job_input_queue (InputScheduler): Priority scheduler of the inputs and their retries
+        input_feeder (InputFeeder): Feeder pulling lazy input data into the input queue, if any
+            (a LeaseFeeder claiming work items from storage with lease_queue)
+        worker_id (str): Identifier of this worker, recorded on execution jobs and leases
+        lease_queue (bool): Whether the inputs are shared with other workers through a lease queue in storage
+        job_output (OutputBuffer): Task results, spilled to disk past the configured in-memory size
+        metrics (JobMetrics): Latency histograms of the queue wait, user function, hooks and storage save of the tasks
+        metrics_exporter (MetricsExporter): Publishes live metrics on an HTTP port or to a JSON file, if configured
+        checkpointer (JobCheckpointer): Saves the state, counters and dead queue while the job runs, None if disabled,
+            in a worker or with a lease queue
         completed_count (int): Count of completed tasks
         duplicate_count (int): Count of duplicate tasks
         filtered_count (int): Count of filtered tasks
         failed_count (int): Count of failed tasks
         total_count (int): Total number of tasks attempted
         job_run_stop_threshold (int): Threshold for stopping job
+        stop_tracker (StopConditionTracker): Ring buffer of the latest task statuses for the stop condition
         active_operations (set): Set of active operations
+        result_stream (ResultStream): Stream receiving every task result while the job runs, if attached
+        in_flight_count (int): Number of dispatched tasks whose completion has not been handled yet
+        job_error (Exception): Error that stopped the job while handling a task result (e.g. the output
+            could not be spilled to disk), raised once the job is cleaned up; None otherwise
+        _dispatch_event (asyncio.Event): Wakes the dispatcher when an input is queued or a task completes
         _progress_ticker_task (asyncio.Task): Task for progress logging
         dead_queue (Queue): Queue for failed tasks
         task_failure_count (dict): Track failure count per task
@@ -63,7 +108,14 @@ class JobManager:
     # Initialization
     # ====================
     def __init__(
-        self, master_job_config: FactoryMasterConfig, state: MutableSharedState, storage: Storage, user_func: Callable, input_data_queue: Queue = None
+        self,
+        master_job_config: FactoryMasterConfig,
+        state: MutableSharedState,
+        storage: Storage,
+        user_func: Callable,
+        input_data_queue: Queue = None,
+        input_feeder: InputFeeder = None,
+        func_pickle: Optional[bytes] = None,
     ):
         """Initialize the JobManager with job configuration and storage.
 
@@ -73,6 +125,10 @@ class JobManager:
             storage (Storage): Storage instance for persisting job results and metadata
             user_func (Callable): Function to execute for each task
             input_data_queue (Queue, optional): Queue for input data. Defaults to None.
+            input_feeder (InputFeeder, optional): Feeder pulling lazy input data into the queue
+                as slots free up. Defaults to None.
+            func_pickle (bytes, optional): The function already pickled with cloudpickle, sent to the
+                worker processes with executor="process". Defaults to None.
         """
         self.master_job_id = master_job_config.master_job_id
         self.job_config = FactoryJobConfig(
@@ -83,21 +139,51 @@ class JobManager:
             user_func=user_func,
             run_mode=master_job_config.run_mode,
             max_concurrency=master_job_config.max_concurrency,
+            concurrency_floor=master_job_config.concurrency_floor,
+            concurrency_ceiling=master_job_config.concurrency_ceiling,
             on_record_complete=master_job_config.on_record_complete,
             on_record_error=master_job_config.on_record_error,
             job_run_stop_threshold=master_job_config.job_run_stop_threshold,
+            zero_copy=master_job_config.zero_copy,
+            executor=master_job_config.executor,
+            workers=master_job_config.workers,
         )
         self.storage = storage
         self.state = state
-        self.task_runner = TaskRunner(timeout=master_job_config.task_runner_timeout)
-        self.job_input_queue = input_data_queue if input_data_queue else Queue()
-        self.job_output = Queue()
+        self.retry_policy = resolve_retry_policy(master_job_config.retry_policy)
+        self.task_runner = TaskRunner(timeout=master_job_config.task_runner_timeout, zero_copy=master_job_config.zero_copy, retry_policy=self.retry_policy)
+        self.hedger = create_task_hedger(master_job_config.hedge_percentile, max_in_flight=master_job_config.hedge_max_in_flight)
+        self.circuit_breaker = create_circuit_breaker(master_job_config.circuit_breaker)
+        self.budget = UsageBudget(master_job_config.max_cost, master_job_config.max_tokens, inputs_per_task=master_job_config.batch_size)
+        self.result_cache = None
+        if master_job_config.result_cache is not None and master_job_config.run_mode != RUN_MODE_DRY_RUN:
+            self.result_cache = create_result_cache(master_job_config.result_cache, storage, user_func)
+        # Inputs whose cached output was not completed by the hooks, run by the function on retry
+        self._cache_bypass = set()
+        self.job_input_queue = InputScheduler.from_queue(input_data_queue, policy=master_job_config.schedule_policy)
+        self.input_feeder = input_feeder
+        self.func_pickle = func_pickle
+        self.job_output = OutputBuffer(max_in_memory=master_job_config.output_buffer_size)
+        self.stop_tracker = StopConditionTracker(self.job_config.job_run_stop_threshold)
+        self.metrics = JobMetrics()
+        self.metrics_exporter = create_metrics_exporter(self, port=master_job_config.metrics_port, file=master_job_config.metrics_file)
         self.prev_job = master_job_config.prev_job
+        self.worker_id = master_job_config.worker_id or default_worker_id()
+        self.lease_queue = master_job_config.lease_queue and master_job_config.run_mode != RUN_MODE_DRY_RUN
+        self.checkpointer = None
+        # The master job, and so its checkpoint, belongs to the process that started it. With a lease
+        # queue, each worker only knows its own counters and state: the work items are the progress
+        if master_job_config.run_mode not in (RUN_MODE_DRY_RUN, RUN_MODE_WORKER) and not self.lease_queue:
+            self.checkpointer = create_checkpointer(self, storage, interval=master_job_config.checkpoint_interval, every=master_job_config.checkpoint_every)
+        self.lease_timeout = master_job_config.lease_timeout
+        self._collect_leased_results = False
         # Initialize counters
         self._initialize_counters()
         self.active_operations = set()
         self._progress_ticker_task = None
         self.execution_time = 0
+        self.result_stream = None
+        self.job_error = None
         self.err_type_counter = {}
         self.dead_queue = Queue()  # Add dead queue for failed tasks
         self.task_failure_count = {}  # Track failure count per task
@@ -112,7 +198,27 @@ class JobManager:
         self.dead_queue_count = 0
 
     async def setup_input_output_queue(self):
-        pass
+        """Move the inputs to the lease queue of the master job in storage, with lease_queue.
+
+        The inputs are stored as work items that this process and any worker started with
+        `run_worker(master_job_id)` claim, so the dispatcher is fed from storage instead.
+        A worker joining the job has no inputs of its own and only claims.
+
+        Raises:
+            InputError: If the storage has no lease queue or the input is a lazy source
+        """
+        if not self.lease_queue:
+            return
+        if self.input_feeder:
+            raise InputError("lease_queue requires list input, not a lazy input source")
+        self.input_feeder = LeaseFeeder(self.storage, self.master_job_id, worker_id=self.worker_id, lease_timeout=self.lease_timeout)
+        items = self.job_input_queue.items()
+        if items:
+            await self.input_feeder.enqueue(items)
+            self.job_input_queue = InputScheduler(self.job_input_queue.policy)
+            # The process that stored the inputs returns the results of every worker
+            self._collect_leased_results = True
+        logger.info(f"Worker {self.worker_id} joined the lease queue of master job {self.master_job_id}")
 
     # ====================
     # Job Execution
@@ -124,10 +230,36 @@ class JobManager:
         and handling task completion. It runs until either the target count is reached or
         the stop threshold is triggered.
         """
+        run_in_event_loop(self.arun_orchestration())
+
+    async def arun_orchestration(self):
+        """Run the job orchestration in the current event loop.
+
+        Same as `run_orchestration`, for callers that already run inside an event loop
+        and consume the job while it runs, e.g. through a result stream.
+        """
         start_time = datetime.datetime.now(datetime.timezone.utc)
-        run_in_event_loop(self._async_run_orchestration())
+        await self._async_run_orchestration()
         self.execution_time = int((datetime.datetime.now(datetime.timezone.utc) - start_time).total_seconds())
 
+    def attach_result_stream(self, maxsize: int = 0, status_filter: Optional[Iterable[str]] = None, ordered: bool = False) -> ResultStream:
+        """Publish every task result to a stream consumed while the job runs.
+
+        Must be called once the input queue is set up, so that ordered mode knows
+        which input indices to wait for.
+
+        Args:
+            maxsize: Maximum number of records buffered ahead of the consumer (0 means unbounded)
+            status_filter: Statuses whose records are streamed. None streams every status.
+            ordered: Release records by ascending input index
+
+        Returns:
+            ResultStream: The stream to iterate over
+        """
+        expected_idx = [input_data.get(IDX) for input_data in self.job_input_queue.items()]
+        self.result_stream = ResultStream(maxsize=maxsize, status_filter=status_filter, ordered=ordered, expected_idx=expected_idx)
+        return self.result_stream
+
     async def _async_run_orchestration(self):
         """Main asynchronous orchestration loop for the job.
 
@@ -138,17 +270,32 @@ class JobManager:
         - Handling task completion and cleanup
         """
         self._initialize_concurrency_controls()
+        self._start_executors()
 
         if self.job_config.show_progress:
             self._progress_ticker_task = asyncio.create_task(self._progress_ticker())
 
         self.running_tasks = set()
+        self.completion_tasks = set()
+        self.in_flight_count = 0
 
         try:
-            if not self.job_input_queue.empty():
+            if self.metrics_exporter:
+                await self.metrics_exporter.start()
+            self._open_dedup_hooks()
+            self._reset_batched_hooks()
+            if isinstance(self.input_feeder, LeaseFeeder):
+                await self.input_feeder.start()
+            if self.checkpointer:
+                await self.checkpointer.start()
+            if not self.job_input_queue.empty() or self.input_feeder:
                 await self._process_tasks()
         finally:
             await self._cleanup()
+        if self.job_error is not None:
+            raise self.job_error
+        if self._collect_leased_results:
+            await self._collect_results_of_other_workers()
 
     def _initialize_concurrency_controls(self):
         """Initialize semaphore and lock for concurrency control."""
@@ -156,20 +303,123 @@ class JobManager:
             del self.semaphore
         if hasattr(self, "lock"):
             del self.lock
-        self.semaphore = asyncio.Semaphore(self.job_config.max_concurrency)
+        self.semaphore = create_concurrency_limiter(
+            self.job_config.max_concurrency, floor=self.job_config.concurrency_floor, ceiling=self.job_config.concurrency_ceiling
+        )
         self.lock = asyncio.Lock()
+        self._dispatch_event = asyncio.Event()
+
+    def _start_executors(self):
+        """Start the worker processes (executor="process") or the threads running a synchronous function."""
+        self.task_runner.process_pool = None
+        self.task_runner.thread_pool = None
+        if self.job_config.executor not in (EXECUTOR_ASYNC, EXECUTOR_PROCESS):
+            raise InputError(f"Unknown executor '{self.job_config.executor}', expected '{EXECUTOR_ASYNC}' or '{EXECUTOR_PROCESS}'")
+        # Sized for the highest concurrency the limiter may allow
+        concurrency = getattr(self.semaphore, "ceiling", self.semaphore.limit)
+        if self.job_config.executor == EXECUTOR_PROCESS:
+            workers = self.job_config.workers or os.cpu_count() or 1
+            self.task_runner.process_pool = ProcessPool(self.job_config.user_func, workers, concurrency, func_pickle=self.func_pickle)
+            self.task_runner.process_pool.start()
+        elif not is_async_callable(self.job_config.user_func):
+            self.task_runner.thread_pool = ThreadPool(concurrency)
+
+    async def _close_executors(self):
+        """Stop the worker processes and threads, if any."""
+        if self.task_runner.process_pool is not None:
+            await self.task_runner.process_pool.close()
+            self.task_runner.process_pool = None
+        if self.task_runner.thread_pool is not None:
+            self.task_runner.thread_pool.shutdown()
+
+    def _notify_dispatcher(self):
+        """Wake up the dispatcher loop if it is waiting for work."""
+        self._dispatch_event.set()
 
     async def _process_tasks(self):
-        """Process tasks from the input queue until stop condition is met."""
-        while not self._is_job_to_stop():
+        """Process tasks from the input queue until stop condition is met.
+
+        The dispatcher never polls: when the input queue is empty it waits on
+        `_dispatch_event`, which is set whenever an input is requeued or a task
+        completes (the only events that can change the queue or the stop condition),
+        or until the backoff of the next delayed retry elapses.
+        Lazy input is pulled from the feeder only when the queue runs short, so at most
+        one batch is read ahead of the free concurrency slots.
+        While the circuit breaker is open, queued inputs wait until its cool-down ends, and
+        while the next task is not expected to fit in the budget, until a task completes.
+        """
+        while True:
+            # Clear before checking so that a notification raised in between is never lost
+            self._dispatch_event.clear()
+            if self._is_job_to_stop():
+                break
+            if self.input_feeder and self.job_input_queue.qsize() < self.job_config.batch_size:
+                await self._feed_input(self.job_config.batch_size - self.job_input_queue.qsize())
             if not self.job_input_queue.empty():
                 await self.semaphore.acquire()
+                if self._is_job_to_stop():
+                    # The completion that freed the slot may have reached the target
+                    self.semaphore.release()
+                    break
+                if (self.circuit_breaker and not self.circuit_breaker.allow_dispatch()) or not self.budget.allows_dispatch(self.in_flight_count):
+                    # Or tripped the circuit breaker, or spent the budget
+                    self.semaphore.release()
+                    await self._wait_dispatch_event(self._next_wakeup())
+                    continue
                 input_data = await self.job_input_queue.get()
-                task = self._create_single_task(input_data)
+                if self.circuit_breaker:
+                    self.circuit_breaker.on_dispatch(input_data.get(IDX))
+                self.metrics.record(PHASE_QUEUE_WAIT, self.job_input_queue.last_wait)
+                self.in_flight_count += 1
+                if self.job_config.batch_size > 1:
+                    task = self._create_batch_task(self._fill_input_batch(input_data))
+                else:
+                    task = self._create_single_task(input_data)
                 self.running_tasks.add(task)
                 task.add_done_callback(self.running_tasks.discard)
+            elif self.in_flight_count == 0 and self.job_input_queue.delayed_count() == 0 and not self._has_more_input():
+                # Nothing queued, in flight or waiting for a retry: no event can bring in more work
+                logger.debug("Input queue drained and no running tasks, stopping dispatcher")
+                break
             else:
-                await asyncio.sleep(1)
+                await self._wait_dispatch_event(self._next_wakeup())
+
+    def _next_wakeup(self) -> Optional[float]:
+        """Return the seconds until the dispatcher must check again without a notification, None to wait for one.
+
+        That is when the next delayed retry is ready, when the cool-down of the circuit breaker
+        ends, or the poll interval of a lease queue, whose items can be released by other
+        workers.
+        """
+        candidates = (
+            self.job_input_queue.next_ready_in(),
+            self.circuit_breaker.next_dispatch_in() if self.circuit_breaker else None,
+            getattr(self.input_feeder, "poll_interval", None),
+        )
+        timeouts = [timeout for timeout in candidates if timeout is not None]
+        return min(timeouts) if timeouts else None
+
+    async def _wait_dispatch_event(self, timeout: float = None):
+        """Wait for a dispatcher notification, or until a delayed retry becomes ready."""
+        try:
+            await asyncio.wait_for(self._dispatch_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _feed_input(self, max_records: int):
+        """Pull lazy input records into the input queue."""
+        fed = await self.input_feeder.feed(self.job_input_queue, max_records)
+        if self.result_stream:
+            for input_data in fed:
+                self.result_stream.expect(input_data.get(IDX))
+
+    def _fill_input_batch(self, input_data) -> List[Dict[str, Any]]:
+        """Group the inputs already waiting in the queue, up to batch_size, with the one just taken."""
+        input_batch = [input_data]
+        while len(input_batch) < self.job_config.batch_size and not self.job_input_queue.empty():
+            input_batch.append(self.job_input_queue.get_nowait())
+            self.metrics.record(PHASE_QUEUE_WAIT, self.job_input_queue.last_wait)
+        return input_batch
 
     # ====================
     # Task Management
@@ -177,105 +427,279 @@ class JobManager:
     def _create_single_task(self, input_data) -> asyncio.Task:
         """Create and manage a single task."""
         task = asyncio.create_task(self._run_single_task(input_data))
-        asyncio.create_task(self._handle_task_completion(task))
+        self._track_completion(task)
+        return task
+
+    def _create_batch_task(self, input_batch) -> asyncio.Task:
+        """Create and manage a task running one micro-batch of inputs."""
+        task = asyncio.create_task(self._run_batch_task(input_batch))
+        self._track_completion(task)
         return task
 
-    async def _run_single_task(self, input_data) -> List[Dict[str, Any]]:
+    def _track_completion(self, task: asyncio.Task):
+        """Schedule the completion handling of a task and keep it until it is done."""
+        completion_task = asyncio.create_task(self._handle_task_completion(task, time.monotonic()))
+        self.completion_tasks.add(completion_task)
+        completion_task.add_done_callback(self.completion_tasks.discard)
+
+    async def _run_single_task(self, input_data) -> Dict[str, Any]:
         """Execute a single task with error handling."""
-        output = []
-        output_ref = []
-        task_status = STATUS_COMPLETED
-        err_output = {}
         input_data_idx = input_data.get(IDX, None)
         if input_data_idx == None:
             logger.warning(f"found an input_data without index ")
 
-        try:
-            output = await self.task_runner.run_task(self.job_config.user_func, input_data, input_data_idx)
-            task_status = self._evaluate_task_output(output)
-            output_ref = await self._save_record_data(copy.deepcopy(output), task_status, input_data)
-        except (Exception, TimeoutErrorAsyncio) as e:
-            task_status, err_output = self._handle_task_error(e)
-
-        if task_status != STATUS_COMPLETED:
-            await self._requeue_task(input_data, input_data_idx)
+        with span("JobManager._run_single_task", idx=input_data_idx):
+            cached_output = await self._get_cached_output(input_data)
+            if cached_output is not None:
+                return await self._finish_task(input_data, input_data_idx, cached_output, from_cache=True)
+            with track_usage() as usage:
+                try:
+                    output, error = await self._run_user_func(input_data, input_data_idx), None
+                except (Exception, TimeoutErrorAsyncio) as e:
+                    output, error = [], e
+            return await self._finish_task(input_data, input_data_idx, output, error=error, usage=usage)
+
+    async def _run_batch_task(self, input_batch) -> List[Dict[str, Any]]:
+        """Execute one call of the user function for a micro-batch of inputs.
+
+        Every parameter is passed as a list holding one value per input (None for an input
+        without that parameter), and the function must return a list holding one output per
+        input in the same order. An output can be a list of records or a single record. Status, retries and the dead queue are still
+        tracked per input, and the LLM usage of the call is split evenly between the inputs.
+        Inputs with a cached output are served from the cache and left out of the call.
+        """
+        cached_results = []
+        if self.result_cache:
+            uncached_batch = []
+            for input_data in input_batch:
+                cached_output = await self._get_cached_output(input_data)
+                if cached_output is None:
+                    uncached_batch.append(input_data)
+                else:
+                    cached_results.append(await self._finish_task(input_data, input_data.get(IDX, None), cached_output, from_cache=True))
+            if not uncached_batch:
+                return cached_results
+            input_batch = uncached_batch
+        input_data_idx_list = [input_data.get(IDX, None) for input_data in input_batch]
+        # Every key of any input, in first-seen order; an input without a key gets None for it
+        keys = dict.fromkeys(key for input_data in input_batch for key in input_data if key not in (IDX, PRIORITY))
+        batch_input = {key: [input_data.get(key) for input_data in input_batch] for key in keys}
+
+        with span("JobManager._run_batch_task", batch_size=len(input_batch)):
+            with track_usage() as usage:
+                try:
+                    batch_output = await self._run_user_func(batch_input, input_data_idx_list)
+                    if not isinstance(batch_output, list) or len(batch_output) != len(input_batch):
+                        raise OutputError(f"Batched function must return a list with one output per input, expected {len(input_batch)} outputs")
+                except (Exception, TimeoutErrorAsyncio) as e:
+                    batch_output, error = [[]] * len(input_batch), e
+                else:
+                    error = None
+            usage_shares = usage.split(len(input_batch))
+
+            return cached_results + await asyncio.gather(
+                *[
+                    self._finish_task(input_data, idx, [output] if isinstance(output, dict) else output, error=error, usage=share)
+                    for input_data, idx, output, share in zip(input_batch, input_data_idx_list, batch_output, usage_shares)
+                ]
+            )
 
-        return self._create_task_result(input_data_idx, task_status, output_ref, output, err_output)
+    async def _run_user_func(self, input_data, input_data_idx):
+        """Run the user function through the task runner, hedged when it straggles if hedging is enabled."""
+        with self.metrics.time(PHASE_USER_FUNC):
+            if self.hedger is None:
+                return await self.task_runner.run_task(self.job_config.user_func, input_data, input_data_idx)
+            return await self.hedger.run(lambda: self.task_runner.run_task(self.job_config.user_func, input_data, input_data_idx))
+
+    async def _get_cached_output(self, input_data) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached output of an input, None if it is not cached or must be run by the function."""
+        if self.result_cache is None or str(input_data.get(IDX)) in self._cache_bypass:
+            return None
+        return await self.result_cache.get(input_data)
+
+    async def _finish_task(self, input_data, input_data_idx, output, error=None, usage: Usage = None, from_cache: bool = False) -> Dict[str, Any]:
+        """Evaluate and save the output of one input, or record its error, and requeue it if not completed.
+
+        The LLM usage of the task, if given, is attached to the task result. A completed output
+        of the function is added to the result cache; a cached output (`from_cache`) that the
+        hooks do not complete is not served again, so the retry runs the function.
+        """
+        output_ref = []
+        err_output = {}
+        if error is None:
+            try:
+                task_status = await self._evaluate_task_output(output)
+                # The storage writer only reads the records, so it shares them with the task result
+                output_ref = await self._save_record_data(output, task_status, input_data)
+            except (Exception, TimeoutErrorAsyncio) as e:
+                error = e
+        if error is not None:
+            task_status, err_output = await self._handle_task_error(error)
+        if self.circuit_breaker:
+            self.circuit_breaker.record(categorize_error(error) if error is not None else None, input_data_idx)
+        for hook in self._dedup_hooks():
+            # Indexed only now, so an output filtered by another hook or failing to save is never indexed
+            (hook.commit if task_status == STATUS_COMPLETED else hook.discard)(output)
 
-    def _evaluate_task_output(self, output):
+        if task_status != STATUS_COMPLETED:
+            if from_cache:
+                self._cache_bypass.add(str(input_data_idx))
+            await self._requeue_task(input_data, input_data_idx, error)
+        elif self.result_cache and not from_cache:
+            await self.result_cache.put(input_data, output)
+
+        result = self._create_task_result(input_data_idx, task_status, output_ref, output, err_output)
+        if usage is not None:
+            result["usage"] = usage.to_dict()
+        if from_cache:
+            result["cached"] = True
+        return result
+
+    async def _run_hooks(self, hooks: List[Callable], value: Any) -> List[Any]:
+        """Call the hooks in order with a task output or error, awaiting async, threaded and batched hooks.
+
+        Each hook is timed in the metrics as `hook:<name>`.
+        """
+        hooks_output = []
+        for hook in hooks:
+            with self.metrics.time(PHASE_HOOK_PREFIX + hook_name(hook)):
+                hook_output = hook(value, self.state)
+                if inspect.isawaitable(hook_output):
+                    hook_output = await hook_output
+            hooks_output.append(hook_output)
+        return hooks_output
+
+    async def _evaluate_task_output(self, output):
         """Evaluate task output and determine status."""
-        hooks_output = [hook(output, self.state) for hook in self.job_config.on_record_complete]
+        with self.metrics.time(PHASE_HOOKS):
+            hooks_output = await self._run_hooks(self.job_config.on_record_complete, output)
         if STATUS_DUPLICATE in hooks_output:
             return STATUS_DUPLICATE
         if STATUS_FILTERED in hooks_output:
             return STATUS_FILTERED
         return STATUS_COMPLETED
 
-    def _handle_task_error(self, error):
+    async def _handle_task_error(self, error):
         """Handle task errors and update state."""
         err_str = str(error)
         # [-1]
-        err_trace = traceback.format_exc().splitlines()
+        err_trace = "".join(traceback.format_exception(error)).splitlines()
         logger.error(f"Error running task: {err_str}")
 
-        for hook in self.job_config.on_record_error:
-            hook(err_str, self.state)
+        await self._run_hooks(self.job_config.on_record_error, err_str)
 
         return STATUS_FAILED, {"err_str": err_str, "err_trace": err_trace}
 
-    async def _requeue_task(self, input_data, input_data_idx):
-        """Requeue a task that needs to be retried or move to dead queue if failed too many times."""
+    async def _requeue_task(self, input_data, input_data_idx, error=None):
+        """Requeue a task that needs to be retried or move to dead queue if failed too many times.
+
+        A task that failed with an error the retry policy does not retry (validation,
+        authentication) goes to the dead queue at once. Otherwise the task is queued as a
+        retry, which the scheduler holds back until the backoff delay of the policy elapses
+        (no delay for duplicate and filtered tasks).
+        """
         task_key = str(input_data_idx)
         async with self.lock:
-            self.task_failure_count[task_key] = self.task_failure_count.get(task_key, 0) + 1
-            if self.task_failure_count[task_key] >= self.job_config.dead_queue_threshold:
+            failure_count = self.task_failure_count.get(task_key, 0) + 1
+            if error is not None and not self.retry_policy.is_retryable(error):
+                logger.warning(f"Task {task_key} failed with a non-retryable error: {error}")
+                failure_count = max(failure_count, self.job_config.dead_queue_threshold)
+            self.task_failure_count[task_key] = failure_count
+            if failure_count >= self.job_config.dead_queue_threshold:
                 await self.dead_queue.put(input_data)
                 self.dead_queue_count += 1
-                logger.warning(f"Task {task_key} failed 3 times, moving to dead queue")
+                logger.warning(f"Task {task_key} failed {failure_count} times, moving to dead queue")
             else:
-                await self.job_input_queue.put(input_data)
-                logger.debug(f"Requeuing task {task_key} (failure count: {self.task_failure_count[task_key]})")
+                delay = self.retry_policy.get_delay(failure_count, error) if error is not None else 0
+                logger.debug(f"Requeuing task {task_key} in {delay:.2f}s (failure count: {failure_count})")
+                await self.job_input_queue.put(input_data, retry=True, delay=delay)
+        self._notify_dispatcher()
 
     def _create_task_result(self, input_data_idx, task_status, output_ref, output, err_output):
         """Create a standardized task result dictionary."""
         return {IDX: input_data_idx, RECORD_STATUS: task_status, "output_ref": output_ref, "output": output, "err": [err_output]}
 
-    async def _handle_task_completion(self, task):
+    async def _handle_task_completion(self, task, start_time: float = None):
         """Handle task completion and update counters.
 
         Args:
-            task (asyncio.Task): The completed task
+            task (asyncio.Task): The completed task, returning one result or a list of
+                results when it ran a micro-batch
+            start_time (float, optional): `time.monotonic()` when the task was dispatched
 
         Updates:
             - Job counters (completed, failed, etc.)
             - Output queue
+            - Result stream, if attached
             - Semaphore
         """
-        result = await task
-        async with self.lock:
-            await self.job_output.put(result)
-            self.total_count += 1
-            task_status = result.get(RECORD_STATUS)
-            # Update counters based on task status
-            if task_status == STATUS_COMPLETED:
-                self.completed_count += 1
-            elif task_status == STATUS_DUPLICATE:
-                self.duplicate_count += 1
-            elif task_status == STATUS_FILTERED:
-                self.filtered_count += 1
-            elif task_status == STATUS_FAILED:
-                self.failed_count += 1
-                # Safely extract error information with better type checking
-                err_output = result.get("err", [{}])[0]  # Default to empty dict if no error
-                err_str = err_output.get("err_str", "Unknown error").strip()  # Clean up whitespace
-
-                # Normalize error string for consistent counting
-                normalized_err = err_str.lower().strip()
-                self.err_type_counter[normalized_err] = self.err_type_counter.get(normalized_err, 0) + 1
-                # Optionally log the error count for this type
-                logger.debug(f"Error type '{normalized_err}' count: {self.err_type_counter[normalized_err]}")
-            # await self._update_progress(task_status, STATUS_MOJO_MAP[task_status])
+        try:
+            task_result = await task
+            latency = time.monotonic() - start_time if start_time is not None else None
+            results = task_result if isinstance(task_result, list) else [task_result]
+            async with self.lock:
+                for result in results:
+                    await self._record_task_result(result)
+                    if result.get("cached"):
+                        # Served without calling the function, says nothing about the load it can take
+                        continue
+                    # Feed the outcome to the concurrency limit (adjusts it in auto mode)
+                    err_output = (result.get("err") or [None])[0] or {}
+                    self.semaphore.record(result.get(RECORD_STATUS), err_output.get("err_str"), latency)
+                # await self._update_progress(task_status, STATUS_MOJO_MAP[task_status])
+            if self.input_feeder:
+                for result in results:
+                    if self._is_result_final(result):
+                        self.input_feeder.mark_final(result.get(IDX), result)
+            if self.result_stream:
+                # Publish before releasing the slot, so a slow consumer throttles the job
+                for result in results:
+                    await self.result_stream.publish(result, is_final=self._is_result_final(result))
+        except Exception as e:
+            # The job cannot keep its results (e.g. the output failed to spill to disk): stop it with the error
+            logger.error(f"Failed to handle a task result, stopping the job: {e}")
+            if self.job_error is None:
+                self.job_error = e
+        finally:
             self.semaphore.release()
+            self.in_flight_count -= 1
+            self._notify_dispatcher()
+
+    def _is_result_final(self, result) -> bool:
+        """Return True if no further attempt will be made for the input of a task result."""
+        if result.get(RECORD_STATUS) == STATUS_COMPLETED:
+            return True
+        # Non-completed inputs are requeued before the result is handled, unless they hit the dead queue
+        return self.task_failure_count.get(str(result.get(IDX)), 0) >= self.job_config.dead_queue_threshold
+
+    async def _record_task_result(self, result):
+        """Add one task result to the output queue and update the counters."""
+        await self.job_output.put(result)
+        self.total_count += 1
+        if result.get("usage") is not None:
+            self.budget.record(Usage.from_dict(result["usage"]))
+        task_status = result.get(RECORD_STATUS)
+        self.stop_tracker.record(task_status)
+        if self.checkpointer and self._is_result_final(result):
+            self.checkpointer.record_result()
+        # Update counters based on task status
+        if task_status == STATUS_COMPLETED:
+            self.completed_count += 1
+        elif task_status == STATUS_DUPLICATE:
+            self.duplicate_count += 1
+        elif task_status == STATUS_FILTERED:
+            self.filtered_count += 1
+        elif task_status == STATUS_FAILED:
+            self.failed_count += 1
+            # Safely extract error information with better type checking
+            err_output = result.get("err", [{}])[0]  # Default to empty dict if no error
+            err_str = err_output.get("err_str", "Unknown error").strip()  # Clean up whitespace
+
+            # Normalize error string for consistent counting
+            normalized_err = err_str.lower().strip()
+            self.err_type_counter[normalized_err] = self.err_type_counter.get(normalized_err, 0) + 1
+            # Optionally log the error count for this type
+            logger.debug(f"Error type '{normalized_err}' count: {self.err_type_counter[normalized_err]}")
 
     # ====================
     # Cleanup & Utilities
@@ -284,7 +708,49 @@ class JobManager:
         """Clean up resources after job completion."""
         await self._del_progress_ticker()
         await self._del_running_tasks()
+        await self._wait_completion_tasks()
         await self._cancel_operations()
+        await self._close_executors()
+        if isinstance(self.input_feeder, LeaseFeeder):
+            await self.input_feeder.close()
+        for hook in self._dedup_hooks():
+            hook.close()
+        if self.checkpointer:
+            # Once no task runs, so the checkpoint holds every result of the run
+            await self.checkpointer.stop()
+        if self.metrics_exporter:
+            # Last, so the final snapshot holds the results of every task
+            await self.metrics_exporter.stop()
+
+    def _dedup_hooks(self) -> List[NearDuplicateHook]:
+        return [hook for hook in self.job_config.on_record_complete if isinstance(hook, NearDuplicateHook)]
+
+    def _open_dedup_hooks(self):
+        """Open the index of the near-duplicate hooks, persisted next to the master job when the storage allows it.
+
+        With a lease queue, every worker appends to an index file of its own and follows those of the others.
+        """
+        for hook in self._dedup_hooks():
+            hook.open(self.storage, self.master_job_id, worker_id=self.worker_id if self.lease_queue else None)
+
+    def _reset_batched_hooks(self):
+        """Reset the batched hooks, whose batches may have been left by a stopped job in another event loop."""
+        for hook in self.job_config.on_record_complete + self.job_config.on_record_error:
+            if isinstance(hook, BatchedHook):
+                hook.reset()
+
+    async def _collect_results_of_other_workers(self):
+        """Add the results committed by the other workers of the lease queue to the job output.
+
+        The records are read back from storage, so the process that started the job returns
+        the output of the whole master job.
+        """
+        for item in await self.storage.list_work_items(self.master_job_id, status_filter=["done"]):
+            if item.lease_owner == self.worker_id:
+                continue
+            output = [await self.storage.get_record_data(output_ref) for output_ref in item.output_refs]
+            err_output = {"err_str": f"Failed in worker {item.lease_owner}"} if item.result_status == STATUS_FAILED else {}
+            await self._record_task_result(self._create_task_result(item.item_idx, item.result_status, item.output_refs, output, err_output))
 
     async def _del_running_tasks(self):
         """Cancel all running tasks."""
@@ -292,6 +758,10 @@ class JobManager:
             task.cancel()
         await asyncio.gather(*self.running_tasks, return_exceptions=True)
 
+    async def _wait_completion_tasks(self):
+        """Wait for the completion handling of the tasks that finished before the job stopped."""
+        await asyncio.gather(*self.completion_tasks, return_exceptions=True)
+
     async def _cancel_operations(self):
         """Cancel all active operations."""
         for task in self.active_operations:
@@ -312,7 +782,7 @@ class JobManager:
             job_id=job_uuid,
             master_job_id=self.master_job_id,
             status="pending",
-            worker_id="test-worker-1",
+            worker_id=self.worker_id,
             run_config=input_data_str,
             run_config_hash=hashlib.sha256(input_data_str.encode()).hexdigest(),
         )
@@ -323,7 +793,8 @@ class JobManager:
         task = asyncio.create_task(self._job_save_record_data(*args, **kwargs))
         self.active_operations.add(task)
         try:
-            return await task
+            with self.metrics.time(PHASE_STORAGE_SAVE):
+                return await task
         finally:
             self.active_operations.discard(task)
 
@@ -336,15 +807,18 @@ class JobManager:
         if storage_class_name == "LocalStorage":
             job_uuid = str(uuid.uuid4())
             await self._create_execution_job(job_uuid, input_data)
+            # Record metadata is built from explicit fields, the output records are never modified
             for i, record in enumerate(records):
                 record_uid = str(uuid.uuid4())
                 output_ref = await self.storage.save_record_data(record_uid, self.master_job_id, job_uuid, record)
-                record["job_id"] = job_uuid
-                record["master_job_id"] = self.master_job_id
-                record["status"] = task_status
-                record["output_ref"] = output_ref
-                record["end_time"] = datetime.datetime.now(datetime.timezone.utc)
-                record_model = Record(**record)
+                record_model = Record(
+                    record_uid=record_uid,
+                    job_id=job_uuid,
+                    master_job_id=self.master_job_id,
+                    status=task_status,
+                    output_ref=output_ref,
+                    end_time=datetime.datetime.now(datetime.timezone.utc),
+                )
                 await self.storage.log_record_metadata(record_model)
                 logger.debug(f"  - Saved data for record {i}: {output_ref}")
                 output_ref_list.append(output_ref)
@@ -373,17 +847,18 @@ class JobManager:
         logger.debug("  - Marked execution job as completed")
 
     def _is_job_to_stop(self) -> bool:
-        # Immutable Snapshot: Creates a snapshot of the queue at the time of the list() call, so modifications to the queue during iteration won't affect the loop.
-        job_output_list = list(self.job_output._queue)
-        queue_size = len(job_output_list)
-        if queue_size == 0:
+        # Constant time: relies on the running counters and the stop tracker instead of snapshotting job_output
+        if self.job_error is not None:
+            return True
+        if self.job_output.qsize() == 0:
             return False
 
-        items = []
-        for _ in range(min(self.job_config.job_run_stop_threshold, queue_size)):
-            items.append(job_output_list[-1])
+        if self.circuit_breaker and self.circuit_breaker.is_exhausted():
+            return True
+        if self.budget.is_exhausted(getattr(self, "in_flight_count", 0)):
+            return True
 
-        consecutive_not_completed = len(items) == self.job_config.job_run_stop_threshold and all(item[RECORD_STATUS] != STATUS_COMPLETED for item in items)
+        consecutive_not_completed = self.stop_tracker.is_consecutive_not_completed()
 
         if consecutive_not_completed:
             logger.error(
@@ -391,14 +866,21 @@ class JobManager:
                 f"stopping this job; please adjust factory config and input data then "
                 f"resume_from_checkpoint({self.master_job_id})"
             )
+        if self.job_config.target_count == 0:
+            # Lazy input without a target: the job runs until the input source is exhausted
+            return consecutive_not_completed
         target_not_reach_count = self.job_config.target_count - self.completed_count
         completed_tasks_reach_target = target_not_reach_count <= 0
-        if target_not_reach_count > 0 and target_not_reach_count == self.dead_queue_count:
+        if target_not_reach_count > 0 and target_not_reach_count == self.dead_queue_count and not self._has_more_input():
             logger.warning(f"there are {target_not_reach_count} input data not able to process, pls remove them")
             completed_tasks_reach_target = True
 
         return consecutive_not_completed or completed_tasks_reach_target
 
+    def _has_more_input(self) -> bool:
+        """Return True if the lazy input source may still provide records."""
+        return bool(self.input_feeder) and self.input_feeder.has_more()
+
     # ====================
     # Progress Tracking
     # ====================
@@ -409,9 +891,12 @@ class JobManager:
             logger.info(
                 f"[JOB PROGRESS] "
                 f"\033[32mCompleted: {self.completed_count}/{self.job_config.target_count}\033[0m | "
-                f"\033[33mRunning: {self.job_config.max_concurrency - self.semaphore._value}\033[0m | "
+                f"\033[33mRunning: {self.semaphore.in_use}/{self.semaphore.limit}\033[0m | "
+                f"{self._executor_utilization()}"
+                f"{self._usage_progress()}"
                 f"\033[36mAttempted: {self.total_count}\033[0m"
                 f"    (\033[32mCompleted: {self.completed_count}\033[0m, "
+                f"{self._cache_progress()}"
                 f"\033[31mFailed: {self.failed_count}\033[0m, "
                 f"\033[35mFiltered: {self.filtered_count}\033[0m, "
                 f"\033[34mDuplicate: {self.duplicate_count}\033[0m, "
@@ -419,6 +904,20 @@ class JobManager:
             )
             await asyncio.sleep(PROGRESS_LOG_INTERVAL)
 
+    def _executor_utilization(self) -> str:
+        """Return the thread pool usage for the progress log, empty if the function is not run in threads."""
+        thread_pool = self.task_runner.thread_pool
+        return f"\033[33m{thread_pool.utilization()}\033[0m | " if thread_pool is not None else ""
+
+    def _usage_progress(self) -> str:
+        """Return the LLM spend and its projection to the target for the progress log, empty before any LLM call."""
+        usage_progress = self.budget.format_progress(self.completed_count, self.job_config.target_count)
+        return f"\033[35m{usage_progress}\033[0m | " if usage_progress else ""
+
+    def _cache_progress(self) -> str:
+        """Return the number of inputs served from the result cache for the progress log, empty without a cache."""
+        return f"\033[32mCached: {self.result_cache.hit_count}\033[0m, " if self.result_cache else ""
+
     async def _del_progress_ticker(self):
         """Safely stop the progress ticker."""
         if self._progress_ticker_task:
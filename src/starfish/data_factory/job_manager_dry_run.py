@@ -1,9 +1,11 @@
 from asyncio import Queue
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Optional
 
 from starfish.common.logger import get_logger
 from starfish.data_factory.job_manager import JobManager
 from starfish.data_factory.storage.base import Storage
+from starfish.data_factory.utils.input_scheduler import InputScheduler
+from starfish.data_factory.utils.input_source import InputFeeder
 from starfish.data_factory.utils.state import MutableSharedState
 
 logger = get_logger(__name__)
@@ -29,7 +31,16 @@ class JobManagerDryRun(JobManager):
         Inherits all attributes from JobManager.
     """
 
-    def __init__(self, master_job_config: Dict[str, Any], state: MutableSharedState, storage: Storage, user_func: Callable, input_data_queue: Queue = None):
+    def __init__(
+        self,
+        master_job_config: Dict[str, Any],
+        state: MutableSharedState,
+        storage: Storage,
+        user_func: Callable,
+        input_data_queue: Queue = None,
+        input_feeder: InputFeeder = None,
+        func_pickle: Optional[bytes] = None,
+    ):
         """Initialize the JobManager with job configuration and storage.
 
         Args:
@@ -43,8 +54,10 @@ class JobManagerDryRun(JobManager):
             storage: Storage instance for persisting job results and metadata
             user_func: User-defined function to execute for each task
             input_data_queue: Queue containing input data for the job. Defaults to None.
+            input_feeder: Feeder of a lazy input source. Only its first record is used.
+            func_pickle: The function already pickled with cloudpickle, for the worker processes.
         """
-        super().__init__(master_job_config, state, storage, user_func, input_data_queue)
+        super().__init__(master_job_config, state, storage, user_func, input_data_queue, input_feeder, func_pickle)
 
     async def setup_input_output_queue(self):
         """Initialize input/output queues for dry run.
@@ -57,7 +70,11 @@ class JobManagerDryRun(JobManager):
         Note:
             The dry run will only process one task regardless of the input queue size.
         """
+        if self.input_feeder:
+            # Only the first record of a lazy input is needed
+            await self.input_feeder.feed(self.job_input_queue, 1)
+            self.input_feeder = None
         first_item = await self.job_input_queue.get()
-        self.job_input_queue = Queue()
+        self.job_input_queue = InputScheduler(self.job_input_queue.policy)
         await self.job_input_queue.put(first_item)
         self.job_config.target_count = 1
@@ -1,7 +1,7 @@
 import hashlib
 import json
 import asyncio
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Optional
 import copy  # Added this import at the top of the file
 
 from starfish.common.logger import get_logger
@@ -12,6 +12,7 @@ from starfish.data_factory.constants import (
 )
 from starfish.data_factory.job_manager import JobManager
 from starfish.data_factory.storage.base import Storage
+from starfish.data_factory.utils.input_source import InputFeeder
 from starfish.data_factory.utils.state import MutableSharedState
 
 logger = get_logger(__name__)
@@ -44,7 +45,14 @@ class JobManagerRerun(JobManager):
     """
 
     def __init__(
-        self, master_job_config: Dict[str, Any], state: MutableSharedState, storage: Storage, user_func: Callable, input_data_queue: asyncio.Queue = None
+        self,
+        master_job_config: Dict[str, Any],
+        state: MutableSharedState,
+        storage: Storage,
+        user_func: Callable,
+        input_data_queue: asyncio.Queue = None,
+        input_feeder: InputFeeder = None,
+        func_pickle: Optional[bytes] = None,
     ):
         """Initialize the JobManager with job configuration and storage.
 
@@ -59,8 +67,12 @@ class JobManagerRerun(JobManager):
             storage: Storage instance for persisting job results and metadata
             user_func: User-defined function to execute for each task
             input_data_queue: asyncio.Queue containing input data for the job. Defaults to an empty Queue.
+            input_feeder: Feeder of a lazy input source, positioned where the previous run stopped.
+            func_pickle: The function already pickled with cloudpickle, for the worker processes.
         """
-        super().__init__(master_job_config, state, storage, user_func, input_data_queue)
+        super().__init__(master_job_config, state, storage, user_func, input_data_queue, input_feeder, func_pickle)
+        # Hashes of the results restored from storage, checked instead of scanning job_output (spill files included)
+        self._restored_hashes = set()
 
     async def setup_input_output_queue(self):
         """Initialize input/output queues for job resume."""
@@ -74,6 +86,12 @@ class JobManagerRerun(JobManager):
         # Initialize counters from previous run
         self._initialize_counters_rerun(master_job, len(input_data))
 
+        if self.input_feeder:
+            # Lazy input: completed records stay in storage, the feeder continues from its
+            # read position after the records that never became final
+            self.input_feeder.requeue_pending()
+            return
+
         # Process input data and handle completed tasks
         input_data_hashed = self._process_input_data(input_data)
         await self._handle_completed_tasks(input_data_hashed)
@@ -113,7 +131,11 @@ class JobManagerRerun(JobManager):
         self.duplicate_count = master_job["duplicate_count"]
         self.filtered_count = master_job["filtered_count"]
         self.completed_count = master_job["completed_count"]
-        self.job_config.target_count = input_data_length
+        # The spend of the previous runs counts against max_cost / max_tokens and in the summary
+        self.budget.restore(master_job.get("budget"))
+        if not self.input_feeder:
+            # A lazy input keeps the configured target (0 runs until the source is exhausted)
+            self.job_config.target_count = input_data_length
 
     def _process_input_data(self, input_data: list) -> list:
         """Process input data and create a hash map for tracking."""
@@ -166,9 +188,11 @@ class JobManagerRerun(JobManager):
             logger.warning(f" can not process completed_task {input_data_idx} in resume; error is  {str(e)}")
             return
 
-        # Check if output_tmp already exists in job_output
-        if output_tmp not in self.job_output._queue:  # Access the internal queue for checking
-            await self.job_output.put(output_tmp)  # Use await with asyncio.Queue
+        # Check if output_tmp was already restored
+        output_hash = hashlib.sha256(json.dumps(output_tmp, sort_keys=True, default=str).encode()).hexdigest()
+        if output_hash not in self._restored_hashes:
+            self._restored_hashes.add(output_hash)
+            await self.job_output.put(output_tmp)
         else:
             logger.debug("db record duplicated")
 
@@ -0,0 +1,285 @@
+import asyncio
+import inspect
+import itertools
+import math
+import multiprocessing
+import pickle
+import threading
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+import cloudpickle
+
+from starfish.common.logger import get_logger
+from starfish.llm.proxy.rate_limiter import get_rate_limits, share_rate_limits
+from starfish.llm.proxy.usage import Usage, get_current_usage, track_usage
+
+logger = get_logger(__name__)
+
+# Worker processes replaced per pool before the pool gives up (a function crashing every worker)
+MAX_WORKER_RESTARTS = 10
+
+_CALL = "call"
+_CANCEL = "cancel"
+_STOP = "stop"
+_RESULT = "result"
+
+
+def _portable_error(error: BaseException) -> BaseException:
+    """Return the error if it survives pickling, otherwise a RuntimeError carrying its message."""
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        portable = RuntimeError(f"{type(error).__name__}: {error}\n{''.join(traceback.format_exception(error))}")
+        status_code = getattr(error, "status_code", None)
+        if status_code is not None:
+            portable.status_code = status_code
+        return portable
+
+
+async def _serve(conn, func: Callable, concurrency: int) -> None:
+    """Run the calls received from the parent on this worker's event loop, `concurrency` at a time."""
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: Dict[int, asyncio.Task] = {}
+
+    async def run_call(call_id: int, kwargs: Dict[str, Any]) -> None:
+        # The LLM usage of the call is sent back with its result, to be accounted to the task in the parent
+        with track_usage() as usage:
+            try:
+                async with semaphore:
+                    result = func(**kwargs)
+                    if inspect.isawaitable(result):
+                        result = await result
+                message = (_RESULT, call_id, True, result, usage.to_dict())
+            except asyncio.CancelledError:
+                message = (_RESULT, call_id, False, _portable_error(asyncio.CancelledError()), usage.to_dict())
+            except Exception as e:
+                message = (_RESULT, call_id, False, _portable_error(e), usage.to_dict())
+        try:
+            conn.send(message)
+        except Exception as e:
+            conn.send((_RESULT, call_id, False, _portable_error(e), usage.to_dict()))
+        finally:
+            tasks.pop(call_id, None)
+
+    while True:
+        message = await loop.run_in_executor(None, conn.recv)
+        if message[0] == _STOP:
+            break
+        if message[0] == _CANCEL:
+            task = tasks.get(message[1])
+            if task:
+                task.cancel()
+        elif message[0] == _CALL:
+            _, call_id, kwargs = message
+            tasks[call_id] = asyncio.create_task(run_call(call_id, kwargs))
+
+    for task in list(tasks.values()):
+        task.cancel()
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
+def _worker_main(conn, func_pickle: bytes, concurrency: int, rate_limits: Dict[str, Dict[str, Any]], workers: int) -> None:
+    """Entry point of a worker process: unpickle the function once and serve calls.
+
+    The rate limits of the parent are divided between the workers, so that together they
+    stay within the process-wide limit.
+    """
+    share_rate_limits(rate_limits, workers)
+    func = cloudpickle.loads(func_pickle)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(_serve(conn, func, concurrency))
+    except (EOFError, KeyboardInterrupt):
+        # The parent went away
+        pass
+    finally:
+        loop.close()
+        conn.close()
+
+
+class _Worker:
+    """Parent-side handle of a worker process."""
+
+    def __init__(self, index: int, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.in_flight = 0
+        self.send_lock = threading.Lock()
+        self.reader: Optional[threading.Thread] = None
+
+
+class ProcessPool:
+    """Runs the user function in worker processes, each with its own event loop.
+
+    The function is pickled once with cloudpickle (or the bytes saved with the request
+    config are reused) and sent to worker processes started with "spawn". Calls are
+    sharded to the least busy worker, and every worker runs up to its share of the
+    concurrency budget at the same time (async functions interleave on the worker's
+    loop, sync functions run one at a time). Results and errors are sent back to the
+    parent, where the job manager keeps the counters, the retries and the dead queue.
+    The LLM usage of a call is tracked in the worker and accounted to the `track_usage()`
+    block of the task that submitted it. A worker that exits (out of memory, crash) fails
+    its pending calls and is replaced, up to MAX_WORKER_RESTARTS times per pool. The rate
+    limits set in the parent when the pool starts are divided evenly between the workers.
+
+    Attributes:
+        workers (int): Number of worker processes
+        concurrency_per_worker (int): Calls a worker runs at the same time
+    """
+
+    def __init__(self, func: Callable, workers: int, concurrency: int, func_pickle: Optional[bytes] = None):
+        """Initialize the pool.
+
+        Args:
+            func: The user function
+            workers: Number of worker processes
+            concurrency: Total concurrency budget, shared evenly between the workers
+            func_pickle: The function already pickled with cloudpickle, if available
+        """
+        self.workers = workers
+        self.concurrency_per_worker = max(1, math.ceil(concurrency / workers))
+        self._func_pickle = func_pickle or cloudpickle.dumps(func)
+        self._workers: List[_Worker] = []
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._call_ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._rate_limits: Dict[str, Dict[str, Any]] = {}
+        self._restarts = 0
+        self._closed = False
+
+    def start(self) -> None:
+        """Start the worker processes, bound to the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._rate_limits = get_rate_limits()
+        for i in range(self.workers):
+            self._spawn_worker(i)
+        logger.debug(f"Started {self.workers} worker processes, {self.concurrency_per_worker} concurrent calls each")
+
+    def _spawn_worker(self, index: int) -> None:
+        # Not forked: the reader threads (and any thread of the job) would be copied in an unknown state
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=_worker_main,
+            args=(child_conn, self._func_pickle, self.concurrency_per_worker, self._rate_limits, self.workers),
+            name=f"starfish-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(index, process, parent_conn)
+        worker.reader = threading.Thread(target=self._read_results, args=(worker,), daemon=True)
+        worker.reader.start()
+        self._workers.append(worker)
+
+    def _read_results(self, worker: _Worker) -> None:
+        """Forward the results of a worker to the event loop (runs in a reader thread)."""
+        while True:
+            try:
+                message = worker.conn.recv()
+            except (EOFError, OSError):
+                break
+            except Exception as e:
+                logger.error(f"Cannot read a result from worker {worker.process.name}: {e}")
+                continue
+            self._call_in_loop(self._resolve, worker, message)
+        # The pipe is closed once the process exits: wait for it so that its exit code is known
+        worker.process.join(5)
+        self._call_in_loop(self._fail_worker, worker)
+
+    def _call_in_loop(self, callback: Callable, *args) -> None:
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The event loop of the job is closed, nobody is waiting for the result
+            pass
+
+    def _resolve(self, worker: _Worker, message) -> None:
+        _, call_id, ok, value, usage = message
+        worker.in_flight -= 1
+        future = self._futures.pop(call_id, None)
+        if future is None:
+            return
+        if future.usage is not None:
+            # Also accounted when the call was cancelled in the parent: its LLM calls were made
+            future.usage.add(Usage.from_dict(usage))
+        if future.done():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _fail_worker(self, worker: _Worker) -> None:
+        """Fail the pending calls of a worker whose process exited and start a new worker in its place."""
+        if self._closed or worker not in self._workers:
+            return
+        self._workers.remove(worker)
+        worker.conn.close()
+        logger.error(f"Worker process {worker.process.name} exited with code {worker.process.exitcode}")
+        for call_id, future in list(self._futures.items()):
+            if getattr(future, "worker", None) is worker:
+                del self._futures[call_id]
+                if not future.done():
+                    future.set_exception(RuntimeError(f"Worker process {worker.process.name} exited"))
+        if self._restarts >= MAX_WORKER_RESTARTS:
+            logger.error(f"Worker processes exited {self._restarts + 1} times, worker {worker.process.name} is not replaced")
+            return
+        self._restarts += 1
+        try:
+            self._spawn_worker(worker.index)
+        except Exception as e:
+            logger.error(f"Cannot replace worker process {worker.process.name}: {e}")
+
+    def _send(self, worker: _Worker, message) -> None:
+        with worker.send_lock:
+            worker.conn.send(message)
+
+    async def submit(self, kwargs: Dict[str, Any]) -> Any:
+        """Run one call of the function in the least busy worker and return its result.
+
+        Raises:
+            RuntimeError: If no worker process is alive
+            Exception: The error raised by the function in the worker
+        """
+        if not self._workers:
+            raise RuntimeError(f"No worker process is running, worker processes exited {self._restarts + 1} times")
+        worker = min(self._workers, key=lambda w: w.in_flight)
+        call_id = next(self._call_ids)
+        future = self._loop.create_future()
+        future.worker = worker
+        future.usage = get_current_usage()
+        self._futures[call_id] = future
+        worker.in_flight += 1
+        self._send(worker, (_CALL, call_id, kwargs))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Timed out or cancelled in the parent: stop the call in the worker too
+            if call_id in self._futures:
+                self._send(worker, (_CANCEL, call_id))
+            raise
+
+    async def close(self) -> None:
+        """Stop the workers and wait for them to exit."""
+        self._closed = True
+        for worker in list(self._workers):
+            try:
+                self._send(worker, (_STOP,))
+            except (BrokenPipeError, OSError):
+                pass
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            await self._loop.run_in_executor(None, worker.process.join, 5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        for future in self._futures.values():
+            if not future.done():
+                future.cancel()
+        self._futures.clear()
@@ -13,6 +13,9 @@ from starfish.data_factory.storage.models import (
     StatusRecord,
 )
 
+# Capability flag of the backends able to keep index files next to a master job (generate_index_path)
+INDEX_FILE_CAPABILITY = "INDEX_FILE"
+
 
 class Storage(ABC):
     """Abstract Base Class for persistent storage backend implementations.
@@ -50,6 +50,10 @@ class InMemoryStorage(Storage):
         """geenrate request config path, return reference."""
         pass
 
+    async def get_request_config(self, config_ref: str) -> Dict[str, Any]:
+        """Retrieve request config from reference."""
+        return {}
+
     # Data Artifact Persistence
     async def save_record_data(self, record_uid: str, master_job_id: str, job_id: str, data: Dict[str, Any]) -> str:
         # Pass necessary IDs if data handler needs them for pathing (though current uses record_uid)
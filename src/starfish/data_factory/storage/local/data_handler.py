@@ -18,6 +18,7 @@ logger = logging.getLogger(__name__)
 CONFIGS_DIR = "configs"
 DATA_DIR = "data"
 ASSOCIATIONS_DIR = "associations"
+INDEXES_DIR = "indexes"
 
 
 class FileSystemDataHandler:
@@ -31,6 +32,7 @@ class FileSystemDataHandler:
         self.config_path = os.path.join(self.data_base_path, CONFIGS_DIR)
         self.record_data_path = os.path.join(self.data_base_path, DATA_DIR)
         self.assoc_path = os.path.join(self.data_base_path, ASSOCIATIONS_DIR)
+        self.index_path = os.path.join(self.data_base_path, INDEXES_DIR)
         # TODO: Consider locks if implementing JSONL appends for associations
 
     async def ensure_base_dirs(self):
@@ -85,6 +87,10 @@ class FileSystemDataHandler:
         path = os.path.join(self.config_path, f"{master_job_id}.request.json")
         return path  # Return absolute path as the reference
 
+    def generate_index_path_impl(self, master_job_id: str, name: str) -> str:
+        """Return the path of an index file of a master job, in its directory under the index path."""
+        return os.path.join(self.index_path, master_job_id, name)
+
     async def get_request_config_impl(self, config_ref: str) -> Dict[str, Any]:
         return await self._read_json_file(config_ref)  # Assumes ref is absolute path
 
@@ -2,8 +2,9 @@
 import datetime
 import logging
 import os
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+from starfish.common.tracing import traced_methods
 from starfish.data_factory.storage.base import Storage, register_storage
 from starfish.data_factory.storage.local.data_handler import FileSystemDataHandler
 from starfish.data_factory.storage.local.metadata_handler import SQLiteMetadataHandler
@@ -14,17 +15,21 @@ from starfish.data_factory.storage.models import (  # Import Pydantic models
     Project,
     Record,
     StatusRecord,
+    WorkItem,
 )
 
 logger = logging.getLogger(__name__)
 
 
+@traced_methods
 class LocalStorage(Storage):
     """Hybrid Local Storage Backend using SQLite for metadata and local JSON files
     for data artifacts and large configurations. Facade over internal handlers.
+
+    Every public method is traced as a span (see starfish.common.tracing).
     """
 
-    capabilities: Set[str] = {"QUERY_METADATA", "FILTER_STATUS", "STORE_LARGE_CONFIG"}
+    capabilities: Set[str] = {"QUERY_METADATA", "FILTER_STATUS", "STORE_LARGE_CONFIG", "LEASE_QUEUE", "INDEX_FILE", "RESULT_CACHE"}
 
     def __init__(self, storage_uri: str, data_storage_uri_override: Optional[str] = None):
         logger.info(f"Initializing LocalStorage with URI: {storage_uri}")
@@ -72,6 +77,10 @@ class LocalStorage(Storage):
     def generate_request_config_path(self, master_job_id: str) -> str:
         return self._data_handler.generate_request_config_path_impl(master_job_id)
 
+    def generate_index_path(self, master_job_id: str, name: str) -> str:
+        """Return the path of an index file kept next to the master job (INDEX_FILE capability)."""
+        return self._data_handler.generate_index_path_impl(master_job_id, name)
+
     async def get_request_config(self, config_ref: str) -> Dict[str, Any]:
         return await self._data_handler.get_request_config_impl(config_ref)
 
@@ -154,6 +163,44 @@ class LocalStorage(Storage):
     async def list_record_metadata(self, master_job_uuid: str, job_uuid: str) -> List[Record]:
         return await self._metadata_handler.list_record_metadata_impl(master_job_uuid, job_uuid)
 
+    # Lease queue (LEASE_QUEUE capability)
+    async def enqueue_work_items(self, master_job_id: str, items: List[Dict[str, Any]]) -> None:
+        """Store the inputs of a master job as pending work items; items already stored are kept."""
+        await self._metadata_handler.enqueue_work_items_impl(master_job_id, items)
+
+    async def claim_work_items(self, master_job_id: str, worker_id: str, limit: int, lease_timeout: float) -> List[Dict[str, Any]]:
+        """Lease up to `limit` pending items, or items whose lease expired, and return their inputs."""
+        return await self._metadata_handler.claim_work_items_impl(master_job_id, worker_id, limit, lease_timeout)
+
+    async def renew_work_item_leases(self, master_job_id: str, worker_id: str, item_idx_list: List[int], lease_timeout: float) -> None:
+        """Extend the leases the worker still holds by `lease_timeout` seconds from now."""
+        await self._metadata_handler.renew_work_item_leases_impl(master_job_id, worker_id, item_idx_list, lease_timeout)
+
+    async def complete_work_items(self, master_job_id: str, worker_id: str, results: List[Tuple[int, str, List[str]]]) -> None:
+        """Mark items done with their (item_idx, result_status, output_refs); the first commit of an item wins."""
+        await self._metadata_handler.complete_work_items_impl(master_job_id, worker_id, results)
+
+    async def release_work_items(self, master_job_id: str, worker_id: str, item_idx_list: List[int]) -> None:
+        """Give the leases the worker holds back to the queue, so other workers claim them at once."""
+        await self._metadata_handler.release_work_items_impl(master_job_id, worker_id, item_idx_list)
+
+    async def count_work_items(self, master_job_id: str) -> Dict[str, int]:
+        """Count the work items of a master job by lease status."""
+        return await self._metadata_handler.count_work_items_impl(master_job_id)
+
+    async def list_work_items(self, master_job_id: str, status_filter: Optional[List[str]] = None) -> List[WorkItem]:
+        """List the work items of a master job by input index."""
+        return await self._metadata_handler.list_work_items_impl(master_job_id, status_filter)
+
+    # Result cache (RESULT_CACHE capability)
+    async def get_cached_result(self, cache_key: str) -> Optional[str]:
+        """Return the cached output (JSON) of a key and mark it as recently used, None if not cached."""
+        return await self._metadata_handler.get_cached_result_impl(cache_key)
+
+    async def put_cached_result(self, cache_key: str, output: str, max_bytes: int) -> None:
+        """Cache an output (JSON), evicting the least recently used ones once the cache holds more than max_bytes."""
+        await self._metadata_handler.put_cached_result_impl(cache_key, output, max_bytes)
+
 
 @register_storage("local")
 def create_local_storage(storage_uri: str, data_storage_uri_override: Optional[str] = None) -> LocalStorage:
@@ -1,17 +1,20 @@
 # synthetic_data_gen/storage/local/metadata.py
 import asyncio  # For Lock
-from contextlib import nullcontext
+from contextlib import asynccontextmanager, nullcontext
 import datetime
 import json
 import logging
 import os
 import random
+import time
 from typing import Any, Dict, List, Optional, Tuple
 
 import aiosqlite
 import sqlite3
 
+from starfish.common.tracing import span
 from starfish.data_factory.constants import (
+    IDX,
     STATUS_COMPLETED,
     STATUS_DUPLICATE,
     STATUS_FAILED,
@@ -26,6 +29,7 @@ from starfish.data_factory.storage.models import (  # Import Pydantic models
     Project,
     Record,
     StatusRecord,
+    WorkItem,
 )
 
 logger = logging.getLogger(__name__)
@@ -102,9 +106,19 @@ class SQLiteMetadataHandler:
         conn = await self.connect()  # Ensure connection exists
         await initialize_db_schema(conn)  # Call the setup function
 
+    @asynccontextmanager
+    async def _write_locked(self):
+        """Hold the write lock; the wait for it is traced as the SQLiteMetadataHandler._write_lock.wait span."""
+        with span("SQLiteMetadataHandler._write_lock.wait"):
+            await self._write_lock.acquire()
+        try:
+            yield
+        finally:
+            self._write_lock.release()
+
     async def _execute_sql(self, sql: str, params: tuple = ()):
         """Helper to execute write SQL with transactions."""
-        async with self._write_lock:
+        async with self._write_locked():
             conn = await self.connect()
             max_retries = 5  # Increased from 3
             base_retry_delay = 0.1  # Start with shorter delay
@@ -147,7 +161,7 @@ class SQLiteMetadataHandler:
 
     async def _execute_batch_sql(self, statements: List[Tuple[str, tuple]]):
         """Execute multiple SQL statements in a single transaction."""
-        async with self._write_lock:
+        async with self._write_locked():
             conn = await self.connect()
             try:
                 # Remove explicit BEGIN IMMEDIATE
@@ -480,12 +494,152 @@ class SQLiteMetadataHandler:
 
         return result
 
-    async def list_execution_jobs_by_master_id_and_config_hash_impl(self, master_job_id: str, config_hash: str, job_status: str) -> List[GenerationJob]:
-        sql = "SELECT * FROM GenerationJob WHERE master_job_id = ? AND run_config_hash = ? AND status = ?"
-        rows = await self._fetchall_sql(sql, (master_job_id, config_hash, job_status))
-        return [_row_to_pydantic(GenerationJob, row) for row in rows] if rows else []
+    # --- Lease queue of the inputs shared by the workers of a master job ---
 
-    async def list_record_metadata_impl(self, master_job_uuid: str, job_uuid: str) -> List[Record]:
-        sql = "SELECT * FROM Records WHERE master_job_id = ? AND job_id = ?"
-        rows = await self._fetchall_sql(sql, (master_job_uuid, job_uuid))
-        return [_row_to_pydantic(Record, row) for row in rows]
+    async def enqueue_work_items_impl(self, master_job_id: str, items: List[Dict[str, Any]]):
+        """Insert the inputs as pending work items, skipping the indexes already stored."""
+        statements = []
+        for item in items:
+            sql = "INSERT OR IGNORE INTO WorkItems (master_job_id, item_idx, payload, status) VALUES (?, ?, ?, 'pending');"
+            statements.append((sql, (master_job_id, item[IDX], json.dumps(item))))
+        await self._execute_batch_sql(statements)
+
+    async def claim_work_items_impl(self, master_job_id: str, worker_id: str, limit: int, lease_timeout: float) -> List[Dict[str, Any]]:
+        """Lease up to `limit` pending or expired items in one immediate transaction.
+
+        BEGIN IMMEDIATE takes the database write lock before the select, so two workers
+        (in this process or another one sharing the file) never claim the same item.
+        """
+        now = time.time()
+        async with self._write_locked():
+            conn = await self.connect()
+            try:
+                await conn.execute("BEGIN IMMEDIATE")
+                select_sql = """
+                    SELECT item_idx, payload FROM WorkItems
+                    WHERE master_job_id = ? AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < ?))
+                    ORDER BY item_idx LIMIT ?
+                """
+                async with conn.execute(select_sql, (master_job_id, now, limit)) as cursor:
+                    rows = await cursor.fetchall()
+                if rows:
+                    placeholders = ",".join("?" * len(rows))
+                    update_sql = f"""
+                        UPDATE WorkItems
+                        SET status = 'leased', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, last_update_time = ?
+                        WHERE master_job_id = ? AND item_idx IN ({placeholders})
+                    """
+                    params = (worker_id, now + lease_timeout, datetime.datetime.now(datetime.timezone.utc), master_job_id, *[row["item_idx"] for row in rows])
+                    await conn.execute(update_sql, params)
+                await conn.commit()
+            except Exception as e:
+                try:
+                    await conn.rollback()
+                except Exception:
+                    pass
+                logger.error(f"Claiming work items failed: Error: {e}", exc_info=True)
+                raise e
+        return [json.loads(row["payload"]) for row in rows]
+
+    async def renew_work_item_leases_impl(self, master_job_id: str, worker_id: str, item_idx_list: List[int], lease_timeout: float):
+        """Extend the leases a worker still holds on the given items by `lease_timeout` seconds from now."""
+        if not item_idx_list:
+            return
+        placeholders = ",".join("?" * len(item_idx_list))
+        sql = f"""
+            UPDATE WorkItems SET lease_expires_at = ?
+            WHERE master_job_id = ? AND lease_owner = ? AND status = 'leased' AND item_idx IN ({placeholders})
+        """
+        await self._execute_sql(sql, (time.time() + lease_timeout, master_job_id, worker_id, *item_idx_list))
+
+    async def complete_work_items_impl(self, master_job_id: str, worker_id: str, results: List[Tuple[int, str, List[str]]]):
+        """Mark items done with their result status and output references, in one transaction."""
+        # The first commit wins: an item finished twice after its lease expired keeps the first result
+        statements = []
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for item_idx, result_status, output_refs in results:
+            sql = """
+                UPDATE WorkItems
+                SET status = 'done', lease_owner = ?, lease_expires_at = NULL, result_status = ?, output_refs = ?, last_update_time = ?
+                WHERE master_job_id = ? AND item_idx = ? AND status != 'done';
+            """
+            statements.append((sql, (worker_id, result_status, json.dumps(output_refs or []), now, master_job_id, item_idx)))
+        await self._execute_batch_sql(statements)
+
+    async def release_work_items_impl(self, master_job_id: str, worker_id: str, item_idx_list: List[int]):
+        """Return the items still leased by a worker to pending, so any worker claims them at once."""
+        if not item_idx_list:
+            return
+        placeholders = ",".join("?" * len(item_idx_list))
+        sql = f"""
+            UPDATE WorkItems SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL
+            WHERE master_job_id = ? AND lease_owner = ? AND status = 'leased' AND item_idx IN ({placeholders})
+        """
+        await self._execute_sql(sql, (master_job_id, worker_id, *item_idx_list))
+
+    async def count_work_items_impl(self, master_job_id: str) -> Dict[str, int]:
+        """Count the work items of a master job by status."""
+        sql = "SELECT status, COUNT(*) as count FROM WorkItems WHERE master_job_id = ? GROUP BY status"
+        rows = await self._fetchall_sql(sql, (master_job_id,))
+        return {row["status"]: row["count"] for row in rows}
+
+    async def list_work_items_impl(self, master_job_id: str, status_filter: Optional[List[str]] = None) -> List[WorkItem]:
+        """List the work items of a master job ordered by index, optionally filtered by status."""
+        sql = "SELECT * FROM WorkItems WHERE master_job_id = ?"
+        params = [master_job_id]
+        if status_filter:
+            placeholders = ",".join("?" * len(status_filter))
+            sql += f" AND status IN ({placeholders})"
+            params.extend(status_filter)
+        sql += " ORDER BY item_idx"
+        rows = await self._fetchall_sql(sql, tuple(params))
+        return [_row_to_pydantic(WorkItem, row) for row in rows]
+
+    # --- Result cache shared across master jobs ---
+
+    async def get_cached_result_impl(self, cache_key: str) -> Optional[str]:
+        """Return the cached output of a key, None if missing, and refresh its last access time."""
+        row = await self._fetchone_sql("SELECT output FROM ResultCache WHERE cache_key = ?", (cache_key,))
+        if row is None:
+            return None
+        await self._execute_sql("UPDATE ResultCache SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key))
+        return row["output"]
+
+    async def put_cached_result_impl(self, cache_key: str, output: str, max_bytes: int):
+        """Store an output and evict the least recently used ones past max_bytes, in one immediate transaction."""
+        size_bytes = len(output.encode())
+        async with self._write_locked():
+            conn = await self.connect()
+            try:
+                await conn.execute("BEGIN IMMEDIATE")
+                async with conn.execute("SELECT size_bytes FROM ResultCache WHERE cache_key = ?", (cache_key,)) as cursor:
+                    row = await cursor.fetchone()
+                previous_bytes = row["size_bytes"] if row else 0
+                await conn.execute(
+                    "INSERT OR REPLACE INTO ResultCache (cache_key, output, size_bytes, last_access) VALUES (?, ?, ?, ?)",
+                    (cache_key, output, size_bytes, time.time()),
+                )
+                await conn.execute(
+                    "INSERT INTO ResultCacheSize (id, total_bytes) VALUES (0, ?) ON CONFLICT(id) DO UPDATE SET total_bytes = total_bytes + ?",
+                    (size_bytes, size_bytes - previous_bytes),
+                )
+                async with conn.execute("SELECT total_bytes FROM ResultCacheSize WHERE id = 0") as cursor:
+                    total_bytes = (await cursor.fetchone())["total_bytes"]
+                if total_bytes > max_bytes:
+                    evicted_keys, evicted_bytes = [], 0
+                    async with conn.execute("SELECT cache_key, size_bytes FROM ResultCache WHERE cache_key != ? ORDER BY last_access", (cache_key,)) as cursor:
+                        async for evicted in cursor:
+                            if total_bytes - evicted_bytes <= max_bytes:
+                                break
+                            evicted_keys.append(evicted["cache_key"])
+                            evicted_bytes += evicted["size_bytes"]
+                    await conn.executemany("DELETE FROM ResultCache WHERE cache_key = ?", [(key,) for key in evicted_keys])
+                    await conn.execute("UPDATE ResultCacheSize SET total_bytes = total_bytes - ? WHERE id = 0", (evicted_bytes,))
+                await conn.commit()
+            except Exception as e:
+                try:
+                    await conn.rollback()
+                except Exception:
+                    pass
+                logger.error(f"Caching result failed: Error: {e}", exc_info=True)
+                raise e
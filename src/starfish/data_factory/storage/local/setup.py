@@ -80,6 +80,39 @@ CREATE TABLE IF NOT EXISTS Records (
 );"""
 # Add CHECK constraints text explicitly if desired
 
+# Inputs of a master job run by several workers: a worker leases items until
+# lease_expires_at (epoch seconds), after which any worker may claim them again
+CREATE_WORK_ITEMS_SQL = """
+CREATE TABLE IF NOT EXISTS WorkItems (
+    master_job_id TEXT NOT NULL,
+    item_idx INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'leased', 'done')),
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_status TEXT,
+    output_refs TEXT,
+    last_update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (master_job_id, item_idx),
+    FOREIGN KEY (master_job_id) REFERENCES GenerationMasterJob(master_job_id) ON DELETE CASCADE
+);"""
+
+# Outputs of completed inputs, shared across master jobs and keyed by the fingerprint of
+# the function and of the input; the least recently used (last_access, epoch seconds)
+# are evicted once the total size_bytes, kept in ResultCacheSize, passes the limit
+CREATE_RESULT_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS ResultCache (
+    cache_key TEXT PRIMARY KEY,
+    output TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ResultCacheSize (
+    id INTEGER PRIMARY KEY CHECK(id = 0),
+    total_bytes INTEGER NOT NULL
+);"""
+
 # --- Indexes ---
 # (Add CREATE INDEX IF NOT EXISTS statements for FKs and commonly queried fields)
 CREATE_INDEXES_SQL = """
@@ -90,6 +123,8 @@ CREATE INDEX IF NOT EXISTS idx_execjobs_status ON GenerationJob(status);
 CREATE INDEX IF NOT EXISTS idx_records_master_id ON Records(master_job_id);
 CREATE INDEX IF NOT EXISTS idx_records_job_id ON Records(job_id);
 CREATE INDEX IF NOT EXISTS idx_records_status ON Records(status);
+CREATE INDEX IF NOT EXISTS idx_workitems_claim ON WorkItems(master_job_id, status, lease_expires_at);
+CREATE INDEX IF NOT EXISTS idx_resultcache_last_access ON ResultCache(last_access);
 """
 
 
@@ -103,6 +138,8 @@ async def initialize_db_schema(conn: aiosqlite.Connection):
             {CREATE_MASTER_JOBS_SQL}
             {CREATE_EXECUTION_JOBS_SQL}
             {CREATE_RECORDS_SQL}
+            {CREATE_WORK_ITEMS_SQL}
+            {CREATE_RESULT_CACHE_SQL}
             {CREATE_INDEXES_SQL}
         """)
         await conn.commit()
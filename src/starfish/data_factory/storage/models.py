@@ -11,6 +11,7 @@ from pydantic import BaseModel, Field, field_validator
 StatusMasterJob = Literal["pending", "running", "completed", "failed", "completed_with_errors", "cancelled"]
 StatusExecutionJob = Literal["pending", "running", "completed", "duplicate", "filtered", "failed", "cancelled"]
 StatusRecord = Literal["pending", "running", "completed", "duplicate", "filtered", "failed", "cancelled"]
+StatusWorkItem = Literal["pending", "leased", "done"]
 
 
 # Helper functions for default timestamps
@@ -63,6 +64,7 @@ class GenerationMasterJob(BaseModel):
         filtered_record_count: Count of filtered records.
         duplicate_record_count: Count of duplicate records.
         failed_record_count: Count of failed records.
+        summary: Final counts and LLM usage, saved when the job ends.
         creation_time: Job submission time.
         start_time: Time when first execution work began.
         end_time: Time when job reached terminal state.
@@ -85,6 +87,7 @@ class GenerationMasterJob(BaseModel):
     filtered_record_count: int = Field(default=0, description="Aggregate count of 'filtered' records.")
     duplicate_record_count: int = Field(default=0, description="Aggregate count of 'duplicate' records.")
     failed_record_count: int = Field(default=0, description="Aggregate count of 'failed' records.")
+    summary: Optional[Dict[str, Any]] = Field(None, description="Final counts and LLM usage, saved when the job ends.")
     creation_time: datetime.datetime = Field(default_factory=utc_now, description="Job submission time.")
     start_time: Optional[datetime.datetime] = Field(None, description="Time the first execution work began.")
     end_time: Optional[datetime.datetime] = Field(None, description="Time the job reached a terminal state.")
@@ -92,7 +95,7 @@ class GenerationMasterJob(BaseModel):
 
     # ruff: noqa
     # ruff: noformat
-    @field_validator("output_schema", mode="before")
+    @field_validator("output_schema", "summary", mode="before")
     def _parse_json_string(cls, value):
         if isinstance(value, str):
             try:
@@ -207,5 +210,49 @@ class Record(BaseModel):
         from_attributes = True
 
 
+class WorkItem(BaseModel):
+    """Represents one input of a master job in the lease queue shared by its workers.
+
+    Attributes:
+        master_job_id: Foreign key to GenerationMasterJob.
+        item_idx: Input index within the master job.
+        payload: The input record.
+        status: Pending, leased by a worker, or done.
+        lease_owner: Worker holding (or that last held) the lease.
+        lease_expires_at: Epoch seconds after which the lease may be claimed by another worker.
+        attempts: Number of times the item was claimed.
+        result_status: Final task status once done.
+        output_refs: References to the record data committed by the worker.
+        last_update_time: Last modification time.
+    """
+
+    master_job_id: str = Field(..., description="FK to GenerationMasterJob.")
+    item_idx: int = Field(..., description="Input index within the master job.")
+    payload: Dict[str, Any] = Field(..., description="The input record.")
+    status: StatusWorkItem = Field(default="pending", description="Lease status of the item.")
+    lease_owner: Optional[str] = Field(None, description="Worker holding (or that last held) the lease.")
+    lease_expires_at: Optional[float] = Field(None, description="Epoch seconds when the lease expires.")
+    attempts: int = Field(default=0, description="Number of times the item was claimed.")
+    result_status: Optional[str] = Field(None, description="Final task status once done.")
+    output_refs: list = Field(default_factory=list, description="References to the committed record data.")
+    last_update_time: datetime.datetime = Field(default_factory=utc_now)
+
+    @field_validator("payload", "output_refs", mode="before")
+    def _parse_json_string(cls, value, info):
+        if value is None and info.field_name == "output_refs":
+            return []
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError as err:
+                raise ValueError("Invalid JSON string provided for work item") from err
+        return value
+
+    class Config:
+        """Configuration for Pydantic model."""
+
+        from_attributes = True
+
+
 ### Request configs: {storage_uri}/configs/{master_job_id}.request.json
 ### Record Data: {storage_uri}/data/{record_uid[:2]}/{record_uid[2:4]}/{record_uid}.json
@@ -1,11 +1,15 @@
 import asyncio
 import time
-from typing import Any, Callable, Dict, List
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List
 from copy import deepcopy
 from starfish.common.logger import get_logger
+from starfish.common.tracing import traced
 from starfish.data_factory.config import TASK_RUNNER_TIMEOUT
-from starfish.data_factory.constants import IDX
+from starfish.data_factory.constants import IDX, PRIORITY
+from starfish.data_factory.thread_pool import ThreadPool, is_async_callable
 from starfish.data_factory.utils.errors import TimeoutErrorAsyncio
+from starfish.data_factory.utils.retry import RetryPolicy
 
 logger = get_logger(__name__)
 
@@ -18,30 +22,62 @@ class TaskRunner:
         max_retries: Maximum number of retry attempts for failed tasks
         timeout: Maximum execution time allowed for each task
         master_job_id: Optional identifier for the parent job
+        zero_copy: Pass read-only views of the input instead of deep copies
+        retry_policy: Which errors are retried and the backoff between attempts
+        process_pool: Worker processes running the function, None to run it on the event loop
+        thread_pool: Threads running synchronous functions off the event loop
     """
 
-    def __init__(self, max_retries: int = 1, timeout: int = TASK_RUNNER_TIMEOUT, master_job_id: str = None):
+    def __init__(
+        self,
+        max_retries: int = None,
+        timeout: int = TASK_RUNNER_TIMEOUT,
+        master_job_id: str = None,
+        zero_copy: bool = False,
+        retry_policy: RetryPolicy = None,
+    ):
         """Initializes the TaskRunner with configuration parameters.
 
         Args:
-            max_retries: Maximum number of retry attempts (default: 1)
+            max_retries: Maximum number of retry attempts (default: retry_policy.max_retries)
             timeout: Timeout in seconds for task execution (default: TASK_RUNNER_TIMEOUT)
             master_job_id: Optional identifier for the parent job (default: None)
+            zero_copy: Pass read-only views of the input instead of deep copies (default: False)
+            retry_policy: Which errors are retried and the backoff between attempts (default: RetryPolicy())
         """
-        self.max_retries = max_retries
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.max_retries = max_retries if max_retries is not None else self.retry_policy.max_retries
         self.timeout = timeout
         self.master_job_id = master_job_id
+        self.zero_copy = zero_copy
+        self.process_pool = None
+        self.thread_pool = None
 
+    def _prepare_input(self, input_data: Dict) -> Dict:
+        """Build the keyword arguments of the user function from an input record.
+
+        The user function must not be able to change the queued record, since a retry
+        reuses it. By default the record is deep-copied; in zero-copy mode dict values are
+        wrapped in read-only mapping proxies and list values are frozen into tuples instead.
+        """
+        if self.process_pool is not None:
+            # Sending the input to a worker process already copies it
+            return {k: v for k, v in input_data.items() if k not in (IDX, PRIORITY)}
+        if not self.zero_copy:
+            return deepcopy({k: v for k, v in input_data.items() if k not in (IDX, PRIORITY)})
+        return {k: _freeze(v) for k, v in input_data.items() if k not in (IDX, PRIORITY)}
+
+    @traced()
     async def run_task(self, func: Callable, input_data: Dict, input_data_idx: str) -> List[Any]:
         """Process a single task with asyncio."""
         retries = 0
         start_time = time.time()
         result = None
         # Create a copy of input_data without 'IDX' tp prevent insertion of IDX due to race condition
-        copy_input = deepcopy({k: v for k, v in input_data.items() if k != IDX})
+        copy_input = self._prepare_input(input_data)
         while retries <= self.max_retries:
             try:
-                result = await asyncio.wait_for(func(**copy_input), timeout=self.timeout)
+                result = await asyncio.wait_for(self._call(func, copy_input), timeout=self.timeout)
                 logger.debug(f"Task execution completed in {time.time() - start_time:.2f} seconds")
                 break
             except asyncio.TimeoutError as timeout_error:
@@ -50,13 +86,34 @@ class TaskRunner:
                     "please set the timeout in data_factory decorator like this: "
                     "task_runner_timeout=60"
                 )
-                raise TimeoutErrorAsyncio(f"Task execution timed out after {self.timeout} seconds") from timeout_error
+                error = TimeoutErrorAsyncio(f"Task execution timed out after {self.timeout} seconds")
+                error.__cause__ = timeout_error
             except Exception as e:
-                retries += 1
-                if retries > self.max_retries:
-                    # logger.error(f"Task execution failed after {self.max_retries} retries")
-                    raise e
-                logger.debug(f"Retry attempt {retries}/{self.max_retries} for input data index {input_data_idx}")
-                await asyncio.sleep(1**retries)  # exponential backoff
+                error = e
+            retries += 1
+            if retries > self.max_retries or not self.retry_policy.is_retryable(error):
+                raise error
+            delay = self.retry_policy.get_delay(retries, error)
+            logger.debug(f"Retry attempt {retries}/{self.max_retries} for input data index {input_data_idx} in {delay:.2f}s")
+            await asyncio.sleep(delay)
 
         return result
+
+    def _call(self, func: Callable, kwargs: Dict) -> Awaitable:
+        """Return the awaitable running one call of the function where it is configured to run."""
+        if self.process_pool is not None:
+            return self.process_pool.submit(kwargs)
+        if not is_async_callable(func):
+            if self.thread_pool is None:
+                self.thread_pool = ThreadPool(1)
+            return self.thread_pool.run(func, kwargs)
+        return func(**kwargs)
+
+
+def _freeze(value: Any) -> Any:
+    """Return a shallow read-only view of a dict or list value, other values unchanged."""
+    if isinstance(value, dict):
+        return MappingProxyType(value)
+    if isinstance(value, list):
+        return tuple(value)
+    return value
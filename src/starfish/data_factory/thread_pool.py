@@ -0,0 +1,80 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from starfish.common.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def is_async_callable(func: Callable) -> bool:
+    """Return True if calling `func` returns an awaitable (async functions, partials and callables)."""
+    while isinstance(func, functools.partial):
+        func = func.func
+    return inspect.iscoroutinefunction(func) or (callable(func) and inspect.iscoroutinefunction(type(func).__call__))
+
+
+class ThreadPool:
+    """Sized thread pool running synchronous user functions off the event loop.
+
+    A timed out or cancelled call that has not started yet is dropped from the pool
+    queue. A call already running cannot be interrupted: its thread finishes in the
+    background and its result is discarded.
+
+    Attributes:
+        size (int): Number of threads
+        active (int): Calls currently running
+        queued (int): Calls waiting for a free thread
+    """
+
+    def __init__(self, size: int):
+        """Initialize the pool.
+
+        Args:
+            size: Number of threads
+        """
+        self.size = size
+        self.active = 0
+        self.queued = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="starfish-task")
+
+    def _call(self, func: Callable, kwargs: Dict[str, Any]) -> Any:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return func(**kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def _on_done(self, future) -> None:
+        if future.cancelled():
+            # Dropped before a thread picked it up
+            with self._lock:
+                self.queued -= 1
+
+    async def run(self, func: Callable, kwargs: Dict[str, Any]) -> Any:
+        """Run `func(**kwargs)` in a thread and return its result, awaiting it if it is awaitable."""
+        with self._lock:
+            self.queued += 1
+        # The thread runs in a copy of the task context, so LLM usage and spans are attributed to the task
+        future = self._executor.submit(contextvars.copy_context().run, self._call, func, kwargs)
+        future.add_done_callback(self._on_done)
+        result = await asyncio.wrap_future(future)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def utilization(self) -> str:
+        """Return the pool usage for the progress log."""
+        return f"Threads: {self.active}/{self.size} busy, {self.queued} queued"
+
+    def shutdown(self) -> None:
+        """Drop the queued calls and release the threads once the running calls finish."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
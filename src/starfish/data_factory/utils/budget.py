@@ -0,0 +1,94 @@
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.utils.errors import InputError
+from starfish.llm.proxy.usage import Usage
+
+logger = get_logger(__name__)
+
+
+class UsageBudget:
+    """Aggregates the LLM usage of a job and enforces its max_cost / max_tokens budget.
+
+    The budget is checked before each dispatch against the spend so far plus the average
+    spend of a task for every task in flight and the one about to start, so the job stops
+    dispatching before the budget is reached rather than after. Tasks in flight finish;
+    once none is left and no further task fits, the budget is exhausted.
+
+    Attributes:
+        max_cost (float): Budget in USD, None for no limit
+        max_tokens (int): Budget in tokens, None for no limit
+        usage (Usage): Usage of the tasks recorded so far
+        task_count (int): Number of task results whose usage was recorded
+    """
+
+    def __init__(self, max_cost: Optional[float] = None, max_tokens: Optional[int] = None, inputs_per_task: int = 1):
+        """Initialize an empty budget.
+
+        Args:
+            max_cost: Budget in USD, None for no limit
+            max_tokens: Budget in tokens, None for no limit
+            inputs_per_task: Inputs run by one dispatched task (the batch size); usage is recorded per input
+
+        Raises:
+            InputError: If a limit is not positive
+        """
+        if max_cost is not None and max_cost <= 0:
+            raise InputError(f"max_cost must be positive, got {max_cost}")
+        if max_tokens is not None and max_tokens <= 0:
+            raise InputError(f"max_tokens must be positive, got {max_tokens}")
+        self.max_cost = max_cost
+        self.max_tokens = max_tokens
+        self.inputs_per_task = inputs_per_task
+        self.usage = Usage()
+        self.task_count = 0
+        self._exhausted_logged = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the spend recorded so far, saved with the master job summary and checkpoint."""
+        return {"usage": self.usage.to_dict(), "task_count": self.task_count}
+
+    def restore(self, data: Optional[Dict[str, Any]]) -> None:
+        """Seed the budget with the spend of the previous runs of a resumed job, from `to_dict`."""
+        if data:
+            self.usage = Usage.from_dict(data.get("usage"))
+            self.task_count = data.get("task_count", 0)
+
+    def record(self, usage: Usage) -> None:
+        """Add the usage of one task result."""
+        self.usage.add(usage)
+        self.task_count += 1
+
+    def _limits(self) -> Iterator[Tuple[str, float, float]]:
+        """Yield the name, limit and spend of every configured limit."""
+        if self.max_cost is not None:
+            yield "max_cost", self.max_cost, self.usage.cost
+        if self.max_tokens is not None:
+            yield "max_tokens", self.max_tokens, self.usage.total_tokens
+
+    def allows_dispatch(self, in_flight: int) -> bool:
+        """Return True if one more task is expected to fit in the budget, with `in_flight` tasks still running."""
+        for _, limit, spent in self._limits():
+            per_task = spent / self.task_count * self.inputs_per_task if self.task_count else 0
+            if spent >= limit or spent + (in_flight + 1) * per_task > limit:
+                return False
+        return True
+
+    def is_exhausted(self, in_flight: int) -> bool:
+        """Return True once no task is running and the next one would not fit in the budget."""
+        if in_flight > 0 or self.allows_dispatch(0):
+            return False
+        if not self._exhausted_logged:
+            self._exhausted_logged = True
+            limits = ", ".join(f"{name}={limit:g}" for name, limit, _ in self._limits())
+            logger.warning(f"[BUDGET] Stopping the job: {self.usage.total_tokens} tokens, ${self.usage.cost:.4f} spent ({limits})")
+        return True
+
+    def format_progress(self, completed: int, target: int) -> str:
+        """Return the spend and the projected spend to reach the target, for the progress log."""
+        if self.usage.calls == 0:
+            return ""
+        progress = f"Tokens: {self.usage.total_tokens} | Cost: ${self.usage.cost:.4f}"
+        if completed > 0 and target > completed:
+            progress += f" (projected ${self.usage.cost / completed * target:.4f}, {int(self.usage.total_tokens / completed * target)} tokens)"
+        return progress
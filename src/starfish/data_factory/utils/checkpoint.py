@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.constants import IDX
+from starfish.data_factory.storage.base import INDEX_FILE_CAPABILITY, Storage
+from starfish.data_factory.utils.errors import InputError
+from starfish.data_factory.utils.input_source import InputFeeder
+
+logger = get_logger(__name__)
+
+# File name of the checkpoint, in the index directory of the master job
+CHECKPOINT_NAME = "checkpoint.json"
+
+
+def checkpoint_path(storage: Storage, master_job_id: str) -> Optional[str]:
+    """Return the path of the checkpoint of a master job, None if the storage cannot keep index files."""
+    if INDEX_FILE_CAPABILITY not in (storage.capabilities or set()):
+        return None
+    return storage.generate_index_path(master_job_id, CHECKPOINT_NAME)
+
+
+def _find_non_json_value(value: Any, path: str) -> Optional[Tuple[str, Any]]:
+    """Return the path and value of the first value JSON would not read back as is, None if there is none."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            item_path = f"{path}[{key!r}]"
+            if not isinstance(key, str):
+                return item_path, key
+            found = _find_non_json_value(item, item_path)
+            if found:
+                return found
+        return None
+    if isinstance(value, list):
+        for i, item in enumerate(value):
+            found = _find_non_json_value(item, f"{path}[{i}]")
+            if found:
+                return found
+        return None
+    return None if isinstance(value, (str, int, float, bool, type(None))) else (path, value)
+
+
+def write_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    """Write a checkpoint to a JSON file atomically: a reader sees the previous checkpoint or this one, never a mix.
+
+    Raises:
+        TypeError: If a value would be read back as another type (a set, tuple, date or object in the
+            state), since a resumed job would then fail on it; the previous checkpoint is kept
+    """
+    found = _find_non_json_value(checkpoint, "checkpoint")
+    if found:
+        found_path, value = found
+        raise TypeError(f"{found_path} is a {type(value).__name__}, which a JSON checkpoint cannot keep; use lists, dicts and JSON scalars")
+    payload = json.dumps(checkpoint)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # A file of its own per write, so two writers never mix their content
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_checkpoint(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Return the checkpoint stored at a path, None if there is none or it cannot be read."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+
+class JobCheckpointer:
+    """Saves the progress of a running job, so a process killed mid-run can be resumed from it.
+
+    A checkpoint holds the shared state, the counters, the LLM spend, the index of the inputs
+    in the dead queue and, for lazy inputs, the read position. It is written every `interval` seconds,
+    after every `every` final task results, and once more when the job stops. The write runs
+    in a worker thread and replaces the previous checkpoint atomically.
+
+    Attributes:
+        path (str): Path of the checkpoint file
+        interval (float): Seconds between two checkpoints (None: only by record count)
+        every (int): Final task results between two checkpoints (None: only by time)
+        checkpoint_count (int): Number of checkpoints written
+    """
+
+    def __init__(self, job_manager: Any, path: str, interval: Optional[float] = None, every: Optional[int] = None):
+        """Initialize the checkpointer.
+
+        Args:
+            job_manager: The JobManager of the job
+            path: Path of the checkpoint file
+            interval: Seconds between two checkpoints, None to checkpoint only by record count
+            every: Final task results between two checkpoints, None to checkpoint only by time
+
+        Raises:
+            InputError: If the interval or record count is not positive
+        """
+        if (interval is not None and interval <= 0) or (every is not None and every < 1):
+            raise InputError(f"checkpoint_interval and checkpoint_every must be positive, got {interval} and {every}")
+        self.job_manager = job_manager
+        self.path = path
+        self.interval = interval
+        self.every = every
+        self.checkpoint_count = 0
+        self._results_since_checkpoint = 0
+        self._due = None
+        self._writer_task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the checkpoint of the job as it is now."""
+        job_manager = self.job_manager
+        checkpoint = {
+            "master_job_id": job_manager.master_job_id,
+            "timestamp": time.time(),
+            "counters": {
+                "total_count": job_manager.total_count,
+                "completed_count": job_manager.completed_count,
+                "failed_count": job_manager.failed_count,
+                "filtered_count": job_manager.filtered_count,
+                "duplicate_count": job_manager.duplicate_count,
+                "dead_queue_count": job_manager.dead_queue_count,
+            },
+            # The dead queue holds the inputs, already saved with the request config
+            "budget": job_manager.budget.to_dict(),
+            "dead_queue": [input_data.get(IDX) for input_data in list(job_manager.dead_queue._queue)],
+            "state": job_manager.state.snapshot(),
+            # Without them, the reservoirs of a resumed job would favor the values offered after the resume
+            "reservoir_counts": job_manager.state.reservoir_counts(),
+        }
+        if isinstance(job_manager.input_feeder, InputFeeder):
+            checkpoint["input_source"] = job_manager.input_feeder.checkpoint()
+        return checkpoint
+
+    def record_result(self) -> None:
+        """Count a final task result, scheduling a checkpoint after every `every` of them."""
+        self._results_since_checkpoint += 1
+        if self.every is not None and self._results_since_checkpoint >= self.every and self._due is not None:
+            self._due.set()
+
+    async def start(self) -> None:
+        """Start writing checkpoints while the job runs."""
+        self._due = asyncio.Event()
+        self._writer_task = asyncio.create_task(self._write_periodically())
+
+    async def stop(self) -> None:
+        """Stop the periodic writes and write the final checkpoint."""
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+            await self._write()
+
+    async def _write_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._due.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self._write()
+
+    async def _write(self) -> None:
+        self._due.clear()
+        self._results_since_checkpoint = 0
+        try:
+            # Taken in the event loop, so the counters and the state match; written in a thread
+            await asyncio.to_thread(write_checkpoint, self.path, self.snapshot())
+            self.checkpoint_count += 1
+        except Exception as e:
+            # A failed checkpoint must never stop the job
+            logger.warning(f"Failed to write checkpoint {self.path}: {e}")
+
+
+def create_checkpointer(job_manager: Any, storage: Storage, interval: Optional[float] = None, every: Optional[int] = None) -> Optional[JobCheckpointer]:
+    """Return the JobCheckpointer of a job, None if checkpoints are disabled or the storage cannot keep them."""
+    if interval is None and every is None:
+        return None
+    path = checkpoint_path(storage, job_manager.master_job_id)
+    if path is None:
+        # Nothing in such a storage (in memory) outlives the process, there is nothing to resume
+        logger.debug(f"No checkpoints with {storage.__class__.__name__}, it cannot keep index files")
+        return None
+    return JobCheckpointer(job_manager, path, interval=interval, every=every)
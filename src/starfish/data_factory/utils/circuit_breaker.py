@@ -0,0 +1,168 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Union
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.utils.errors import InputError
+
+logger = get_logger(__name__)
+
+# States of the breaker
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+@dataclass
+class CircuitBreakerPolicy:
+    """When the circuit breaker of a job trips, and for how long.
+
+    The breaker trips when, within the last `window` seconds, at least `min_failures`
+    tasks failed with the same error category and that category accounts for at least
+    `failure_rate` of the finished tasks.
+
+    Attributes:
+        failure_rate (float): Share of the finished tasks failing with one category that trips the breaker
+        min_failures (int): Failures of one category needed within the window before the rate applies
+        window (float): Seconds of history the rate is computed over
+        cooldown (float): Seconds dispatch is paused once tripped, before one probe task is sent
+        max_trips (int): Consecutive trips (without a successful probe) after which the job stops
+    """
+
+    failure_rate: float = 0.5
+    min_failures: int = 5
+    window: float = 60.0
+    cooldown: float = 30.0
+    max_trips: int = 3
+
+
+class CircuitBreaker:
+    """Pauses the dispatch of a job while one error category fails most tasks.
+
+    closed: tasks are dispatched. When a category passes the policy rate, the breaker
+    opens: no task is dispatched for `cooldown` seconds, and the running tasks finish.
+    It is then half open: a single probe task is dispatched. If the probe succeeds the
+    breaker closes; if it fails the breaker opens again. After `max_trips` consecutive
+    trips the job should stop, to be resumed once the cause (a revoked key, an exhausted
+    quota) is fixed, instead of sending every input to the dead queue.
+
+    Attributes:
+        policy (CircuitBreakerPolicy): Thresholds of the breaker
+        state (str): closed, open or half_open
+        tripped_category (str): Error category that tripped the breaker last
+        trip_count (int): Number of trips since the job started
+        consecutive_trips (int): Trips since the last successful probe
+    """
+
+    def __init__(self, policy: CircuitBreakerPolicy):
+        """Initialize a closed breaker.
+
+        Args:
+            policy: Thresholds of the breaker
+
+        Raises:
+            InputError: If a threshold is out of range
+        """
+        if not 0 < policy.failure_rate <= 1:
+            raise InputError(f"circuit_breaker failure_rate must be in (0, 1], got {policy.failure_rate}")
+        if policy.min_failures < 1 or policy.max_trips < 1:
+            raise InputError("circuit_breaker min_failures and max_trips must be at least 1")
+        self.policy = policy
+        self.state = BREAKER_CLOSED
+        self.tripped_category = None
+        self.trip_count = 0
+        self.consecutive_trips = 0
+        self._results: Deque[tuple] = deque()
+        self._failures: Dict[str, int] = {}
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._probe_idx = None
+
+    def record(self, category: Optional[str], idx: Any = None) -> None:
+        """Record the outcome of a finished task.
+
+        While half open, only the outcome of the probe decides whether the breaker closes
+        or trips again; tasks dispatched before the trip may still finish in the meantime.
+
+        Args:
+            category: Error category of a failed task, None for a task that did not fail
+            idx: Index of the input of the task
+        """
+        now = time.monotonic()
+        self._results.append((now, category))
+        if category is not None:
+            self._failures[category] = self._failures.get(category, 0) + 1
+        self._expire(now)
+
+        if self.state == BREAKER_HALF_OPEN and self._probe_in_flight and idx == self._probe_idx:
+            self._probe_in_flight = False
+            self._probe_idx = None
+            if category is None:
+                logger.info(f"[CIRCUIT BREAKER] Probe succeeded, resuming dispatch after '{self.tripped_category}' errors")
+                self.state = BREAKER_CLOSED
+                self.consecutive_trips = 0
+                self._results.clear()
+                self._failures.clear()
+            else:
+                self._trip(category, now)
+        elif self.state == BREAKER_CLOSED and category is not None:
+            failures = self._failures[category]
+            if failures >= self.policy.min_failures and failures / len(self._results) >= self.policy.failure_rate:
+                self._trip(category, now)
+
+    def _expire(self, now: float) -> None:
+        """Drop the outcomes older than the window."""
+        while self._results and self._results[0][0] < now - self.policy.window:
+            _, category = self._results.popleft()
+            if category is not None:
+                self._failures[category] -= 1
+
+    def _trip(self, category: str, now: float) -> None:
+        self.state = BREAKER_OPEN
+        self.tripped_category = category
+        self.trip_count += 1
+        self.consecutive_trips += 1
+        self._open_until = now + self.policy.cooldown
+        if self.is_exhausted():
+            logger.error(f"[CIRCUIT BREAKER] Tripped {self.consecutive_trips} times in a row by '{category}' errors, stopping the job")
+        else:
+            logger.warning(
+                f"[CIRCUIT BREAKER] Tripped by '{category}' errors ({self.consecutive_trips}/{self.policy.max_trips}), "
+                f"pausing dispatch for {self.policy.cooldown:g}s"
+            )
+
+    def allow_dispatch(self) -> bool:
+        """Return True if a task may be dispatched now; once the cool-down is over, True for one probe."""
+        if self.state == BREAKER_CLOSED:
+            return True
+        if self.state == BREAKER_OPEN:
+            if time.monotonic() < self._open_until:
+                return False
+            self.state = BREAKER_HALF_OPEN
+        return not self._probe_in_flight
+
+    def on_dispatch(self, idx: Any = None) -> None:
+        """Record that the task of input `idx` was dispatched, which is the probe while half open."""
+        if self.state == BREAKER_HALF_OPEN:
+            self._probe_in_flight = True
+            self._probe_idx = idx
+
+    def next_dispatch_in(self) -> Optional[float]:
+        """Return the seconds until the cool-down ends while open, None otherwise."""
+        if self.state != BREAKER_OPEN:
+            return None
+        return max(0.0, self._open_until - time.monotonic())
+
+    def is_exhausted(self) -> bool:
+        """Return True once the breaker tripped `max_trips` times in a row, meaning the job should stop."""
+        return self.consecutive_trips >= self.policy.max_trips
+
+
+def create_circuit_breaker(policy: Union[CircuitBreakerPolicy, dict, None]) -> Optional[CircuitBreaker]:
+    """Return a CircuitBreaker from a policy or its dict form (as stored in resume metadata), None if disabled."""
+    if policy is None:
+        return None
+    if isinstance(policy, dict):
+        policy = CircuitBreakerPolicy(**policy)
+    return CircuitBreaker(policy)
@@ -0,0 +1,193 @@
+import asyncio
+from typing import Optional, Union
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.config import AUTO_CONCURRENCY_CEILING, AUTO_CONCURRENCY_FLOOR, MAX_CONCURRENT_TASKS
+from starfish.data_factory.constants import STATUS_COMPLETED, STATUS_FAILED
+from starfish.data_factory.utils.errors import InputError
+
+logger = get_logger(__name__)
+
+AUTO_CONCURRENCY = "auto"
+
+# Substrings of error messages that mean the provider is overloaded, not that the input is bad
+OVERLOAD_ERROR_MARKERS = ("timed out", "timeout", "rate limit", "ratelimit", "429", "too many requests", "overloaded")
+
+
+def is_overload_error(err_str: Optional[str]) -> bool:
+    """Return True if an error message reports a timeout or a rate limit."""
+    normalized = (err_str or "").lower()
+    return any(marker in normalized for marker in OVERLOAD_ERROR_MARKERS)
+
+
+class ConcurrencyLimiter:
+    """Limits the number of running tasks, like an `asyncio.Semaphore` whose limit can change.
+
+    Attributes:
+        limit (int): Maximum number of tasks allowed to run at the same time
+        in_use (int): Number of tasks currently running
+    """
+
+    def __init__(self, limit: int):
+        """Initialize the limiter.
+
+        Args:
+            limit: Maximum number of concurrent tasks
+        """
+        self.limit = limit
+        self.in_use = 0
+        self._released = asyncio.Event()
+
+    async def acquire(self) -> None:
+        """Wait until a slot is free under the current limit, then take it."""
+        while self.in_use >= self.limit:
+            self._released.clear()
+            await self._released.wait()
+        self.in_use += 1
+
+    def release(self) -> None:
+        """Free a slot."""
+        self.in_use -= 1
+        self._released.set()
+
+    def record(self, status: str, err_str: Optional[str] = None, latency: Optional[float] = None) -> None:
+        """Take the outcome of a finished task into account (no-op for a fixed limit)."""
+
+
+class AdaptiveConcurrencyLimiter(ConcurrencyLimiter):
+    """Concurrency limiter following an AIMD (additive increase, multiplicative decrease) policy.
+
+    Outcomes are evaluated over windows of `limit` completed tasks, about one round of the
+    running tasks. After a healthy window (few errors, latency close to the best observed)
+    the limit grows by one. A timeout or rate-limit error, or an error rate above
+    `error_rate_threshold` over a window, multiplies the limit by `decrease_factor`. After a
+    decrease, further overload signals are ignored for one window, since the tasks still
+    running were started under the previous limit.
+
+    Attributes:
+        floor (int): Lowest limit
+        ceiling (int): Highest limit
+        decrease_factor (float): Factor applied to the limit on overload
+        error_rate_threshold (float): Error rate over a window that counts as overload
+        latency_tolerance (float): Ratio to the best average latency still considered healthy
+        increase_count (int): Number of times the limit was raised
+        decrease_count (int): Number of times the limit was cut
+        peak_limit (int): Highest limit reached
+    """
+
+    def __init__(
+        self,
+        floor: int = AUTO_CONCURRENCY_FLOOR,
+        ceiling: int = AUTO_CONCURRENCY_CEILING,
+        initial: Optional[int] = None,
+        decrease_factor: float = 0.5,
+        error_rate_threshold: float = 0.2,
+        latency_tolerance: float = 2.0,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            floor: Lowest limit (default: AUTO_CONCURRENCY_FLOOR)
+            ceiling: Highest limit (default: AUTO_CONCURRENCY_CEILING)
+            initial: Starting limit, clamped to [floor, ceiling] (default: MAX_CONCURRENT_TASKS)
+            decrease_factor: Factor applied to the limit on overload (default: 0.5)
+            error_rate_threshold: Error rate over a window that counts as overload (default: 0.2)
+            latency_tolerance: Ratio to the best average latency still considered healthy (default: 2.0)
+        """
+        if floor < 1 or ceiling < floor:
+            raise InputError(f"Invalid concurrency bounds: floor {floor}, ceiling {ceiling}")
+        super().__init__(min(max(initial or MAX_CONCURRENT_TASKS, floor), ceiling))
+        self.floor = floor
+        self.ceiling = ceiling
+        self.decrease_factor = decrease_factor
+        self.error_rate_threshold = error_rate_threshold
+        self.latency_tolerance = latency_tolerance
+        self.increase_count = 0
+        self.decrease_count = 0
+        self.peak_limit = self.limit
+        self._best_latency = None
+        self._reset_window()
+        self._cooldown = 0
+
+    def _reset_window(self) -> None:
+        self._window_count = 0
+        self._window_errors = 0
+        self._window_latency = 0.0
+        self._window_latency_count = 0
+
+    def record(self, status: str, err_str: Optional[str] = None, latency: Optional[float] = None) -> None:
+        """Take the outcome of a finished task into account and adjust the limit.
+
+        Args:
+            status: Status of the task (completed, duplicate, filtered or failed)
+            err_str: Error message of a failed task
+            latency: Duration of the task in seconds
+        """
+        if self._cooldown > 0:
+            self._cooldown -= 1
+        if status == STATUS_FAILED and is_overload_error(err_str):
+            if self._cooldown == 0:
+                self._decrease(f"overload error: {err_str}")
+            return
+
+        self._window_count += 1
+        if status == STATUS_FAILED:
+            self._window_errors += 1
+        elif latency is not None and status == STATUS_COMPLETED:
+            self._window_latency += latency
+            self._window_latency_count += 1
+
+        if self._window_count >= self.limit:
+            self._evaluate_window()
+
+    def _evaluate_window(self) -> None:
+        """Raise or cut the limit based on the outcomes of the last window."""
+        error_rate = self._window_errors / self._window_count
+        mean_latency = self._window_latency / self._window_latency_count if self._window_latency_count else None
+        self._reset_window()
+
+        if error_rate > self.error_rate_threshold:
+            if self._cooldown == 0:
+                self._decrease(f"error rate {error_rate:.0%}")
+            return
+        if mean_latency is not None:
+            if self._best_latency is None or mean_latency < self._best_latency:
+                self._best_latency = mean_latency
+            if mean_latency > self._best_latency * self.latency_tolerance:
+                # Latency is growing: the provider is queueing our requests, hold the limit
+                return
+        if self.limit < self.ceiling:
+            self.limit += 1
+            self.increase_count += 1
+            self.peak_limit = max(self.peak_limit, self.limit)
+            self._released.set()
+
+    def _decrease(self, reason: str) -> None:
+        """Cut the limit multiplicatively and start a cooldown window."""
+        new_limit = max(self.floor, int(self.limit * self.decrease_factor))
+        if new_limit < self.limit:
+            logger.debug(f"Concurrency limit {self.limit} -> {new_limit} ({reason})")
+            self.limit = new_limit
+            self.decrease_count += 1
+        self._cooldown = self.limit
+        self._reset_window()
+
+
+def create_concurrency_limiter(
+    max_concurrency: Union[int, str], floor: int = AUTO_CONCURRENCY_FLOOR, ceiling: int = AUTO_CONCURRENCY_CEILING
+) -> ConcurrencyLimiter:
+    """Create the limiter for a `max_concurrency` setting.
+
+    Args:
+        max_concurrency: Fixed number of concurrent tasks, or "auto" for an adaptive limit
+        floor: Lowest adaptive limit
+        ceiling: Highest adaptive limit
+
+    Raises:
+        InputError: If max_concurrency is neither a positive integer nor "auto"
+    """
+    if max_concurrency == AUTO_CONCURRENCY:
+        return AdaptiveConcurrencyLimiter(floor=floor, ceiling=ceiling)
+    if not isinstance(max_concurrency, int) or max_concurrency < 1:
+        raise InputError(f"max_concurrency must be a positive integer or '{AUTO_CONCURRENCY}', got {max_concurrency!r}")
+    return ConcurrencyLimiter(max_concurrency)
@@ -1,10 +1,21 @@
 from dataclasses import dataclass, field
-from typing import Callable, List
+from typing import Callable, List, Optional, Union
 
 import cloudpickle
 
-from starfish.data_factory.config import TASK_RUNNER_TIMEOUT
-from starfish.data_factory.constants import RUN_MODE_NORMAL, STORAGE_TYPE_LOCAL
+from starfish.data_factory.config import (
+    AUTO_CONCURRENCY_CEILING,
+    AUTO_CONCURRENCY_FLOOR,
+    CHECKPOINT_INTERVAL,
+    HEDGE_MAX_IN_FLIGHT,
+    LEASE_TIMEOUT,
+    OUTPUT_BUFFER_SIZE,
+    TASK_RUNNER_TIMEOUT,
+)
+from starfish.data_factory.constants import EXECUTOR_ASYNC, RUN_MODE_NORMAL, SCHEDULE_RETRIES_FIRST, STORAGE_TYPE_LOCAL
+from starfish.data_factory.utils.circuit_breaker import CircuitBreakerPolicy
+from starfish.data_factory.utils.result_cache import ResultCachePolicy
+from starfish.data_factory.utils.retry import RetryPolicy
 
 
 @dataclass
@@ -19,15 +30,36 @@ class FactoryMasterConfig:
         storage (str): Storage type to use (default: local)
         master_job_id (str): Unique identifier for the master job
         project_id (str): Identifier for the associated project
-        batch_size (int): Number of records to process in each batch
+        batch_size (int): Inputs per call of the function; above 1 its parameters are lists and it returns one output per input
         target_count (int): Total number of records to process
-        max_concurrency (int): Maximum number of concurrent tasks
+        max_concurrency (Union[int, str]): Maximum number of concurrent tasks, or "auto" for an adaptive limit
+        concurrency_floor (int): Lowest adaptive concurrency limit
+        concurrency_ceiling (int): Highest adaptive concurrency limit
         show_progress (bool): Whether to display progress information
         task_runner_timeout (int): Timeout for task execution in seconds
         on_record_complete (List[Callable]): List of callbacks for record completion
         on_record_error (List[Callable]): List of callbacks for record errors
         run_mode (str): Execution mode for the job
         job_run_stop_threshold (int): Number of times to retry a failed job
+        output_buffer_size (int): Number of task results kept in memory before spilling to disk
+        zero_copy (bool): Pass read-only views of the input instead of deep copies
+        retry_policy (RetryPolicy): Backoff and error classification for failed tasks (None uses the defaults)
+        schedule_policy (str): Order between fresh inputs and retries (retries_first, fresh_first or interleaved)
+        executor (str): Where the function runs: "async" (the event loop) or "process" (worker processes)
+        workers (int): Number of worker processes with executor="process" (None uses the CPU count)
+        lease_queue (bool): Store the inputs as work items in storage, claimable by other workers of the job
+        lease_timeout (float): Seconds a claimed work item stays invisible to the other workers
+        worker_id (str): Identifier of this worker in storage (None uses hostname:pid)
+        hedge_percentile (float): Latency percentile after which a straggler task is hedged (None disables hedging)
+        hedge_max_in_flight (int): Maximum number of hedged attempts running at the same time
+        metrics_port (int): Port of the live Prometheus metrics endpoint (None disables it)
+        metrics_file (str): Path of the live JSON metrics file, rewritten periodically (None disables it)
+        circuit_breaker (CircuitBreakerPolicy): Pause dispatch on failure spikes of one error category (None disables it)
+        max_cost (float): Stop the job before its LLM calls cost more than this, in USD (None for no limit)
+        max_tokens (int): Stop the job before its LLM calls use more tokens than this (None for no limit)
+        result_cache (ResultCachePolicy): Serve the cached output of inputs completed by the same function (None disables it)
+        checkpoint_interval (float): Seconds between two checkpoints of the state, counters and dead queue (None: only by record count)
+        checkpoint_every (int): Final task results between two checkpoints (None: only by time)
         prev_job (dict): Dictionary containing previous job information
     """
 
@@ -37,13 +69,34 @@ class FactoryMasterConfig:
     batch_size: int = 1
     target_count: int = 0
     dead_queue_threshold: int = 3
-    max_concurrency: int = 50
+    max_concurrency: Union[int, str] = 50
+    concurrency_floor: int = AUTO_CONCURRENCY_FLOOR
+    concurrency_ceiling: int = AUTO_CONCURRENCY_CEILING
     show_progress: bool = True
     task_runner_timeout: int = TASK_RUNNER_TIMEOUT
     on_record_complete: List[Callable] = field(default_factory=list)
     on_record_error: List[Callable] = field(default_factory=list)
     run_mode: str = RUN_MODE_NORMAL
     job_run_stop_threshold: int = 3
+    output_buffer_size: int = OUTPUT_BUFFER_SIZE
+    zero_copy: bool = False
+    retry_policy: Optional[RetryPolicy] = None
+    schedule_policy: str = SCHEDULE_RETRIES_FIRST
+    executor: str = EXECUTOR_ASYNC
+    workers: Optional[int] = None
+    lease_queue: bool = False
+    lease_timeout: float = LEASE_TIMEOUT
+    worker_id: Optional[str] = None
+    hedge_percentile: Optional[float] = None
+    hedge_max_in_flight: int = HEDGE_MAX_IN_FLIGHT
+    metrics_port: Optional[int] = None
+    metrics_file: Optional[str] = None
+    circuit_breaker: Optional[CircuitBreakerPolicy] = None
+    max_cost: Optional[float] = None
+    max_tokens: Optional[int] = None
+    result_cache: Optional[ResultCachePolicy] = None
+    checkpoint_interval: Optional[float] = CHECKPOINT_INTERVAL
+    checkpoint_every: Optional[int] = None
     prev_job: dict = field(default_factory=dict)
 
     @classmethod
@@ -59,7 +112,7 @@ class FactoryMasterConfig:
                 - storage: Storage type string
                 - master_job_id: Unique job identifier
                 - project_id: Project identifier
-                - batch_size: Number of records per batch
+                - batch_size: Inputs per call of the function (micro-batch size)
                 - target_count: Total records to process
                 - max_concurrency: Maximum concurrent tasks
                 - show_progress: Whether to show progress
@@ -68,6 +121,11 @@ class FactoryMasterConfig:
                 - on_record_error: List of callable strings for record errors
                 - run_mode: Execution mode string
                 - job_run_stop_threshold: Job retry threshold
+                - output_buffer_size: Task results kept in memory before spilling
+                - zero_copy: Whether inputs are passed as read-only views
+                - retry_policy: Retry policy fields, or None
+                - circuit_breaker: Circuit breaker policy fields, or None
+                - result_cache: Result cache policy fields, or None
 
         Returns:
             FactoryMasterConfig: A new instance of FactoryMasterConfig
@@ -81,6 +139,12 @@ class FactoryMasterConfig:
         # Deserialize callables using cloudpickle
         data["on_record_complete"] = [cloudpickle.loads(bytes.fromhex(c)) if c else None for c in data.get("on_record_complete", [])]
         data["on_record_error"] = [cloudpickle.loads(bytes.fromhex(c)) if c else None for c in data.get("on_record_error", [])]
+        if isinstance(data.get("retry_policy"), dict):
+            data["retry_policy"] = RetryPolicy(**data["retry_policy"])
+        if isinstance(data.get("circuit_breaker"), dict):
+            data["circuit_breaker"] = CircuitBreakerPolicy(**data["circuit_breaker"])
+        if isinstance(data.get("result_cache"), dict):
+            data["result_cache"] = ResultCachePolicy(**data["result_cache"])
 
         return cls(**data)
 
@@ -133,7 +197,7 @@ class FactoryMasterConfig:
                 - storage: Storage type string
                 - master_job_id: Unique job identifier
                 - project_id: Project identifier
-                - batch_size: Number of records per batch
+                - batch_size: Inputs per call of the function (micro-batch size)
                 - target_count: Total records to process
                 - max_concurrency: Maximum concurrent tasks
                 - show_progress: Whether to show progress
@@ -142,6 +206,11 @@ class FactoryMasterConfig:
                 - on_record_error: List of callable strings for record errors
                 - run_mode: Execution mode string
                 - job_run_stop_threshold: Job retry threshold
+                - output_buffer_size: Task results kept in memory before spilling
+                - zero_copy: Whether inputs are passed as read-only views
+                - retry_policy: Retry policy fields, or None
+                - circuit_breaker: Circuit breaker policy fields, or None
+                - result_cache: Result cache policy fields, or None
 
         Raises:
             ValueError: If invalid fields are provided
@@ -155,6 +224,12 @@ class FactoryMasterConfig:
             self.on_record_complete = [cloudpickle.loads(bytes.fromhex(c)) if c else None for c in data["on_record_complete"]]
         if "on_record_error" in data:
             self.on_record_error = [cloudpickle.loads(bytes.fromhex(c)) if c else None for c in data["on_record_error"]]
+        if isinstance(data.get("retry_policy"), dict):
+            data = {**data, "retry_policy": RetryPolicy(**data["retry_policy"])}
+        if isinstance(data.get("circuit_breaker"), dict):
+            data = {**data, "circuit_breaker": CircuitBreakerPolicy(**data["circuit_breaker"])}
+        if isinstance(data.get("result_cache"), dict):
+            data = {**data, "result_cache": ResultCachePolicy(**data["result_cache"])}
 
         # Update other fields
         for key, value in data.items():
@@ -172,16 +247,21 @@ class FactoryJobConfig:
 
     Attributes:
         master_job_id (str): Identifier of the parent master job
-        batch_size (int): Number of records to process in each batch
+        batch_size (int): Inputs per call of the function; above 1 its parameters are lists and it returns one output per input
         target_count (int): Total number of records to process
         show_progress (bool): Whether to display progress information
         task_runner_timeout (int): Timeout for task execution in seconds
         user_func (Callable): User-defined function to process records
         run_mode (str): Execution mode for the job
-        max_concurrency (int): Maximum number of concurrent tasks
+        max_concurrency (Union[int, str]): Maximum number of concurrent tasks, or "auto" for an adaptive limit
+        concurrency_floor (int): Lowest adaptive concurrency limit
+        concurrency_ceiling (int): Highest adaptive concurrency limit
         on_record_complete (List[Callable]): List of callbacks for record completion
         on_record_error (List[Callable]): List of callbacks for record errors
         job_run_stop_threshold (int): Number of times to retry a failed job
+        zero_copy (bool): Pass read-only views of the input instead of deep copies
+        executor (str): Where the function runs: "async" (the event loop) or "process" (worker processes)
+        workers (int): Number of worker processes with executor="process" (None uses the CPU count)
     """
 
     master_job_id: str = None
@@ -192,10 +272,15 @@ class FactoryJobConfig:
     task_runner_timeout: int = TASK_RUNNER_TIMEOUT
     user_func: Callable = None
     run_mode: str = RUN_MODE_NORMAL
-    max_concurrency: int = 50
+    max_concurrency: Union[int, str] = 50
+    concurrency_floor: int = AUTO_CONCURRENCY_FLOOR
+    concurrency_ceiling: int = AUTO_CONCURRENCY_CEILING
     on_record_complete: List[Callable] = field(default_factory=list)
     on_record_error: List[Callable] = field(default_factory=list)
     job_run_stop_threshold: int = 3
+    zero_copy: bool = False
+    executor: str = EXECUTOR_ASYNC
+    workers: Optional[int] = None
 
 
 @dataclass
@@ -215,6 +300,7 @@ class TelemetryData:
         execution_time (float): Total execution time in seconds
         count_summary (dict): Summary of record processing outcomes
         error_summary (dict): Summary of errors encountered during processing
+        latency_summary (dict): Latency statistics of every task phase (see JobMetrics.summary)
     """
 
     job_id: str = ""
@@ -229,6 +315,7 @@ class TelemetryData:
             "target_count": 0,
             "dead_queue_threshold": 0,
             "max_concurrency": 0,
+            "concurrency_limit": 0,
             "task_runner_timeout": 0,
             "job_run_stop_threshold": 0,
         }
@@ -236,6 +323,7 @@ class TelemetryData:
     execution_time: float = 0.0
     count_summary: dict = field(default_factory=lambda: {"completed": 0, "failed": 0, "filtered": 0, "duplicate": 0})
     error_summary: dict = field(default_factory=lambda: {"total_errors": 0, "error_types": {}})
+    latency_summary: dict = field(default_factory=dict)
 
     def to_dict(self) -> dict:
         """Convert the TelemetryData instance to a dictionary.
@@ -254,6 +342,7 @@ class TelemetryData:
                 - execution_time: Total execution time in seconds
                 - count_summary: Summary of record processing outcomes
                 - error_summary: Summary of errors encountered during processing
+                - latency_summary: Latency statistics of every task phase
         """
         import dataclasses
 
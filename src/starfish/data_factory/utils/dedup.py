@@ -0,0 +1,380 @@
+"""Near-duplicate detection of the generated records with an incremental MinHash/LSH index.
+
+`NearDuplicateHook` is an `on_record_complete` hook: a task whose records are near
+duplicates of earlier outputs gets the duplicate status (and is retried like any other
+duplicate), the records of the other tasks are added to the index once the task is
+completed.
+
+Each record is reduced to a MinHash signature of its word shingles. Signatures are split
+into bands hashed into buckets (locality-sensitive hashing), so a new record is only
+compared with the records sharing a bucket: the cost of a lookup and an insert does not
+grow with the number of indexed records.
+
+Example:
+    @data_factory(on_record_complete=[NearDuplicateHook(fields=["question"], threshold=0.8)])
+    async def generate(topic): ...
+"""
+
+import functools
+import glob
+import hashlib
+import os
+import random
+import re
+import struct
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.constants import STATUS_COMPLETED, STATUS_DUPLICATE
+from starfish.data_factory.storage.base import INDEX_FILE_CAPABILITY, Storage
+from starfish.data_factory.utils.errors import InputError
+
+logger = get_logger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_INDEX_MAGIC = b"SFMH"
+_INDEX_HEADER = struct.Struct("<4sII")
+_WORD_PATTERN = re.compile(r"\w+")
+# Characters of a worker id not kept in the name of its index file
+_WORKER_ID_UNSAFE = re.compile(r"[^\w.-]")
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Return the set of `size`-word shingles of a text, lowercased; the whole text if it is shorter."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+@functools.lru_cache(maxsize=None)
+def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Return the (bands, rows) split of a signature minimizing false positives and negatives around the threshold.
+
+    Two records of Jaccard similarity s share a bucket with probability 1 - (1 - s^rows)^bands.
+    """
+
+    def _probability_area(start: float, end: float, bands: int, rows: int, below: bool) -> float:
+        steps = 100
+        width = (end - start) / steps
+        area = 0.0
+        for i in range(steps):
+            s = start + (i + 0.5) * width
+            p = 1 - (1 - s**rows) ** bands
+            area += (p if below else 1 - p) * width
+        return area
+
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        false_positive = _probability_area(0.0, threshold, bands, rows, below=True)
+        false_negative = _probability_area(threshold, 1.0, bands, rows, below=False)
+        if false_positive + false_negative < best_error:
+            best, best_error = (bands, rows), false_positive + false_negative
+    return best
+
+
+class MinHashLSH:
+    """Incremental MinHash/LSH index of text signatures, optionally persisted to a file.
+
+    Signatures are kept in one flat array of 32-bit values (4 * num_perm bytes per record).
+    With a `path`, every insert is appended to the file, and an existing file is loaded,
+    so the index survives the process. Files matching `peer_patterns`, appended to by other
+    processes, are followed: `refresh` loads the records added to them since the last call.
+
+    Attributes:
+        threshold (float): Estimated Jaccard similarity from which two records are near duplicates
+        num_perm (int): Number of hash permutations of a signature
+        bands (int): Number of LSH bands, of `rows` signature values each
+        rows (int): Number of signature values of a band
+        path (str): File the index is appended to, None to keep it in memory only
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, seed: int = 1, path: Optional[str] = None, peer_patterns: Sequence[str] = ()):
+        """Initialize the index, loading the signatures already in `path` and in the peer files.
+
+        Args:
+            threshold: Estimated Jaccard similarity from which two records are near duplicates
+            num_perm: Number of hash permutations of a signature (more is more accurate, and slower)
+            seed: Seed of the permutations; an index file can only be reopened with the same seed
+            path: File the index is appended to, None to keep it in memory only
+            peer_patterns: Glob patterns of the index files of other processes, read only
+
+        Raises:
+            InputError: If a parameter is out of range, or the file was written with other parameters
+        """
+        if not 0 < threshold <= 1:
+            raise InputError(f"threshold must be in (0, 1], got {threshold}")
+        if num_perm < 2:
+            raise InputError(f"num_perm must be at least 2, got {num_perm}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.seed = seed
+        self.bands, self.rows = _optimal_bands(threshold, num_perm)
+        rng = random.Random(seed)
+        self._permutations = [(rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1)) for _ in range(num_perm)]
+        self._signatures = array("I")
+        self._buckets: List[Dict[int, Any]] = [{} for _ in range(self.bands)]
+        self.path = path
+        self._file = None
+        self._peer_patterns = list(peer_patterns)
+        # Bytes of each peer file already loaded
+        self._peer_offsets: Dict[str, int] = {}
+        if path is not None:
+            self._open_file(path)
+        self.refresh()
+
+    def __len__(self) -> int:
+        """Return the number of indexed records."""
+        return len(self._signatures) // self.num_perm
+
+    def signature(self, tokens: Iterable[str]) -> array:
+        """Return the MinHash signature of a set of tokens (all values at the maximum for an empty set)."""
+        hashes = [int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little") for token in tokens]
+        values = array("I", [_MAX_HASH] * self.num_perm)
+        if hashes:
+            for i, (a, b) in enumerate(self._permutations):
+                values[i] = min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+        return values
+
+    def _band_keys(self, signature: Sequence[int]) -> List[int]:
+        return [hash(tuple(signature[band * self.rows : (band + 1) * self.rows])) for band in range(self.bands)]
+
+    def similarity(self, first: Sequence[int], second: Sequence[int]) -> float:
+        """Return the Jaccard similarity estimated from two signatures."""
+        return sum(1 for x, y in zip(first, second) if x == y) / self.num_perm
+
+    def query(self, signature: Sequence[int]) -> Optional[int]:
+        """Return the position of an indexed record near-duplicate of the signature, None if there is none."""
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                candidates.update(bucket if isinstance(bucket, list) else (bucket,))
+        for position in sorted(candidates):
+            offset = position * self.num_perm
+            if self.similarity(signature, self._signatures[offset : offset + self.num_perm]) >= self.threshold:
+                return position
+        return None
+
+    def insert(self, signature: array) -> int:
+        """Add a signature to the index (and to its file), returning its position."""
+        position = len(self)
+        self._add(signature, position)
+        if self._file is not None:
+            signature.tofile(self._file)
+            self._file.flush()
+        return position
+
+    def _add(self, signature: Sequence[int], position: int) -> None:
+        self._signatures.extend(signature)
+        for band, key in enumerate(self._band_keys(signature)):
+            # Most buckets hold a single record, stored without a list
+            bucket = self._buckets[band].get(key)
+            if bucket is None:
+                self._buckets[band][key] = position
+            elif isinstance(bucket, list):
+                bucket.append(position)
+            else:
+                self._buckets[band][key] = [bucket, position]
+
+    def _check_header(self, path: str, header: bytes) -> None:
+        magic, num_perm, seed = _INDEX_HEADER.unpack(header)
+        if magic != _INDEX_MAGIC or num_perm != self.num_perm or seed != self.seed:
+            raise InputError(f"Index file {path} was written with other parameters (num_perm={num_perm}, seed={seed})")
+
+    def _load(self, data: bytes) -> int:
+        """Add the complete records of `data`, returning their size in bytes."""
+        complete = len(data) - len(data) % (self.num_perm * 4)
+        signatures = array("I")
+        signatures.frombytes(data[:complete])
+        for i in range(len(signatures) // self.num_perm):
+            self._add(signatures[i * self.num_perm : (i + 1) * self.num_perm], len(self))
+        return complete
+
+    def refresh(self) -> None:
+        """Load the records appended to the peer files since the last refresh; a record being written is loaded next time."""
+        for pattern in self._peer_patterns:
+            for peer_path in sorted(glob.glob(pattern)):
+                if peer_path == self.path:
+                    continue
+                offset = self._peer_offsets.get(peer_path, 0)
+                try:
+                    with open(peer_path, "rb") as f:
+                        if offset == 0:
+                            header = f.read(_INDEX_HEADER.size)
+                            if len(header) < _INDEX_HEADER.size:
+                                continue
+                            self._check_header(peer_path, header)
+                            offset = _INDEX_HEADER.size
+                        f.seek(offset)
+                        data = f.read()
+                except OSError as e:
+                    logger.warning(f"[DEDUP] Cannot read index file {peer_path}: {e}")
+                    continue
+                self._peer_offsets[peer_path] = offset + self._load(data)
+
+    def _open_file(self, path: str) -> None:
+        """Load the signatures of an existing index file and open it for appending."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) >= _INDEX_HEADER.size:
+            with open(path, "rb") as f:
+                self._check_header(path, f.read(_INDEX_HEADER.size))
+                data = f.read()
+            # A record cut short by a crash is dropped
+            complete = self._load(data)
+            self._file = open(path, "r+b")
+            self._file.truncate(_INDEX_HEADER.size + complete)
+            self._file.seek(0, os.SEEK_END)
+            logger.info(f"[DEDUP] Loaded {len(self)} records from {path}")
+        else:
+            self._file = open(path, "wb")
+            self._file.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self.num_perm, self.seed))
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the index file, if any."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class NearDuplicateHook:
+    """`on_record_complete` hook returning the duplicate status for near-duplicate outputs.
+
+    The text of a record is the value of its `fields` (every field by default), and two
+    records are near duplicates when the Jaccard similarity of their word shingles, as
+    estimated by MinHash, reaches `threshold`. An output is a duplicate if one of its
+    records is a near duplicate of an indexed record, of a record of an output checked
+    but not yet settled, or of another record of the output.
+
+    Checking an output does not index it: another hook may still filter it, or saving it
+    may fail. The job manager commits the records of an output once its task result is
+    completed, and discards them otherwise, so only completed outputs are indexed (and
+    persisted).
+
+    The job manager opens the hook when the job starts. With a storage able to keep index
+    files (local storage), the index is persisted next to the master job, so a resumed job
+    keeps deduplicating against the outputs of the earlier runs; otherwise it lives in memory.
+    The workers of a lease queue each append to a file of their own and follow the files of
+    the other workers, so outputs are deduplicated across workers.
+
+    Attributes:
+        fields (List[str]): Fields of a record the text is made of, None for every field
+        threshold (float): Estimated Jaccard similarity from which two records are near duplicates
+        shingle_size (int): Number of words of a shingle
+        num_perm (int): Number of hash permutations of a signature
+        name (str): Name of the index file, to keep several hooks apart
+        index (MinHashLSH): Index of the master job, once opened
+        duplicate_count (int): Number of outputs found duplicates since opened
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None, threshold: float = 0.8, shingle_size: int = 3, num_perm: int = 128, name: str = "dedup"):
+        """Initialize the hook.
+
+        Args:
+            fields: Fields of a record the text is made of, None for every field
+            threshold: Estimated Jaccard similarity from which two records are near duplicates
+            shingle_size: Number of words of a shingle
+            num_perm: Number of hash permutations of a signature
+            name: Name of the index file, to keep several hooks apart
+
+        Raises:
+            InputError: If a parameter is out of range
+        """
+        if shingle_size < 1:
+            raise InputError(f"shingle_size must be at least 1, got {shingle_size}")
+        self.fields = fields
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.name = name
+        self.index = MinHashLSH(threshold=threshold, num_perm=num_perm)
+        self.duplicate_count = 0
+        # Signatures of the outputs checked and not yet committed or discarded, by output id
+        self._pending: Dict[int, List[array]] = {}
+
+    def open(self, storage: Optional[Storage] = None, master_job_id: Optional[str] = None, worker_id: Optional[str] = None) -> None:
+        """Start a fresh index for a master job, loading and persisting it through the storage when it supports index files.
+
+        Args:
+            storage: Storage of the master job
+            master_job_id: ID of the master job
+            worker_id: Identifier of this worker, when other workers run the master job at the same time
+                (lease queue); its records go to a file of its own
+        """
+        self.close()
+        path, peer_patterns = None, ()
+        if storage is not None and master_job_id is not None and INDEX_FILE_CAPABILITY in (storage.capabilities or set()):
+            file_name = f"{self.name}.minhash"
+            if worker_id is not None:
+                file_name = f"{self.name}@{_WORKER_ID_UNSAFE.sub('_', worker_id)}.minhash"
+            path = storage.generate_index_path(master_job_id, file_name)
+            # The file of a run without lease queue and the files of every worker
+            directory, name = glob.escape(os.path.dirname(path)), glob.escape(self.name)
+            peer_patterns = [os.path.join(directory, f"{name}.minhash"), os.path.join(directory, f"{name}@*.minhash")]
+        self.index = MinHashLSH(threshold=self.threshold, num_perm=self.num_perm, path=path, peer_patterns=peer_patterns)
+        self.duplicate_count = 0
+        self._pending = {}
+
+    def close(self) -> None:
+        """Close the index file, if any."""
+        self.index.close()
+
+    def record_text(self, record: Any) -> str:
+        """Return the text of a record that is compared."""
+        if not isinstance(record, dict):
+            return str(record)
+        fields = self.fields if self.fields is not None else list(record)
+        return "\n".join(str(record[field]) for field in fields if record.get(field) is not None)
+
+    def check(self, output: Any) -> Tuple[str, List[array]]:
+        """Return the status of an output and the signatures of its records, without indexing them."""
+        records = output if isinstance(output, list) else [output]
+        # The records indexed by the other workers since the last check
+        self.index.refresh()
+        pending = [signature for signatures in self._pending.values() for signature in signatures]
+        signatures = []
+        for record in records:
+            tokens = shingles(self.record_text(record), self.shingle_size)
+            if not tokens:
+                continue
+            signature = self.index.signature(tokens)
+            if self.index.query(signature) is not None or any(self.index.similarity(signature, other) >= self.threshold for other in pending + signatures):
+                return STATUS_DUPLICATE, []
+            signatures.append(signature)
+        return STATUS_COMPLETED, signatures
+
+    def commit(self, output: Any) -> None:
+        """Index the records of a checked output whose task result is completed."""
+        for signature in self._pending.pop(id(output), []):
+            self.index.insert(signature)
+
+    def discard(self, output: Any) -> None:
+        """Forget the records of a checked output whose task result is not completed."""
+        self._pending.pop(id(output), None)
+
+    def __call__(self, output: Any, state: Any = None) -> str:
+        """Return the duplicate status if the output is a near duplicate, else hold its records until committed and return completed."""
+        status, signatures = self.check(output)
+        if status == STATUS_DUPLICATE:
+            self.duplicate_count += 1
+        elif signatures:
+            self._pending[id(output)] = signatures
+        return status
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the hook without its index, pickled with the job config; the index is rebuilt when the job opens it."""
+        state = self.__dict__.copy()
+        state["index"] = None
+        state["_pending"] = {}
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restore a pickled hook with an empty index in memory."""
+        self.__dict__.update(state)
+        self.index = MinHashLSH(threshold=self.threshold, num_perm=self.num_perm)
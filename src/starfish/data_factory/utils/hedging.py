@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.config import HEDGE_CHECK_INTERVAL, HEDGE_MAX_IN_FLIGHT, HEDGE_MIN_SAMPLES
+from starfish.data_factory.utils.errors import InputError
+from starfish.data_factory.utils.histogram import LatencyHistogram
+
+logger = get_logger(__name__)
+
+
+class TaskHedger:
+    """Hedges straggler tasks: re-runs a task that is slower than most, and keeps the first result.
+
+    Once `min_samples` tasks have succeeded, a task still running after the `percentile`
+    latency of the successful tasks gets a duplicate attempt. The first attempt to succeed
+    wins and the other one is cancelled; if one attempt fails, the other one may still
+    succeed. At most `max_in_flight` duplicates run at the same time, on top of the
+    concurrency limit of the job. A task started before enough samples were observed, or
+    while the cap was reached, is checked again every `HEDGE_CHECK_INTERVAL` seconds.
+
+    Attributes:
+        percentile (float): Latency percentile after which a task is hedged
+        max_in_flight (int): Maximum number of duplicate attempts running at the same time
+        min_samples (int): Successful tasks observed before hedging starts
+        latencies (LatencyHistogram): Latency of the successful attempts
+        in_flight (int): Duplicate attempts currently running
+        hedged_count (int): Number of duplicate attempts launched
+        hedge_win_count (int): Number of tasks whose duplicate attempt finished first
+    """
+
+    def __init__(self, percentile: float, max_in_flight: int = HEDGE_MAX_IN_FLIGHT, min_samples: int = HEDGE_MIN_SAMPLES):
+        """Initialize the hedger.
+
+        Args:
+            percentile: Latency percentile after which a task is hedged, between 0 and 100 exclusive
+            max_in_flight: Maximum number of duplicate attempts running at the same time
+            min_samples: Successful tasks observed before hedging starts
+
+        Raises:
+            InputError: If the percentile or the cap is out of range
+        """
+        if not 0 < percentile < 100:
+            raise InputError(f"hedge_percentile must be between 0 and 100 exclusive, got {percentile}")
+        if max_in_flight < 1:
+            raise InputError(f"hedge_max_in_flight must be at least 1, got {max_in_flight}")
+        self.percentile = percentile
+        self.max_in_flight = max_in_flight
+        self.min_samples = min_samples
+        self.latencies = LatencyHistogram()
+        self.in_flight = 0
+        self.hedged_count = 0
+        self.hedge_win_count = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Return the running time after which a task is hedged, None while too few tasks were observed."""
+        if self.latencies.count < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    async def run(self, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `attempt()`, and a second `attempt()` if the first one straggles; return the first success.
+
+        Args:
+            attempt: Returns a new awaitable running the task each time it is called
+
+        Raises:
+            Exception: The error of the last attempt to fail, if none succeeded
+        """
+        start_times = {}
+        primary = self._start(attempt, start_times)
+        attempts = {primary}
+        hedge = None
+        try:
+            while not primary.done():
+                delay = self.hedge_delay()
+                remaining = None if delay is None else delay - (time.monotonic() - start_times[primary])
+                if remaining is not None and remaining <= 0 and self.in_flight < self.max_in_flight:
+                    hedge = self._start(attempt, start_times)
+                    attempts.add(hedge)
+                    self.in_flight += 1
+                    self.hedged_count += 1
+                    logger.debug(f"Task running for more than {delay:.2f}s (p{self.percentile:g}), launched a hedged attempt")
+                    break
+                await asyncio.wait(attempts, timeout=remaining if remaining is not None and remaining > 0 else HEDGE_CHECK_INTERVAL)
+            error = None
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.latencies.record(time.monotonic() - start_times[task])
+                        if task is hedge:
+                            self.hedge_win_count += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+            if hedge is not None:
+                self.in_flight -= 1
+
+    @staticmethod
+    def _start(attempt: Callable[[], Awaitable[Any]], start_times: dict) -> asyncio.Task:
+        task = asyncio.ensure_future(attempt())
+        start_times[task] = time.monotonic()
+        return task
+
+
+def create_task_hedger(percentile: Optional[float], max_in_flight: int = HEDGE_MAX_IN_FLIGHT) -> Optional[TaskHedger]:
+    """Return a TaskHedger, or None if hedging is disabled (no percentile)."""
+    if percentile is None:
+        return None
+    return TaskHedger(percentile, max_in_flight=max_in_flight)
@@ -0,0 +1,63 @@
+import math
+from typing import Optional
+
+
+class LatencyHistogram:
+    """Histogram of latencies in log-spaced buckets, with constant memory and O(1) recording.
+
+    Bucket bounds grow by `growth` from `min_value` to `max_value`, so a percentile is
+    accurate to within one bucket (5% by default) however many samples are recorded.
+
+    Attributes:
+        count (int): Number of recorded samples
+        total (float): Sum of the recorded samples
+        max (float): Largest recorded sample
+    """
+
+    def __init__(self, min_value: float = 0.001, max_value: float = 3600.0, growth: float = 1.05):
+        """Initialize an empty histogram.
+
+        Args:
+            min_value: Upper bound of the first bucket, in seconds
+            max_value: Lower bound of the last bucket, in seconds
+            growth: Ratio between the bounds of two consecutive buckets
+        """
+        self._min_value = min_value
+        self._growth = growth
+        self._log_growth = math.log(growth)
+        self._counts = [0] * (math.ceil(math.log(max_value / min_value) / self._log_growth) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _bucket(self, value: float) -> int:
+        if value <= self._min_value:
+            return 0
+        return min(len(self._counts) - 1, int(math.log(value / self._min_value) / self._log_growth) + 1)
+
+    def record(self, value: float) -> None:
+        """Add a sample."""
+        self._counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the value below which `q` percent of the samples fall, or None if there is none.
+
+        Args:
+            q: Percentile between 0 and 100
+        """
+        if self.count == 0:
+            return None
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for bucket, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.max, self._min_value * self._growth**bucket)
+        return self.max
+
+    def mean(self) -> Optional[float]:
+        """Return the mean of the samples, or None if there is none."""
+        return self.total / self.count if self.count else None
@@ -0,0 +1,149 @@
+"""Execution modes of the on_record_complete / on_record_error hooks.
+
+A hook is called with the output (or error string) of a task and the job state. Besides a
+plain function, which runs inline in the event loop, a hook can be:
+
+- an async function, awaited, so waiting on a DB or an API does not block the other tasks;
+- a `ThreadedHook`, running a synchronous function in a worker thread (CPU-heavy checks,
+  blocking clients);
+- a `BatchedHook`, receiving the outputs of several tasks at once for vectorized checks.
+
+Example:
+    @data_factory(on_record_complete=[ThreadedHook(check_regex), BatchedHook(embedding_check, max_batch_size=64)])
+    async def generate(topic): ...
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from starfish.data_factory.thread_pool import is_async_callable
+from starfish.data_factory.utils.errors import InputError, OutputError
+
+
+def hook_name(hook: Callable) -> str:
+    """Return the name of a hook as shown in the metrics (its function name, or class name)."""
+    return getattr(hook, "__name__", None) or type(hook).__name__
+
+
+class ThreadedHook:
+    """Runs a synchronous hook in a worker thread, so it does not block the event loop.
+
+    Attributes:
+        func (Callable): The hook, called as `func(output, state)`
+    """
+
+    def __init__(self, func: Callable):
+        """Wrap a synchronous hook.
+
+        Args:
+            func: The hook, called as `func(output, state)`
+
+        Raises:
+            InputError: If the hook is an async function, which needs no thread
+        """
+        if is_async_callable(func):
+            raise InputError(f"ThreadedHook runs synchronous hooks, {hook_name(func)} is async and can be passed as is")
+        self.func = func
+        self.__name__ = hook_name(func)
+
+    async def __call__(self, output: Any, state: Any) -> Any:
+        """Run the hook in a worker thread and return its status."""
+        return await asyncio.to_thread(self.func, output, state)
+
+
+class BatchedHook:
+    """Collects the outputs of concurrent tasks and passes them to the hook in one call.
+
+    The hook is called as `func(outputs, state)` with up to `max_batch_size` outputs, once
+    that many tasks are waiting or `max_wait` seconds after the first one, and returns one
+    status per output, in the same order. It can be an async function; a synchronous one
+    runs in the event loop, or in a worker thread with `threaded=True`. Each task waits for
+    the status of its own output; if the hook raises, every task of the batch fails. The
+    job manager resets the hook when a job starts, dropping what a stopped job left behind.
+
+    Attributes:
+        func (Callable): The hook, called as `func(outputs, state)`
+        max_batch_size (int): Maximum number of outputs of one call
+        max_wait (float): Seconds the first output of a batch waits for more
+        threaded (bool): Run a synchronous hook in a worker thread
+        batch_count (int): Number of calls made
+    """
+
+    def __init__(self, func: Callable, max_batch_size: int = 32, max_wait: float = 0.05, threaded: bool = False):
+        """Wrap a batched hook.
+
+        Args:
+            func: The hook, called as `func(outputs, state)`, returning one status per output
+            max_batch_size: Maximum number of outputs of one call
+            max_wait: Seconds the first output of a batch waits for more
+            threaded: Run a synchronous hook in a worker thread
+
+        Raises:
+            InputError: If max_batch_size is below 1 or max_wait is negative
+        """
+        if max_batch_size < 1 or max_wait < 0:
+            raise InputError("BatchedHook needs max_batch_size >= 1 and max_wait >= 0")
+        self.func = func
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.threaded = threaded
+        self.batch_count = 0
+        self.__name__ = hook_name(func)
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks = set()
+
+    def reset(self) -> None:
+        """Drop the outputs and the timer left by a previous job, whose event loop may be gone."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._pending, self._timer, self._batch_tasks = [], None, set()
+
+    async def __call__(self, output: Any, state: Any) -> Any:
+        """Add the output to the next batch and return its status once the batch ran."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((output, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush(state)
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush, state)
+        return await future
+
+    def _flush(self, state: Any) -> None:
+        """Start a call of the hook with the outputs waiting."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run_batch(batch, state))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(self, batch: List[tuple], state: Any) -> None:
+        outputs = [output for output, _ in batch]
+        self.batch_count += 1
+        try:
+            if is_async_callable(self.func):
+                statuses = await self.func(outputs, state)
+            elif self.threaded:
+                statuses = await asyncio.to_thread(self.func, outputs, state)
+            else:
+                statuses = self.func(outputs, state)
+            if not isinstance(statuses, list) or len(statuses) != len(batch):
+                raise OutputError(f"Batched hook {self.__name__} must return a list with one status per output, expected {len(batch)}")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), status in zip(batch, statuses):
+            # A task stopped with the job no longer waits
+            if not future.done():
+                future.set_result(status)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the hook without its batches, pickled with the job config; batches only exist while a job runs."""
+        state = self.__dict__.copy()
+        state.update(_pending=[], _timer=None, _batch_tasks=set())
+        return state
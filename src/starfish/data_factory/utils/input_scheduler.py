@@ -0,0 +1,161 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, Optional
+
+from starfish.data_factory.constants import PRIORITY, SCHEDULE_FRESH_FIRST, SCHEDULE_INTERLEAVED, SCHEDULE_RETRIES_FIRST
+from starfish.data_factory.utils.errors import InputError
+
+SCHEDULE_POLICIES = (SCHEDULE_RETRIES_FIRST, SCHEDULE_FRESH_FIRST, SCHEDULE_INTERLEAVED)
+
+
+class InputScheduler:
+    """Priority scheduler for the job input queue.
+
+    Fresh inputs and retries are kept in two pools, each ordered by the priority hint of
+    the input (the optional `PRIORITY` key, higher first) and then by arrival. The
+    scheduling policy decides which pool is served next:
+
+    - retries_first: retries before fresh inputs, so failures are resolved early instead
+      of piling up at the end of the job
+    - fresh_first: fresh inputs before retries (the former FIFO behavior)
+    - interleaved: alternate between the two pools
+
+    A retry can carry a delay: it stays out of the pools until its backoff has elapsed,
+    so a waiting retry never holds a concurrency slot.
+
+    Implements the part of the `asyncio.Queue` interface the job manager relies on
+    (`put`, `put_nowait`, `get`, `get_nowait`, `qsize`, `empty`), where only inputs whose
+    delay has elapsed count as queued.
+
+    Attributes:
+        policy (str): Scheduling policy between fresh inputs and retries
+        last_wait (float): Seconds the input returned by the last `get` waited since it was ready
+    """
+
+    def __init__(self, policy: str = SCHEDULE_RETRIES_FIRST):
+        """Initialize the scheduler.
+
+        Args:
+            policy: One of retries_first, fresh_first or interleaved (default: retries_first)
+
+        Raises:
+            InputError: If the policy is unknown
+        """
+        if policy not in SCHEDULE_POLICIES:
+            raise InputError(f"Unknown schedule policy '{policy}', expected one of {', '.join(SCHEDULE_POLICIES)}")
+        self.policy = policy
+        self._fresh: List[Any] = []
+        self._retry: List[Any] = []
+        self._delayed: List[Any] = []
+        self._counter = itertools.count()
+        self._ready_at: Dict[int, float] = {}
+        self.last_wait = 0.0
+        self._serve_retry_next = True
+        self._put_event = asyncio.Event()
+
+    @classmethod
+    def from_queue(cls, queue: Optional[asyncio.Queue], policy: str = SCHEDULE_RETRIES_FIRST) -> "InputScheduler":
+        """Create a scheduler holding the inputs of a plain queue, which is drained."""
+        scheduler = cls(policy)
+        while queue is not None and not queue.empty():
+            scheduler.put_nowait(queue.get_nowait())
+        return scheduler
+
+    def put_nowait(self, input_data: Dict[str, Any], retry: bool = False, delay: float = 0) -> None:
+        """Queue an input.
+
+        Args:
+            input_data: The input record
+            retry: Whether the input is retried after a failed attempt
+            delay: Seconds before the input may be dispatched
+        """
+        entry = (-_priority(input_data), next(self._counter), input_data)
+        if delay > 0:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, entry, retry))
+        else:
+            self._ready_at[entry[1]] = time.monotonic()
+            heapq.heappush(self._retry if retry else self._fresh, entry)
+        self._put_event.set()
+
+    async def put(self, input_data: Dict[str, Any], retry: bool = False, delay: float = 0) -> None:
+        """Queue an input (never blocks, kept for `asyncio.Queue` compatibility)."""
+        self.put_nowait(input_data, retry=retry, delay=delay)
+
+    def _promote(self) -> None:
+        """Move the delayed inputs whose delay has elapsed into their pool."""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            ready_at, entry, retry = heapq.heappop(self._delayed)
+            self._ready_at[entry[1]] = ready_at
+            heapq.heappush(self._retry if retry else self._fresh, entry)
+
+    def get_nowait(self) -> Dict[str, Any]:
+        """Return the next input to dispatch according to the policy.
+
+        Raises:
+            asyncio.QueueEmpty: If no input is ready
+        """
+        self._promote()
+        if not self._fresh and not self._retry:
+            raise asyncio.QueueEmpty
+        if not self._fresh:
+            pool = self._retry
+        elif not self._retry:
+            pool = self._fresh
+        elif self.policy == SCHEDULE_RETRIES_FIRST:
+            pool = self._retry
+        elif self.policy == SCHEDULE_FRESH_FIRST:
+            pool = self._fresh
+        else:
+            pool = self._retry if self._serve_retry_next else self._fresh
+            self._serve_retry_next = not self._serve_retry_next
+        _, counter, input_data = heapq.heappop(pool)
+        self.last_wait = time.monotonic() - self._ready_at.pop(counter)
+        return input_data
+
+    async def get(self) -> Dict[str, Any]:
+        """Wait until an input is ready and return it."""
+        while True:
+            try:
+                return self.get_nowait()
+            except asyncio.QueueEmpty:
+                self._put_event.clear()
+                try:
+                    await asyncio.wait_for(self._put_event.wait(), self.next_ready_in())
+                except asyncio.TimeoutError:
+                    pass
+
+    def qsize(self) -> int:
+        """Return the number of inputs ready to be dispatched."""
+        self._promote()
+        return len(self._fresh) + len(self._retry)
+
+    def empty(self) -> bool:
+        """Return True if no input is ready to be dispatched."""
+        return self.qsize() == 0
+
+    def delayed_count(self) -> int:
+        """Return the number of retries still waiting for their delay."""
+        return len(self._delayed)
+
+    def next_ready_in(self) -> Optional[float]:
+        """Return the seconds until the next delayed input is ready, or None if none is delayed."""
+        if not self._delayed:
+            return None
+        return max(0.0, self._delayed[0][0] - time.monotonic())
+
+    def items(self) -> List[Dict[str, Any]]:
+        """Return every queued input, ready or delayed, without removing them."""
+        return [entry[2] for entry in self._fresh + self._retry] + [entry[2] for _, entry, _ in self._delayed]
+
+
+def _priority(input_data: Any) -> float:
+    """Return the priority hint of an input, 0 if it has none."""
+    if not isinstance(input_data, dict):
+        return 0
+    try:
+        return float(input_data.get(PRIORITY) or 0)
+    except (TypeError, ValueError) as e:
+        raise InputError(f"Priority hint '{PRIORITY}' must be a number, got {input_data.get(PRIORITY)!r}") from e
@@ -0,0 +1,269 @@
+import asyncio
+import csv
+import json
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.constants import IDX
+from starfish.data_factory.utils.errors import InputError, NoResumeSupportError
+
+logger = get_logger(__name__)
+
+
+class InputSource(ABC):
+    """Base class for lazily read input records.
+
+    Subclasses read one record at a time, so a job never holds more of its input in
+    memory than it is currently working on. Sources that can be reopened (such as
+    files) return a descriptor from `describe`, which is stored in the resume metadata
+    together with the read position instead of a copy of the input.
+    """
+
+    @abstractmethod
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        """Return an async iterator over the input records."""
+        pass
+
+    def describe(self) -> Optional[Dict[str, Any]]:
+        """Return a JSON-serializable descriptor to reopen the source, or None if it cannot be reopened."""
+        return None
+
+    @staticmethod
+    def from_description(description: Dict[str, Any]) -> "InputSource":
+        """Reopen a source from the descriptor returned by `describe`."""
+        source_type = description.get("type")
+        if source_type == JSONLSource.source_type:
+            return JSONLSource(description["path"], encoding=description.get("encoding", "utf-8"))
+        if source_type == CSVSource.source_type:
+            return CSVSource(description["path"], encoding=description.get("encoding", "utf-8"), delimiter=description.get("delimiter", ","))
+        raise NoResumeSupportError(f"Unknown input source type '{source_type}'")
+
+
+class IterableSource(InputSource):
+    """Input source over any iterable or async iterable of records (lists, generators, readers)."""
+
+    def __init__(self, iterable: Any):
+        """Initialize the source.
+
+        Args:
+            iterable: Iterable or async iterable yielding one dict per input record
+        """
+        self.iterable = iterable
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the records of the iterable, awaiting them if it is async."""
+        if hasattr(self.iterable, "__aiter__"):
+            async for record in self.iterable:
+                yield record
+        else:
+            for record in self.iterable:
+                yield record
+
+
+class JSONLSource(InputSource):
+    """Input source reading one JSON object per line from a file."""
+
+    source_type = "jsonl"
+
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        """Initialize the source.
+
+        Args:
+            path: Path of the JSONL file
+            encoding: File encoding (default: utf-8)
+        """
+        self.path = path
+        self.encoding = encoding
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the JSON object of every non-empty line."""
+        with open(self.path, "r", encoding=self.encoding) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def describe(self) -> Optional[Dict[str, Any]]:
+        """Return the path and encoding of the file."""
+        return {"type": self.source_type, "path": self.path, "encoding": self.encoding}
+
+
+class CSVSource(InputSource):
+    """Input source reading the rows of a CSV file with a header line."""
+
+    source_type = "csv"
+
+    def __init__(self, path: str, encoding: str = "utf-8", delimiter: str = ","):
+        """Initialize the source.
+
+        Args:
+            path: Path of the CSV file, whose first line holds the column names
+            encoding: File encoding (default: utf-8)
+            delimiter: Column delimiter (default: ",")
+        """
+        self.path = path
+        self.encoding = encoding
+        self.delimiter = delimiter
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every row as a dict keyed by the column names."""
+        with open(self.path, "r", encoding=self.encoding, newline="") as f:
+            for row in csv.DictReader(f, delimiter=self.delimiter):
+                yield dict(row)
+
+    def describe(self) -> Optional[Dict[str, Any]]:
+        """Return the path, encoding and delimiter of the file."""
+        return {"type": self.source_type, "path": self.path, "encoding": self.encoding, "delimiter": self.delimiter}
+
+
+def is_lazy_input(data: Any) -> bool:
+    """Return True if `data` must be read lazily instead of being materialized as a list."""
+    if data is None or isinstance(data, (list, tuple, dict, str, bytes)):
+        return False
+    return isinstance(data, InputSource) or hasattr(data, "__aiter__") or isinstance(data, (Iterator, Iterable))
+
+
+class InputFeeder:
+    """Pulls records from an input source into the job input queue as slots free up.
+
+    Assigns the input index, adds the broadcast parameters and keeps track of the read
+    position and of the records that were pulled but are not final yet (in flight or
+    waiting for a retry). Those two values are all the resume metadata needs.
+
+    Attributes:
+        source (InputSource): The lazily read input source
+        broadcast (dict): Parameters added to every record
+        position (int): Number of records read from the source, also the next input index
+        exhausted (bool): Whether the source has no more records
+        first_record (dict): The first record, read ahead by `prime` to validate parameters
+    """
+
+    def __init__(self, source: InputSource, broadcast: Optional[Dict[str, Any]] = None, position: int = 0, pending: Optional[List[Dict[str, Any]]] = None):
+        """Initialize the feeder.
+
+        Args:
+            source: The input source to read from
+            broadcast: Parameters added to every record
+            position: Number of records already read in a previous run, skipped when reading
+            pending: Records read in a previous run that never became final, fed again first
+        """
+        self.source = source
+        self.broadcast = broadcast or {}
+        self.position = position
+        self.exhausted = False
+        self.first_record = None
+        self._skip = position
+        self._iterator = None
+        self._lookahead = deque(pending or [])
+        self._pending = {record.get(IDX): record for record in self._lookahead}
+
+    async def _read(self) -> Optional[Dict[str, Any]]:
+        """Read the next record from the source, or return None once it is exhausted."""
+        if self.exhausted:
+            return None
+        if self._iterator is None:
+            self._iterator = self.source.__aiter__()
+        try:
+            while True:
+                record = await self._iterator.__anext__()
+                if self._skip > 0:
+                    # Already read before the resume
+                    self._skip -= 1
+                    continue
+                break
+        except StopAsyncIteration:
+            self.exhausted = True
+            return None
+        if not isinstance(record, dict):
+            raise InputError(f"Input source must yield dicts, got {type(record).__name__}")
+        record = {IDX: self.position, **record, **self.broadcast}
+        self.position += 1
+        self._pending[record[IDX]] = record
+        return record
+
+    async def prime(self) -> Optional[Dict[str, Any]]:
+        """Read the first record ahead of the job, so its parameters can be validated."""
+        if self.first_record is None:
+            if not self._lookahead:
+                record = await self._read()
+                if record is not None:
+                    self._lookahead.append(record)
+            self.first_record = self._lookahead[0] if self._lookahead else None
+        return self.first_record
+
+    async def feed(self, queue: asyncio.Queue, max_records: int = 1) -> List[Dict[str, Any]]:
+        """Move up to `max_records` records from the source into the queue.
+
+        Args:
+            queue: The job input queue
+            max_records: Maximum number of records to move
+
+        Returns:
+            List[Dict[str, Any]]: The records moved into the queue
+        """
+        fed = []
+        while len(fed) < max_records:
+            record = self._lookahead.popleft() if self._lookahead else await self._read()
+            if record is None:
+                break
+            queue.put_nowait(record)
+            fed.append(record)
+        return fed
+
+    def has_more(self) -> bool:
+        """Return True if records may still be fed."""
+        return bool(self._lookahead) or not self.exhausted
+
+    def mark_final(self, input_data_idx: Any, result: Optional[Dict[str, Any]] = None) -> None:
+        """Forget a record that was completed or moved to the dead queue (its task result is not needed)."""
+        self._pending.pop(input_data_idx, None)
+
+    def requeue_pending(self) -> None:
+        """Feed the records that never became final again first, to resume in the same session."""
+        queued = {record.get(IDX) for record in self._lookahead}
+        self._lookahead.extendleft(reversed([record for idx, record in self._pending.items() if idx not in queued]))
+        self.first_record = None
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Return the resume metadata: source descriptor, read position and non-final records."""
+        return {
+            "source": self.source.describe(),
+            "broadcast": self.broadcast,
+            "position": self.position,
+            "pending": list(self._pending.values()),
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: Dict[str, Any]) -> "InputFeeder":
+        """Recreate a feeder from the metadata returned by `checkpoint`.
+
+        Raises:
+            NoResumeSupportError: If the source cannot be reopened
+        """
+        description = checkpoint.get("source")
+        if not description:
+            raise NoResumeSupportError("The input source of this job cannot be reopened; only file sources such as JSONLSource or CSVSource support resume")
+        return cls(
+            InputSource.from_description(description),
+            broadcast=checkpoint.get("broadcast"),
+            position=checkpoint.get("position", 0),
+            pending=checkpoint.get("pending"),
+        )
+
+
+def create_input_feeder(data: Any, **kwargs) -> InputFeeder:
+    """Create the feeder of a lazy input source.
+
+    Args:
+        data: Lazy input, either an InputSource or any iterable or async iterable of dicts
+        **kwargs: Broadcast parameters added to every record
+
+    Raises:
+        InputError: If a list parameter is combined with the lazy source
+    """
+    for key, value in kwargs.items():
+        if isinstance(value, (list, tuple)):
+            raise InputError(f"Parameter '{key}' is a list; parallel list parameters cannot be combined with a lazy input source")
+    source = data if isinstance(data, InputSource) else IterableSource(data)
+    return InputFeeder(source, broadcast=kwargs)
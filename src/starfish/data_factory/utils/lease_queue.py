@@ -0,0 +1,160 @@
+import asyncio
+import os
+import socket
+from typing import Any, Dict, List, Optional, Tuple
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.config import LEASE_POLL_INTERVAL, LEASE_TIMEOUT
+from starfish.data_factory.constants import IDX, RECORD_STATUS
+from starfish.data_factory.storage.base import Storage
+from starfish.data_factory.utils.errors import InputError
+
+logger = get_logger(__name__)
+
+# Storage capability flag of the backends implementing the lease queue
+LEASE_QUEUE_CAPABILITY = "LEASE_QUEUE"
+
+
+def default_worker_id() -> str:
+    """Return an identifier unique to this process across the hosts sharing the storage."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def check_lease_queue_support(storage: Storage) -> None:
+    """Raise an InputError if the storage cannot hold a lease queue shared between workers."""
+    if LEASE_QUEUE_CAPABILITY not in (storage.capabilities or set()):
+        raise InputError(f"lease_queue requires a storage shared between the workers such as 'local', got {storage.__class__.__name__}")
+
+
+class LeaseFeeder:
+    """Feeds the job input queue from the lease queue of a master job in storage.
+
+    Every input of the master job is a work item in storage. The feeder claims items
+    with a lease of `lease_timeout` seconds and commits each item once its task result is
+    final. Between `start` and `close`, a background task renews the leases of the items
+    it still holds every third of the lease timeout, so a long task (or a dispatcher
+    waiting on full concurrency) never loses its item to another worker. An item
+    whose lease expires (its worker crashed or hung) is claimed again by any worker, so
+    every input runs at least once. Commits are batched with the next claim.
+
+    Has the interface of `InputFeeder` the job manager relies on (`feed`, `has_more`,
+    `mark_final`).
+
+    Attributes:
+        master_job_id (str): ID of the master job whose items are claimed
+        worker_id (str): Lease owner recorded in storage
+        lease_timeout (float): Seconds a claimed item stays invisible to the other workers
+        poll_interval (float): Seconds between two claims while other workers hold the remaining items
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        master_job_id: str,
+        worker_id: Optional[str] = None,
+        lease_timeout: float = LEASE_TIMEOUT,
+        poll_interval: float = LEASE_POLL_INTERVAL,
+    ):
+        """Initialize the feeder.
+
+        Args:
+            storage: Storage holding the work items, with the LEASE_QUEUE capability
+            master_job_id: ID of the master job
+            worker_id: Lease owner (default: hostname:pid)
+            lease_timeout: Seconds a claimed item stays invisible to the other workers
+            poll_interval: Seconds between two claims while the other workers hold the remaining items
+
+        Raises:
+            InputError: If the storage has no lease queue or the lease timeout is not positive
+        """
+        check_lease_queue_support(storage)
+        if lease_timeout <= 0:
+            raise InputError(f"lease_timeout must be positive, got {lease_timeout}")
+        self.storage = storage
+        self.master_job_id = master_job_id
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.first_record = None
+        self._held: Dict[Any, Dict[str, Any]] = {}
+        self._to_commit: List[Tuple[int, str, List[str]]] = []
+        self._unfinished = 1
+        self._renew_task = None
+
+    async def enqueue(self, items: List[Dict[str, Any]]) -> None:
+        """Store inputs as pending work items of the master job.
+
+        Raises:
+            InputError: If an input has no index or cannot be stored as JSON
+        """
+        if any(item.get(IDX) is None for item in items):
+            raise InputError("Every input of a lease queue needs an index")
+        try:
+            await self.storage.enqueue_work_items(self.master_job_id, items)
+        except (TypeError, ValueError) as e:
+            raise InputError(f"Inputs of a lease queue must be JSON serializable: {e}") from e
+
+    async def feed(self, queue: asyncio.Queue, max_records: int = 1) -> List[Dict[str, Any]]:
+        """Commit the final items and claim up to `max_records` items into the queue.
+
+        Args:
+            queue: The job input queue
+            max_records: Maximum number of items to claim
+
+        Returns:
+            List[Dict[str, Any]]: The inputs claimed
+        """
+        await self._commit()
+        claimed = await self.storage.claim_work_items(self.master_job_id, self.worker_id, max_records, self.lease_timeout) if max_records > 0 else []
+        for record in claimed:
+            self._held[record.get(IDX)] = record
+            queue.put_nowait(record)
+        if claimed:
+            logger.debug(f"Worker {self.worker_id} claimed {len(claimed)} items of master job {self.master_job_id}")
+            self._unfinished = 1
+        else:
+            counts = await self.storage.count_work_items(self.master_job_id)
+            self._unfinished = counts.get("pending", 0) + counts.get("leased", 0)
+        return claimed
+
+    def has_more(self) -> bool:
+        """Return True while items of the master job are pending or leased, by this worker or another one."""
+        return self._unfinished > 0
+
+    def mark_final(self, input_data_idx: Any, result: Optional[Dict[str, Any]] = None) -> None:
+        """Queue the commit of an item whose task result is final (completed or dead queue)."""
+        if self._held.pop(input_data_idx, None) is None:
+            return
+        result = result or {}
+        self._to_commit.append((input_data_idx, result.get(RECORD_STATUS), result.get("output_ref") or []))
+
+    async def _commit(self) -> None:
+        if self._to_commit:
+            to_commit, self._to_commit = self._to_commit, []
+            await self.storage.complete_work_items(self.master_job_id, self.worker_id, to_commit)
+
+    async def start(self) -> None:
+        """Start renewing the held leases while the job runs."""
+        self._renew_task = asyncio.create_task(self._renew_periodically())
+
+    async def _renew_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_timeout / 3)
+            if not self._held:
+                continue
+            try:
+                await self.storage.renew_work_item_leases(self.master_job_id, self.worker_id, list(self._held), self.lease_timeout)
+            except Exception as e:
+                # Retried at the next period; the lease only expires after three missed renewals
+                logger.warning(f"Failed to renew the leases of worker {self.worker_id}: {e}")
+
+    async def close(self) -> None:
+        """Stop the renewals, commit the final items and release the leases of the others, so other workers claim them at once."""
+        if self._renew_task is not None:
+            self._renew_task.cancel()
+            await asyncio.gather(self._renew_task, return_exceptions=True)
+            self._renew_task = None
+        await self._commit()
+        if self._held:
+            await self.storage.release_work_items(self.master_job_id, self.worker_id, list(self._held))
+            self._held.clear()
@@ -0,0 +1,74 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from starfish.data_factory.utils.histogram import LatencyHistogram
+
+# Phases of a task timed by the job manager
+PHASE_QUEUE_WAIT = "queue_wait"
+PHASE_USER_FUNC = "user_func"
+PHASE_HOOKS = "hooks"
+PHASE_STORAGE_SAVE = "storage_save"
+METRIC_PHASES = (PHASE_QUEUE_WAIT, PHASE_USER_FUNC, PHASE_HOOKS, PHASE_STORAGE_SAVE)
+# Prefix of the phase timing each hook on its own, e.g. `hook:my_filter`
+PHASE_HOOK_PREFIX = "hook:"
+
+METRIC_PERCENTILES = (50, 90, 99)
+
+
+class JobMetrics:
+    """Per-task timings of a job, broken down by phase.
+
+    Each phase is kept in a fixed-size `LatencyHistogram`, so recording stays O(1) and
+    the memory constant however many tasks run:
+
+    - queue_wait: time an input waited in the input queue once ready to be dispatched
+    - user_func: time of the user function call (one call per micro-batch, with its retries and hedged attempts)
+    - hooks: time of the on_record_complete hooks
+    - storage_save: time to save the records and their metadata
+    - hook:<name>: time of each on_record_complete / on_record_error hook, added when first recorded
+
+    Attributes:
+        histograms (Dict[str, LatencyHistogram]): Histogram of every phase
+    """
+
+    def __init__(self):
+        """Initialize empty histograms for every phase."""
+        self.histograms: Dict[str, LatencyHistogram] = {phase: LatencyHistogram() for phase in METRIC_PHASES}
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Add the duration of one phase of a task."""
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = LatencyHistogram()
+        histogram.record(seconds)
+
+    @contextmanager
+    def time(self, phase: str) -> Iterator[None]:
+        """Record the duration of the enclosed block as one sample of `phase`, even if it raises."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(phase, time.monotonic() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return count, mean, p50, p90, p99 and max (in seconds) of every phase with samples.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Statistics keyed by phase, then by statistic
+        """
+        summary = {}
+        for phase, histogram in self.histograms.items():
+            if histogram.count == 0:
+                continue
+            stats = {"count": histogram.count, "mean": round(histogram.mean(), 6)}
+            for q in METRIC_PERCENTILES:
+                stats[f"p{q}"] = round(histogram.percentile(q), 6)
+            stats["max"] = round(histogram.max, 6)
+            summary[phase] = stats
+        return summary
+
+    def format_summary(self) -> str:
+        """Return a one-line summary of the phases, e.g. `user_func p50=1.20s p90=2.10s p99=3.00s max=3.20s`."""
+        return " | ".join(f"{phase} " + " ".join(f"{key}={stats[key]:.3f}s" for key in ("p50", "p90", "p99", "max")) for phase, stats in self.summary().items())
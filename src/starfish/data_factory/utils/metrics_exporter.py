@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.config import METRICS_EXPORT_INTERVAL
+from starfish.data_factory.utils.errors import InputError
+from starfish.data_factory.utils.metrics import METRIC_PERCENTILES
+
+logger = get_logger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def snapshot_job_metrics(job_manager: Any, elapsed: float) -> Dict[str, Any]:
+    """Return the counters, gauges and latency quantiles of a running job.
+
+    Args:
+        job_manager: The JobManager of the job
+        elapsed: Seconds since the job started, used for the throughput in completed tasks per second
+
+    Returns:
+        Dict[str, Any]: master_job_id, counters, gauges and latency (JobMetrics.summary, with the sum of each phase)
+    """
+    semaphore = getattr(job_manager, "semaphore", None)
+    latency = job_manager.metrics.summary()
+    for phase, stats in latency.items():
+        stats["sum"] = round(job_manager.metrics.histograms[phase].total, 6)
+    return {
+        "master_job_id": job_manager.master_job_id,
+        "timestamp": time.time(),
+        "counters": {
+            "attempted": job_manager.total_count,
+            "completed": job_manager.completed_count,
+            "failed": job_manager.failed_count,
+            "filtered": job_manager.filtered_count,
+            "duplicate": job_manager.duplicate_count,
+            "dead_queue": job_manager.dead_queue_count,
+            "cache_hits": job_manager.result_cache.hit_count if getattr(job_manager, "result_cache", None) else 0,
+        },
+        "gauges": {
+            "in_flight": getattr(job_manager, "in_flight_count", 0),
+            "concurrency_limit": semaphore.limit if semaphore is not None else 0,
+            "concurrency_in_use": semaphore.in_use if semaphore is not None else 0,
+            "throughput": round(job_manager.completed_count / elapsed, 6) if elapsed > 0 else 0.0,
+            "elapsed_seconds": round(elapsed, 3),
+        },
+        "latency": latency,
+    }
+
+
+def format_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Render a metrics snapshot in the Prometheus text exposition format."""
+    label = f'master_job_id="{snapshot["master_job_id"]}"'
+    lines = []
+    for name, value in snapshot["counters"].items():
+        lines += [f"# TYPE starfish_tasks_{name}_total counter", f"starfish_tasks_{name}_total{{{label}}} {value}"]
+    for name, value in snapshot["gauges"].items():
+        lines += [f"# TYPE starfish_{name} gauge", f"starfish_{name}{{{label}}} {value}"]
+    if snapshot["latency"]:
+        lines.append("# TYPE starfish_task_phase_seconds summary")
+        for phase, stats in snapshot["latency"].items():
+            phase_label = f'{label},phase="{phase}"'
+            for q in METRIC_PERCENTILES:
+                lines.append(f'starfish_task_phase_seconds{{{phase_label},quantile="{q / 100:g}"}} {stats[f"p{q}"]}')
+            lines += [
+                f"starfish_task_phase_seconds_sum{{{phase_label}}} {stats['sum']}",
+                f"starfish_task_phase_seconds_count{{{phase_label}}} {stats['count']}",
+            ]
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Publishes the live metrics of a job for monitoring, next to the progress log.
+
+    - With a `port`, serves the Prometheus text format on `http://<host>:<port>/metrics`
+      (and the JSON snapshot on `/metrics.json`) while the job runs.
+    - With a `file`, rewrites a JSON snapshot every `interval` seconds, atomically so a
+      reader never sees a partial file, and once more when the job stops.
+
+    Attributes:
+        port (int): Port the HTTP endpoint is bound to, the actual port once started if 0 was given
+        host (str): Interface the HTTP endpoint listens on
+        file (str): Path of the JSON snapshot
+        interval (float): Seconds between two rewrites of the file
+    """
+
+    def __init__(
+        self, job_manager: Any, port: Optional[int] = None, file: Optional[str] = None, host: str = "127.0.0.1", interval: float = METRICS_EXPORT_INTERVAL
+    ):
+        """Initialize the exporter.
+
+        Args:
+            job_manager: The JobManager of the job
+            port: Port of the Prometheus endpoint (0 picks a free port), None to disable it
+            file: Path of the JSON snapshot, None to disable it
+            host: Interface the HTTP endpoint listens on (default: localhost only)
+            interval: Seconds between two rewrites of the file
+
+        Raises:
+            InputError: If neither a port nor a file is given
+        """
+        if port is None and file is None:
+            raise InputError("MetricsExporter needs a port or a file")
+        self.job_manager = job_manager
+        self.port = port
+        self.host = host
+        self.file = file
+        self.interval = interval
+        self._started_at = time.monotonic()
+        self._server = None
+        self._writer_task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current metrics of the job."""
+        return snapshot_job_metrics(self.job_manager, time.monotonic() - self._started_at)
+
+    async def start(self) -> None:
+        """Start the HTTP endpoint and the periodic file writer.
+
+        Raises:
+            InputError: If the port cannot be bound
+        """
+        self._started_at = time.monotonic()
+        if self.port is not None:
+            try:
+                self._server = await asyncio.start_server(self._handle_request, self.host, self.port)
+            except OSError as e:
+                raise InputError(f"Cannot serve metrics on {self.host}:{self.port}: {e}") from e
+            self.port = self._server.sockets[0].getsockname()[1]
+            logger.info(f"[METRICS] Prometheus metrics on http://{self.host}:{self.port}/metrics")
+        if self.file is not None:
+            self._writer_task = asyncio.create_task(self._write_periodically())
+
+    async def stop(self) -> None:
+        """Stop the HTTP endpoint and write the final snapshot to the file."""
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+            self._write_file()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _write_periodically(self) -> None:
+        while True:
+            self._write_file()
+            await asyncio.sleep(self.interval)
+
+    def _write_file(self) -> None:
+        try:
+            directory = os.path.dirname(self.file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.file}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, self.file)
+        except OSError as e:
+            # Monitoring must never stop the job
+            logger.warning(f"Failed to write metrics file {self.file}: {e}")
+
+    async def _handle_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer one HTTP GET request and close the connection."""
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            # Skip the headers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            path = request_line[1].split("?")[0] if len(request_line) > 1 else ""
+            if path in ("/", "/metrics"):
+                status, content_type, body = "200 OK", PROMETHEUS_CONTENT_TYPE, format_prometheus(self.snapshot())
+            elif path == "/metrics.json":
+                status, content_type, body = "200 OK", "application/json", json.dumps(self.snapshot())
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+            payload = body.encode()
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.debug(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+
+def create_metrics_exporter(job_manager: Any, port: Optional[int] = None, file: Optional[str] = None) -> Optional[MetricsExporter]:
+    """Return a MetricsExporter, or None if neither a port nor a file is configured."""
+    if port is None and file is None:
+        return None
+    return MetricsExporter(job_manager, port=port, file=file)
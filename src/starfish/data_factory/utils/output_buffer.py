@@ -0,0 +1,115 @@
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from collections import deque
+from typing import Any, Dict, Iterator, List
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.utils.errors import OutputError
+
+logger = get_logger(__name__)
+
+
+class OutputBuffer:
+    """Bounded-memory store for the task results of a job.
+
+    Keeps at most `max_in_memory` results in memory. Once that size is passed, the
+    buffered results are pickled to a segment file in a temporary spill directory
+    and dropped from memory, so they come back with the same types (tuples, dates,
+    non-string keys) as the results kept in memory. Iteration reads the spill segments lazily, in
+    the order they were written, then the in-memory tail, so results are always
+    returned in insertion order. The spill directory is removed when the buffer is
+    closed or garbage collected.
+
+    Implements the part of the `asyncio.Queue` interface the job manager relies on
+    (`put`, `put_nowait`, `qsize`, `empty`), so it can replace the output queue.
+
+    Attributes:
+        max_in_memory (int): Number of results kept in memory before spilling (0 never spills)
+        spill_count (int): Number of results written to spill segments
+    """
+
+    def __init__(self, max_in_memory: int = 0):
+        """Initialize the buffer.
+
+        Args:
+            max_in_memory: Number of results kept in memory before spilling to disk.
+                0 keeps every result in memory.
+        """
+        self.max_in_memory = max_in_memory
+        self.spill_count = 0
+        self._memory = deque()
+        self._segments: List[str] = []
+        self._spill_dir = None
+        self._finalizer = None
+
+    def put_nowait(self, result: Dict[str, Any]) -> None:
+        """Add a task result, spilling the in-memory results to disk if the buffer is full."""
+        self._memory.append(result)
+        if self.max_in_memory > 0 and len(self._memory) > self.max_in_memory:
+            self._spill()
+
+    async def put(self, result: Dict[str, Any]) -> None:
+        """Add a task result (never blocks, kept for `asyncio.Queue` compatibility)."""
+        self.put_nowait(result)
+
+    def qsize(self) -> int:
+        """Return the total number of results, in memory and spilled."""
+        return self.spill_count + len(self._memory)
+
+    def empty(self) -> bool:
+        """Return True if no result has been added."""
+        return self.qsize() == 0
+
+    def __len__(self) -> int:
+        """Return the total number of results, in memory and spilled."""
+        return self.qsize()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every result in insertion order, reading spill segments lazily."""
+        for segment in list(self._segments):
+            with open(segment, "rb") as f:
+                while True:
+                    try:
+                        yield pickle.load(f)
+                    except EOFError:
+                        break
+        yield from list(self._memory)
+
+    def _spill(self) -> None:
+        """Write the in-memory results to a new segment and release them.
+
+        Raises:
+            OutputError: If a result cannot be pickled, it would not come back as it was, or the
+                segment cannot be written
+        """
+        try:
+            payloads = [pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL) for result in self._memory]
+        except Exception as e:
+            raise OutputError(f"Task output cannot be spilled to disk, it is not picklable ({e}); set output_buffer_size=0 to keep it in memory") from e
+        try:
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.mkdtemp(prefix="starfish_output_")
+                self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+                logger.debug(f"Spilling job output to {self._spill_dir}")
+            segment = os.path.join(self._spill_dir, f"segment_{len(self._segments):06d}.pkl")
+            with open(segment, "wb") as f:
+                for payload in payloads:
+                    f.write(payload)
+        except OSError as e:
+            raise OutputError(f"Task output cannot be spilled to disk ({e}); set output_buffer_size=0 to keep it in memory") from e
+        self._segments.append(segment)
+        self.spill_count += len(self._memory)
+        self._memory.clear()
+
+    def close(self) -> None:
+        """Remove the spill directory and drop every result."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._memory.clear()
+        self._segments = []
+        self._spill_dir = None
+        self._finalizer = None
+        self.spill_count = 0
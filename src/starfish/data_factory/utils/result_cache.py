@@ -0,0 +1,141 @@
+import hashlib
+import inspect
+import json
+from dataclasses import dataclass
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from starfish.common.logger import get_logger
+from starfish.data_factory.config import RESULT_CACHE_MAX_SIZE_MB
+from starfish.data_factory.constants import IDX, PRIORITY
+from starfish.data_factory.storage.base import Storage
+from starfish.data_factory.utils.errors import InputError
+
+logger = get_logger(__name__)
+
+# Storage capability flag of the backends holding a result cache shared across master jobs
+RESULT_CACHE_CAPABILITY = "RESULT_CACHE"
+
+
+@dataclass
+class ResultCachePolicy:
+    """How the outputs of the user function are cached across master jobs.
+
+    Attributes:
+        version (str): Version of the function the cache is keyed by; None fingerprints its code
+        max_size_mb (float): Size of the cache in storage, the least recently used outputs are evicted beyond it
+    """
+
+    version: Optional[str] = None
+    max_size_mb: float = RESULT_CACHE_MAX_SIZE_MB
+
+
+def _code_fingerprint(code: CodeType, digest: "hashlib._Hash") -> None:
+    """Feed the bytecode, names and constants of a code object, and of the functions it defines, to a digest.
+
+    File names and line numbers are left out, so moving the function does not invalidate the cache.
+    """
+    digest.update(code.co_code)
+    digest.update(repr((code.co_names, code.co_varnames, code.co_freevars)).encode())
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            _code_fingerprint(const, digest)
+        else:
+            digest.update(repr(const).encode())
+
+
+def function_fingerprint(func: Callable) -> str:
+    """Return a fingerprint of the code of a function, which changes whenever its body changes.
+
+    The globals and closure values the function reads are not part of it: give the cache an
+    explicit version when the output depends on them (a prompt defined outside, a model name).
+    """
+    func = inspect.unwrap(func)
+    if not hasattr(func, "__code__"):
+        # A callable object: fingerprint its __call__
+        func = type(func).__call__
+    digest = hashlib.sha256(f"{func.__module__}.{func.__qualname__}".encode())
+    _code_fingerprint(func.__code__, digest)
+    digest.update(repr(func.__defaults__).encode())
+    return digest.hexdigest()
+
+
+def input_fingerprint(input_data: Dict[str, Any]) -> str:
+    """Return the hash of an input, without its index and priority, with sorted keys."""
+    payload = {key: value for key, value in input_data.items() if key not in (IDX, PRIORITY)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    """Serves the output of inputs the same function already completed, in this or an earlier master job.
+
+    An output is cached once its task completed, under the fingerprint of the function (or
+    the policy version) and of the input. The cache lives in storage, is shared by every
+    master job using it, and evicts the least recently used outputs past `max_size_mb`.
+    A storage error never fails the job: the input is then run as if it were not cached.
+
+    Attributes:
+        policy (ResultCachePolicy): Version and size of the cache
+        fingerprint (str): Fingerprint of the function the cache is keyed by
+        hit_count (int): Inputs served from the cache
+        miss_count (int): Inputs looked up and not found
+    """
+
+    def __init__(self, storage: Storage, user_func: Callable, policy: ResultCachePolicy):
+        """Initialize the cache of a function.
+
+        Args:
+            storage: Storage holding the cache, with the RESULT_CACHE capability
+            user_func: Function whose outputs are cached
+            policy: Version and size of the cache
+
+        Raises:
+            InputError: If the storage cannot hold the cache, or the size is not positive
+        """
+        if RESULT_CACHE_CAPABILITY not in (storage.capabilities or set()):
+            raise InputError(f"result_cache requires a storage holding the cache such as 'local', got {storage.__class__.__name__}")
+        if policy.max_size_mb <= 0:
+            raise InputError(f"result_cache max_size_mb must be positive, got {policy.max_size_mb}")
+        self.storage = storage
+        self.policy = policy
+        self.fingerprint = f"version:{policy.version}" if policy.version is not None else function_fingerprint(user_func)
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def key(self, input_data: Dict[str, Any]) -> str:
+        """Return the cache key of an input."""
+        return hashlib.sha256(f"{self.fingerprint}:{input_fingerprint(input_data)}".encode()).hexdigest()
+
+    async def get(self, input_data: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached output of an input, None if it is not cached."""
+        try:
+            payload = await self.storage.get_cached_result(self.key(input_data))
+        except Exception as e:
+            logger.warning(f"Result cache lookup failed, running the input: {e}")
+            payload = None
+        if payload is None:
+            self.miss_count += 1
+            return None
+        self.hit_count += 1
+        return json.loads(payload)
+
+    async def put(self, input_data: Dict[str, Any], output: List[Dict[str, Any]]) -> None:
+        """Cache the output of a completed input; outputs JSON cannot hold are not cached."""
+        try:
+            payload = json.dumps(output)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Output not cached, it is not JSON serializable: {e}")
+            return
+        try:
+            await self.storage.put_cached_result(self.key(input_data), payload, int(self.policy.max_size_mb * 1024 * 1024))
+        except Exception as e:
+            logger.warning(f"Result cache write failed: {e}")
+
+
+def create_result_cache(policy: Union[ResultCachePolicy, dict, None], storage: Storage, user_func: Callable) -> Optional[ResultCache]:
+    """Return the ResultCache of a function from a policy or its dict form (as stored in resume metadata), None if disabled."""
+    if policy is None:
+        return None
+    if isinstance(policy, dict):
+        policy = ResultCachePolicy(**policy)
+    return ResultCache(storage, user_func, policy)
@@ -0,0 +1,113 @@
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from starfish.data_factory.constants import IDX, RECORD_STATUS, STATUS_FAILED
+
+# Marks the end of the stream in the underlying queue
+_END_OF_STREAM = object()
+
+
+class ResultStream:
+    """Bounded async stream of the records produced by a running job.
+
+    The job publishes every task result as soon as its completion is handled, and the
+    consumer iterates over the matching records while the job keeps running. Because the
+    queue is bounded, a slow consumer makes `publish` wait, which in turn holds the task's
+    concurrency slot: the job never runs more than `maxsize` records ahead of the consumer.
+
+    In ordered mode the records are released by ascending input index. The records of an
+    index are held until the index is final (completed, or moved to the dead queue) and
+    every lower index is final too; whatever is still held when the job ends is flushed
+    in index order.
+
+    Attributes:
+        status_filter (set): Statuses whose records are yielded (None yields every status)
+        ordered (bool): Whether records are released by ascending input index
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        status_filter: Optional[Iterable[str]] = None,
+        ordered: bool = False,
+        expected_idx: Optional[Iterable[Any]] = None,
+    ):
+        """Initialize the stream.
+
+        Args:
+            maxsize: Maximum number of records buffered ahead of the consumer (0 means unbounded)
+            status_filter: Statuses whose records are yielded. None yields every status.
+            ordered: Release records by ascending input index
+            expected_idx: Input indices the job is going to process, required for ordered mode
+        """
+        self.status_filter = set(status_filter) if status_filter is not None else None
+        self.ordered = ordered
+        self._queue = asyncio.Queue(maxsize)
+        # Serializes publishers so the records of one result stay contiguous and ordered
+        self._publish_lock = asyncio.Lock()
+        self._pending_idx = deque(sorted(set(expected_idx or [])))
+        self._expected_idx = set(self._pending_idx)
+        self._final_idx = set()
+        self._held = {}
+        self._closed = False
+
+    def expect(self, idx: Any) -> None:
+        """Register an input index read lazily, in ascending order, for ordered mode."""
+        if idx not in self._expected_idx:
+            self._pending_idx.append(idx)
+            self._expected_idx.add(idx)
+
+    def _select_records(self, result: Dict[str, Any]) -> List[Any]:
+        """Return the records of a task result that pass the status filter."""
+        status = result.get(RECORD_STATUS)
+        if self.status_filter is not None and status not in self.status_filter:
+            return []
+        return result.get("output", []) if status != STATUS_FAILED else result.get("err", [])
+
+    async def publish(self, result: Dict[str, Any], is_final: bool = True) -> None:
+        """Publish a task result, waiting while the consumer is `maxsize` records behind.
+
+        Args:
+            result: Task result as created by the job manager
+            is_final: Whether no further result will be published for this input index
+        """
+        records = self._select_records(result)
+        async with self._publish_lock:
+            if self._closed:
+                return
+            idx = result.get(IDX)
+            if not self.ordered or idx not in self._expected_idx:
+                for record in records:
+                    await self._queue.put(record)
+                return
+
+            self._held.setdefault(idx, []).extend(records)
+            if is_final:
+                self._final_idx.add(idx)
+            while self._pending_idx and self._pending_idx[0] in self._final_idx:
+                next_idx = self._pending_idx.popleft()
+                self._final_idx.discard(next_idx)
+                self._expected_idx.discard(next_idx)
+                for record in self._held.pop(next_idx, []):
+                    await self._queue.put(record)
+
+    async def close(self) -> None:
+        """Flush the records still held back by ordered mode and end the stream."""
+        async with self._publish_lock:
+            if self._closed:
+                return
+            self._closed = True
+            for idx in self._pending_idx:
+                for record in self._held.pop(idx, []):
+                    await self._queue.put(record)
+            self._pending_idx.clear()
+            await self._queue.put(_END_OF_STREAM)
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        """Yield records until the stream is closed."""
+        while True:
+            record = await self._queue.get()
+            if record is _END_OF_STREAM:
+                return
+            yield record
@@ -0,0 +1,213 @@
+import asyncio
+import email.utils
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional, Union
+
+from starfish.data_factory.utils.errors import InputError, OutputError
+
+# HTTP status codes worth retrying: the request may succeed later
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429}
+# Exception class names (LiteLLM, OpenAI, httpx) for transient failures
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError",
+    "APIConnectionError",
+    "APITimeoutError",
+    "Timeout",
+    "TimeoutException",
+    "ServiceUnavailableError",
+    "InternalServerError",
+    "ConnectError",
+    "ReadTimeout",
+}
+# Exception class names for failures that repeat on every attempt: bad request, auth, validation
+NON_RETRYABLE_ERROR_NAMES = {
+    "AuthenticationError",
+    "PermissionDeniedError",
+    "BadRequestError",
+    "NotFoundError",
+    "UnprocessableEntityError",
+    "ContentPolicyViolationError",
+    "ContextWindowExceededError",
+    "UnsupportedParamsError",
+    "ValidationError",
+    "PydanticValidationError",
+}
+
+
+def _error_chain(error: BaseException) -> Iterator[BaseException]:
+    """Yield an error and the errors it was raised from (`__cause__`, then `__context__`)."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """Return the HTTP status code carried by an error, if any."""
+    for candidate in (getattr(error, "status_code", None), getattr(getattr(error, "response", None), "status_code", None)):
+        try:
+            return int(candidate)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def classify_error(error: BaseException) -> bool:
+    """Return True if a failed task is worth retrying.
+
+    Timeouts, rate limits, connection errors and 5xx responses are retryable; validation
+    and authentication errors, other 4xx responses and input or output contract errors
+    (InputError, OutputError) are not. The errors an error was
+    raised from are inspected too, since LLM calls wrap provider errors. Unknown errors
+    are retryable.
+
+    Args:
+        error: The exception raised by the task
+    """
+    for err in _error_chain(error):
+        if isinstance(err, (InputError, OutputError)):
+            return False
+        if isinstance(err, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+            return True
+        status_code = _status_code(err)
+        if status_code is not None:
+            return status_code >= 500 or status_code in RETRYABLE_STATUS_CODES
+        name = type(err).__name__
+        if name in RETRYABLE_ERROR_NAMES:
+            return True
+        if name in NON_RETRYABLE_ERROR_NAMES:
+            return False
+    return True
+
+
+# Error categories of the circuit breaker
+ERROR_CATEGORY_AUTH = "auth"
+ERROR_CATEGORY_QUOTA = "quota"
+ERROR_CATEGORY_TIMEOUT = "timeout"
+ERROR_CATEGORY_CONNECTION = "connection"
+ERROR_CATEGORY_SERVER = "server"
+ERROR_CATEGORY_BAD_REQUEST = "bad_request"
+ERROR_CATEGORY_CONTRACT = "contract"
+
+AUTH_ERROR_NAMES = {"AuthenticationError", "PermissionDeniedError"}
+QUOTA_ERROR_NAMES = {"RateLimitError"}
+TIMEOUT_ERROR_NAMES = {"APITimeoutError", "Timeout", "TimeoutException", "ReadTimeout"}
+CONNECTION_ERROR_NAMES = {"APIConnectionError", "ConnectError"}
+SERVER_ERROR_NAMES = {"ServiceUnavailableError", "InternalServerError"}
+
+
+def categorize_error(error: BaseException) -> str:
+    """Return the normalized category of a task error, shared by the errors of one failure mode.
+
+    Known failures map to auth, quota (rate limits and exhausted quotas), timeout,
+    connection, server (5xx), bad_request (other 4xx) or contract (InputError, OutputError);
+    any other error is categorized by its lowercase class name. As in `classify_error`,
+    the errors an error was raised from are inspected too.
+
+    Args:
+        error: The exception raised by the task
+    """
+    for err in _error_chain(error):
+        name = type(err).__name__
+        if isinstance(err, (InputError, OutputError)):
+            return ERROR_CATEGORY_CONTRACT
+        if isinstance(err, (asyncio.TimeoutError, TimeoutError)) or name in TIMEOUT_ERROR_NAMES:
+            return ERROR_CATEGORY_TIMEOUT
+        if isinstance(err, ConnectionError) or name in CONNECTION_ERROR_NAMES:
+            return ERROR_CATEGORY_CONNECTION
+        status_code = _status_code(err)
+        if name in AUTH_ERROR_NAMES or status_code in (401, 403):
+            return ERROR_CATEGORY_AUTH
+        if name in QUOTA_ERROR_NAMES or status_code == 429:
+            return ERROR_CATEGORY_QUOTA
+        if name in SERVER_ERROR_NAMES or (status_code is not None and status_code >= 500):
+            return ERROR_CATEGORY_SERVER
+        if status_code is not None and status_code >= 400:
+            return ERROR_CATEGORY_BAD_REQUEST
+    return type(error).__name__.lower()
+
+
+def _parse_retry_after(value: Any) -> Optional[float]:
+    """Parse a Retry-After value, either seconds or an HTTP date, into seconds from now."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Return the delay in seconds requested by a `Retry-After` header of an error, if any."""
+    for err in _error_chain(error):
+        retry_after = _parse_retry_after(getattr(err, "retry_after", None))
+        if retry_after is not None:
+            return retry_after
+        headers = getattr(getattr(err, "response", None), "headers", None) or getattr(err, "headers", None)
+        if headers:
+            try:
+                retry_after = _parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+            except AttributeError:
+                retry_after = None
+            if retry_after is not None:
+                return retry_after
+    return None
+
+
+@dataclass
+class RetryPolicy:
+    """Retry policy of the tasks of a job: which errors to retry and how long to wait.
+
+    Delays grow exponentially, `base_delay * multiplier ** (attempt - 1)` capped at
+    `max_delay`, with full jitter (a random delay between 0 and that value) so that
+    tasks failing together do not retry together. A `Retry-After` sent by the provider
+    takes precedence when it is longer.
+
+    Attributes:
+        max_retries (int): Retries of a failed call within one task attempt
+        base_delay (float): Delay in seconds before the first retry
+        max_delay (float): Longest delay in seconds
+        multiplier (float): Growth factor of the delay per attempt
+        jitter (bool): Randomize delays between 0 and the computed value
+        retry_timeouts (bool): Whether timed out calls are retried
+    """
+
+    max_retries: int = 1
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    multiplier: float = 2.0
+    jitter: bool = True
+    retry_timeouts: bool = True
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Return True if a task that failed with `error` should be attempted again."""
+        if not self.retry_timeouts and isinstance(error, asyncio.TimeoutError):
+            return False
+        return classify_error(error)
+
+    def get_delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Return the delay in seconds before retry number `attempt` (starting at 1)."""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** max(0, attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        retry_after = get_retry_after(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+def resolve_retry_policy(retry_policy: Union[RetryPolicy, dict, None]) -> RetryPolicy:
+    """Return a RetryPolicy from a policy, its dict form (as stored in resume metadata) or None."""
+    if retry_policy is None:
+        return RetryPolicy()
+    if isinstance(retry_policy, dict):
+        return RetryPolicy(**retry_policy)
+    return retry_policy
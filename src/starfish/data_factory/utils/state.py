@@ -1,5 +1,8 @@
+import asyncio
+import random
 import threading
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
 from pydantic import BaseModel
 
@@ -7,24 +10,39 @@ from pydantic import BaseModel
 class MutableSharedState(BaseModel):
     """A thread-safe, mutable shared state container that allows concurrent access to shared data.
 
-    This class provides a dictionary-like interface for storing and retrieving data with thread safety
-    ensured by a lock mechanism. It's particularly useful in multi-threaded environments where
-    multiple threads need to access and modify shared state.
+    This class provides a dictionary-like interface for storing and retrieving data. Every key
+    has its own lock, so tasks updating different keys never wait for each other, and the
+    atomic operations (`append`, `incr`, `setdefault`, `add_to_reservoir`) update a value in
+    place in constant time however large the state grows, without losing concurrent updates.
+    Several steps on one key are made atomic with `lock(key)`, or `alock(key)` when they
+    await in between.
+
+    Example:
+        state.append("examples", record, max_len=100)  # keeps the last 100
+        count = state.incr("generated")
+        with state.lock("topics"):
+            state.setdefault("topics", {}).setdefault(topic, []).append(record)
     """
 
     _data: Dict[str, Any] = {}
 
-    def __init__(self, initial_data: Optional[Dict[str, Any]] = None):
+    def __init__(self, initial_data: Optional[Dict[str, Any]] = None, reservoir_counts: Optional[Dict[str, int]] = None):
         """Initializes a new MutableSharedState instance.
 
         Args:
             initial_data: Optional dictionary to initialize the state with. If provided,
                          the state will be initialized with a copy of this dictionary.
+            reservoir_counts: Values offered so far to the reservoirs of `initial_data`, as
+                         returned by `reservoir_counts()`, so a restored reservoir stays uniform.
         """
         super().__init__()
-        self._lock = threading.RLock()  # Changed to threading.Lock
-        if initial_data is not None:
-            self._data = initial_data.copy()
+        # Guards whole-state operations and the creation of the per-key locks
+        self._lock = threading.RLock()
+        self._key_locks: Dict[str, threading.RLock] = {}
+        self._async_locks: Dict[str, asyncio.Lock] = {}
+        self._async_locks_loop = None
+        self._reservoir_counts: Dict[str, int] = dict(reservoir_counts or {})
+        self._data = initial_data.copy() if initial_data is not None else {}
 
     # Use data when you want to emphasize you're accessing the current state
     @property
@@ -41,18 +59,51 @@ class MutableSharedState(BaseModel):
         """
         with self._lock:
             self._data = value.copy()
+            self._reservoir_counts = {}
 
-    def get(self, key: str) -> Any:
+    def _key_lock(self, key: str) -> threading.RLock:
+        lock = self._key_locks.get(key)
+        if lock is None:
+            with self._lock:
+                lock = self._key_locks.setdefault(key, threading.RLock())
+        return lock
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """Hold the lock of a key, to read and update its value in several steps atomically.
+
+        The atomic operations on the key wait for it; other keys are not blocked. Do not
+        await while holding it, use `alock` instead.
+        """
+        with self._key_lock(key):
+            yield
+
+    @asynccontextmanager
+    async def alock(self, key: str) -> AsyncIterator[None]:
+        """Hold an asyncio lock of a key across awaits, e.g. to read a value, call a model and store the result.
+
+        Only excludes the other holders of `alock(key)` in the event loop, not the atomic operations.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._async_locks_loop is not loop:
+                # Locks of a previous run's event loop cannot be awaited in this one
+                self._async_locks, self._async_locks_loop = {}, loop
+            lock = self._async_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            yield
+
+    def get(self, key: str, default: Any = None) -> Any:
         """Retrieves a value from the state by key.
 
         Args:
             key: The key to look up in the state
+            default: Value returned if the key doesn't exist
 
         Returns:
-            The value associated with the key, or None if the key doesn't exist
+            The value associated with the key, or the default if the key doesn't exist
         """
-        with self._lock:
-            return self._data.get(key)
+        return self._data.get(key, default)
 
     def set(self, key: str, value: Any) -> None:
         """Sets a value in the state by key.
@@ -61,8 +112,9 @@ class MutableSharedState(BaseModel):
             key: The key to set
             value: The value to associate with the key
         """
-        with self._lock:
+        with self._key_lock(key):
             self._data[key] = value
+            self._reservoir_counts.pop(key, None)
 
     def update(self, updates: Dict[str, Any]) -> None:
         """Updates multiple values in the state.
@@ -70,8 +122,71 @@ class MutableSharedState(BaseModel):
         Args:
             updates: Dictionary of key-value pairs to update
         """
-        with self._lock:
-            self._data.update(updates)
+        for key, value in updates.items():
+            self.set(key, value)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        """Returns the value of a key, setting it to `default` first if the key doesn't exist."""
+        with self._key_lock(key):
+            return self._data.setdefault(key, default)
+
+    def incr(self, key: str, amount: float = 1) -> float:
+        """Adds `amount` to the number stored in a key (0 if missing) and returns the new value."""
+        with self._key_lock(key):
+            value = self._data.get(key, 0) + amount
+            self._data[key] = value
+            return value
+
+    def append(self, key: str, value: Any, max_len: Optional[int] = None) -> int:
+        """Appends a value to the list stored in a key, created if missing, and returns its length.
+
+        Args:
+            key: The key of the list
+            value: The value to append
+            max_len: Keep only the last `max_len` values (None for no bound)
+
+        Raises:
+            TypeError: If the key holds something else than a list
+        """
+        with self._key_lock(key):
+            items = self._data.setdefault(key, [])
+            if not isinstance(items, list):
+                raise TypeError(f"State key '{key}' holds a {type(items).__name__}, not a list")
+            items.append(value)
+            if max_len is not None and len(items) > max_len:
+                del items[: len(items) - max_len]
+            return len(items)
+
+    def add_to_reservoir(self, key: str, value: Any, size: int) -> None:
+        """Offers a value to a reservoir sample of at most `size` values stored as a list in a key.
+
+        Every value offered to the key has the same chance to be in the sample, however many
+        are offered, so the list stays a uniform sample of everything seen in constant memory.
+        """
+        with self._key_lock(key):
+            items = self._data.setdefault(key, [])
+            seen = self._reservoir_counts.get(key, len(items)) + 1
+            self._reservoir_counts[key] = seen
+            if len(items) < size:
+                items.append(value)
+            else:
+                position = random.randrange(seen)
+                if position < size:
+                    items[position] = value
+
+    def reservoir_counts(self) -> Dict[str, int]:
+        """Returns the number of values offered to each reservoir, saved with a snapshot to restore the state."""
+        counts = {}
+        for key in list(self._reservoir_counts):
+            with self._key_lock(key):
+                if key in self._reservoir_counts:
+                    counts[key] = self._reservoir_counts[key]
+        return counts
+
+    def get_list(self, key: str) -> List[Any]:
+        """Returns a copy of the list stored in a key (empty if missing), safe to iterate while others append."""
+        with self._key_lock(key):
+            return list(self._data.get(key) or [])
 
     # Use to_dict when you want to emphasize you're converting/serializing the state
     def to_dict(self) -> Dict[str, Any]:
@@ -83,6 +198,20 @@ class MutableSharedState(BaseModel):
         with self._lock:
             return self._data.copy()
 
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns a copy of the state whose lists, dicts and sets are copied too, each under its key lock.
+
+        Unlike `to_dict`, the snapshot can be serialized while other tasks keep updating the state.
+        """
+        snapshot = {}
+        for key in list(self._data):
+            with self._key_lock(key):
+                if key not in self._data:
+                    continue
+                value = self._data[key]
+                snapshot[key] = value.copy() if isinstance(value, (list, dict, set)) else value
+        return snapshot
+
 
 # # Set the entire state
 # state.data = {"key": "value"}
@@ -101,3 +230,7 @@ class MutableSharedState(BaseModel):
 
 # # Get a copy of the entire state
 # state_dict = state.to_dict()
+
+# # Append to a list bounded to its last 100 values, count atomically
+# state.append("examples", record, max_len=100)
+# state.incr("generated")
@@ -0,0 +1,48 @@
+from collections import deque
+
+from starfish.data_factory.constants import STATUS_COMPLETED
+
+
+class StopConditionTracker:
+    """Incremental tracker for the "too many consecutive non-completed tasks" stop condition.
+
+    Keeps a ring buffer of the last `window_size` task statuses plus a running count of
+    the non-completed statuses inside that window, so recording a status and checking the
+    stop condition are both constant time regardless of how many tasks the job has run.
+
+    Attributes:
+        window_size (int): Number of most recent statuses considered (job_run_stop_threshold)
+        total_count (int): Number of statuses recorded since the tracker was created
+    """
+
+    def __init__(self, window_size: int):
+        """Initialize the tracker.
+
+        Args:
+            window_size: Number of consecutive non-completed statuses that stops the job.
+                A value below 1 disables the condition.
+        """
+        self.window_size = window_size
+        self.total_count = 0
+        self._window = deque(maxlen=max(window_size, 0))
+        self._not_completed_in_window = 0
+
+    def record(self, status: str) -> None:
+        """Record the status of a finished task.
+
+        Args:
+            status: The task status (completed, duplicate, filtered or failed)
+        """
+        self.total_count += 1
+        if self.window_size < 1:
+            return
+        if len(self._window) == self.window_size and self._window[0] != STATUS_COMPLETED:
+            # The oldest status is about to be evicted from the ring buffer
+            self._not_completed_in_window -= 1
+        self._window.append(status)
+        if status != STATUS_COMPLETED:
+            self._not_completed_in_window += 1
+
+    def is_consecutive_not_completed(self) -> bool:
+        """Return True if each of the last `window_size` recorded statuses is not completed."""
+        return self.window_size >= 1 and len(self._window) == self.window_size and self._not_completed_in_window == self.window_size
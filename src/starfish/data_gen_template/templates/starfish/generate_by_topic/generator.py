@@ -1,6 +1,7 @@
 from starfish import data_factory, StructuredLLM
 from starfish.components.prepare_topic import prepare_topic
 from starfish import data_gen_template
+from starfish.data_factory.utils.dedup import NearDuplicateHook
 from pydantic import BaseModel
 
 from typing import Optional, List, Union, Dict, Any
@@ -30,6 +31,17 @@ class GenerateByTopicInput(BaseModel):
     data_factory_config: Optional[Dict[str, Any]] = {}
 
 
+def _output_fields(output_schema: Union[List[Dict[str, Any]], Dict[str, Any], type, None]) -> Optional[List[str]]:
+    """Return the generated fields of the output schema (field list, JSON schema or pydantic model), None if unknown."""
+    if isinstance(output_schema, list):
+        return [field["name"] for field in output_schema]
+    if isinstance(output_schema, type) and issubclass(output_schema, BaseModel):
+        return list(output_schema.model_fields)
+    if isinstance(output_schema, dict) and output_schema.get("properties"):
+        return list(output_schema["properties"])
+    return None
+
+
 ## Main
 @data_gen_template.register(
     name="starfish/generate_by_topic",
@@ -69,7 +81,8 @@ async def generate_by_topic(input_data: GenerateByTopicInput):
 
     If topics are not provided, it automatically generates relevant topics based on the instruction.
     The function reduce deduplication by tracking previously generated examples for each topic and
-    avoids repeating similar content.
+    avoids repeating similar content. Records that are still near duplicates of earlier ones are
+    rejected by a NearDuplicateHook and generated again.
 
     The data generation process has two main phases: first, topics are prepared (either using
     provided topics or generating them); second, data is generated for each topic.
@@ -88,7 +101,14 @@ async def generate_by_topic(input_data: GenerateByTopicInput):
     ## Shuffle the topic list to be more eventually distributed for better deduplication
     random.shuffle(topic_list)
 
-    @data_factory(**input_data.data_factory_config)
+    ## Reject near duplicates of the generated fields (the topic is left out; every field if the schema is unknown), they are generated again
+    data_factory_config = dict(input_data.data_factory_config or {})
+    data_factory_config["on_record_complete"] = [
+        *(data_factory_config.get("on_record_complete") or []),
+        NearDuplicateHook(fields=_output_fields(input_data.output_schema)),
+    ]
+
+    @data_factory(**data_factory_config)
     async def batch_generate_record(topic: str):
         ## duplicate_example
         generated_data = fetch_values_by_topic(batch_generate_record.state, topic)
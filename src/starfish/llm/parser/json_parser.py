@@ -5,6 +5,7 @@ from typing import Any, Dict, List, Optional
 
 from starfish.common.exceptions import JsonParserError, SchemaValidationError
 from starfish.common.logger import get_logger
+from starfish.common.tracing import traced
 
 logger = get_logger(__name__)
 
@@ -506,6 +507,7 @@ class JSONParser:
             raise SchemaValidationError("Schema validation failed", details={"errors": validation_errors})
 
     @staticmethod
+    @traced("JSONParser.parse_llm_output")
     def parse_llm_output(
         text: str,
         schema: Optional[Dict[str, Any]] = None,
@@ -4,10 +4,13 @@ import litellm
 from litellm.utils import supports_response_schema
 
 from starfish.common.logger import get_logger
+from starfish.common.tracing import traced
 from starfish.llm.proxy.litellm_adapter_ext import (
     OPENAI_COMPATIBLE_PROVIDERS_CONFIG,
     route_openai_compatible_request,
 )
+from starfish.llm.proxy.rate_limiter import estimate_tokens, get_rate_limiter, get_usage_tokens
+from starfish.llm.proxy.usage import record_usage
 
 logger = get_logger(__name__)
 
@@ -147,15 +150,41 @@ async def route_huggingface_request(model_name: str, messages: List[Dict[str, st
         raise RuntimeError(error_msg)
 
 
+@traced()
 async def call_chat_model(model_name: str, messages: List[Dict[str, str]], model_kwargs: Optional[Dict[str, Any]] = None) -> Any:
     """Routes the model request:
     1. Checks OpenAI compatible providers defined in litellm_adapter_ext.py.
     2. Checks specific handlers (Ollama, HuggingFace).
     3. Defaults to standard LiteLLM call.
+
+    If a rate limit applies to the model (see `set_rate_limit`), the call waits for its turn
+    before being sent, and its token usage is reconciled with the estimate afterwards.
+    Tokens and cost of the response are accounted to the current `track_usage()` block, if any.
     """
     model_kwargs = model_kwargs or {}
     model_prefix = model_name.split("/", 1)[0] if "/" in model_name else None
 
+    limiter = get_rate_limiter(model_name, OPENAI_COMPATIBLE_PROVIDERS_CONFIG.get(model_prefix))
+    if limiter is None:
+        response = await _route_chat_model(model_name, model_prefix, messages, model_kwargs)
+        record_usage(model_name, response)
+        return response
+
+    estimated_tokens = estimate_tokens(model_name, messages, model_kwargs)
+    await limiter.acquire(estimated_tokens)
+    try:
+        response = await _route_chat_model(model_name, model_prefix, messages, model_kwargs)
+    except BaseException:
+        # A failed or cancelled call is not billed for tokens; the request still counts
+        limiter.reconcile(estimated_tokens, 0)
+        raise
+    limiter.reconcile(estimated_tokens, get_usage_tokens(response))
+    record_usage(model_name, response)
+    return response
+
+
+async def _route_chat_model(model_name: str, model_prefix: Optional[str], messages: List[Dict[str, str]], model_kwargs: Dict[str, Any]) -> Any:
+    """Send the request to the backend of the model."""
     try:
         if model_prefix and model_prefix in OPENAI_COMPATIBLE_PROVIDERS_CONFIG:
             config = OPENAI_COMPATIBLE_PROVIDERS_CONFIG[model_prefix]
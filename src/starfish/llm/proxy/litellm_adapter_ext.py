@@ -26,8 +26,13 @@ OPENAI_COMPATIBLE_PROVIDERS_CONFIG: Dict[str, Dict[str, Any]] = {
         },
     },
     # Add more providers following this ultra-simple convention
+    # An optional "rate_limit" entry sets a process-wide limit for the provider, e.g.
+    # "rate_limit": {"requests_per_minute": 600, "tokens_per_minute": 200_000}
 }
 
+# Config entries that are not LiteLLM parameters
+NON_LITELLM_CONFIG_KEYS = {"rate_limit"}
+
 
 def _resolve_config_value(value: Any, description: str) -> Any:
     """Resolves a configuration value based on the '$' convention.
@@ -67,6 +72,8 @@ async def route_openai_compatible_request(
 
     # Iterate directly through configured LiteLLM parameters
     for param_name, config_value in provider_config.items():
+        if param_name in NON_LITELLM_CONFIG_KEYS:
+            continue
         param_desc = f"provider '{provider_prefix}', param '{param_name}'"
         try:
             if param_name == "headers":
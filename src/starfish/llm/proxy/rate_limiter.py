@@ -0,0 +1,255 @@
+"""Process-wide rate limiting of LLM calls, per model or provider."""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from starfish.common.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Rough number of characters per token, used when litellm cannot count the tokens of a model
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `capacity` units per minute.
+
+    Callers reserve units up front: the level may go negative, and the caller then waits
+    until the bucket has refilled past zero. Since every reservation is made in call
+    order, waiting calls are served first come, first served, and a request larger than
+    the capacity is delayed rather than rejected.
+
+    Attributes:
+        capacity (float): Units allowed per minute, also the burst size
+        level (float): Units currently available (negative when reserved ahead)
+    """
+
+    def __init__(self, capacity: float):
+        """Initialize a full bucket.
+
+        Args:
+            capacity: Units allowed per minute
+        """
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self._rate = self.capacity / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` units and return the delay in seconds before they are available."""
+        self._refill(now)
+        self.level -= amount
+        return max(0.0, -self.level / self._rate)
+
+    def adjust(self, amount: float, now: float) -> None:
+        """Give back (positive) or take (negative) units after the fact."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Enforces requests per minute and tokens per minute for one model or provider.
+
+    The token count of a call is estimated before it is sent and reconciled with the
+    `usage` of the response afterwards. A single lock guards the buckets, so one limiter
+    is safe to share between the factories, threads and event loops of a process.
+
+    Attributes:
+        requests_per_minute (int): Maximum requests per minute, None for no limit
+        tokens_per_minute (int): Maximum tokens per minute, None for no limit
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        """Initialize the limiter.
+
+        Args:
+            requests_per_minute: Maximum requests per minute, None for no limit
+            tokens_per_minute: Maximum tokens per minute, None for no limit
+
+        Raises:
+            ValueError: If a limit is not positive
+        """
+        for name, value in (("requests_per_minute", requests_per_minute), ("tokens_per_minute", tokens_per_minute)):
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be positive, got {value}")
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request and `tokens` tokens, returning the delay before the call may be sent."""
+        now = time.monotonic()
+        delay = 0.0
+        with self._lock:
+            if self._requests:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+        return delay
+
+    def release(self, tokens: int = 0) -> None:
+        """Give back a reservation whose call was never sent."""
+        now = time.monotonic()
+        with self._lock:
+            if self._requests:
+                self._requests.adjust(1, now)
+            if self._tokens:
+                self._tokens.adjust(tokens, now)
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until one request of `tokens` tokens is allowed. Never fails, only delays.
+
+        If the wait is cancelled (task timeout, lost hedge, stopped job), the reservation
+        is given back so that later calls are not delayed by a call that never ran.
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            logger.debug(f"Rate limit reached, delaying call by {delay:.2f}s")
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.release(tokens)
+                raise
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the token bucket with the actual usage of a call.
+
+        Args:
+            estimated_tokens: Tokens reserved before the call
+            actual_tokens: Tokens reported by the response, None to keep the estimate
+        """
+        if self._tokens is None or actual_tokens is None:
+            return
+        with self._lock:
+            self._tokens.adjust(estimated_tokens - actual_tokens, time.monotonic())
+
+
+_registry: Dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+# Number of processes sharing every limit (the worker processes of executor="process")
+_limit_share = 1
+
+
+def _shared_limit(value: Optional[int]) -> Optional[int]:
+    """Return this process's share of a limit."""
+    if value is None:
+        return None
+    return max(1, value // _limit_share)
+
+
+def share_rate_limits(limits: Dict[str, Dict[str, Optional[int]]], processes: int) -> None:
+    """Apply the rate limits of a parent process to one of `processes` worker processes.
+
+    Every limit of this process, the given ones, those set later with `set_rate_limit` and
+    those of the provider configs, is divided by `processes`, so that the workers together
+    stay within the limit of the parent.
+
+    Args:
+        limits: The limits of the parent, as returned by `get_rate_limits`
+        processes: Number of processes sharing the limits
+    """
+    global _limit_share
+    _limit_share = max(1, processes)
+    clear_rate_limits()
+    for key, limit in limits.items():
+        set_rate_limit(key, **limit)
+
+
+def get_rate_limits() -> Dict[str, Dict[str, Optional[int]]]:
+    """Return the limits set in this process, keyed by model name or provider prefix."""
+    with _registry_lock:
+        return {key: {"requests_per_minute": limiter.requests_per_minute, "tokens_per_minute": limiter.tokens_per_minute} for key, limiter in _registry.items()}
+
+
+def set_rate_limit(key: str, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None) -> Optional[RateLimiter]:
+    """Set the process-wide rate limit of a model or provider.
+
+    The limit applies to every call made through `call_chat_model` whose model name is
+    `key` or starts with `key/`, e.g. "openai" for every OpenAI model or
+    "openai/gpt-4o-mini" for one model. The most specific key wins.
+
+    Args:
+        key: Full model name or provider prefix
+        requests_per_minute: Maximum requests per minute, None for no limit
+        tokens_per_minute: Maximum tokens per minute, None for no limit
+
+    Returns:
+        Optional[RateLimiter]: The limiter, or None if both limits are None (the limit is removed)
+    """
+    with _registry_lock:
+        if requests_per_minute is None and tokens_per_minute is None:
+            _registry.pop(key, None)
+            return None
+        limiter = RateLimiter(requests_per_minute=_shared_limit(requests_per_minute), tokens_per_minute=_shared_limit(tokens_per_minute))
+        _registry[key] = limiter
+        return limiter
+
+
+def clear_rate_limits() -> None:
+    """Remove every rate limit."""
+    with _registry_lock:
+        _registry.clear()
+
+
+def get_rate_limiter(model_name: str, provider_config: Optional[Dict[str, Any]] = None) -> Optional[RateLimiter]:
+    """Return the limiter that applies to a model, or None if it is not rate limited.
+
+    Limits set with `set_rate_limit` are looked up by full model name, then by provider
+    prefix. Otherwise, the `rate_limit` entry of an OpenAI-compatible provider config
+    (`{"requests_per_minute": ..., "tokens_per_minute": ...}`) is registered on first use.
+
+    Args:
+        model_name: Model name as passed to `call_chat_model`
+        provider_config: Config of the OpenAI-compatible provider of the model, if any
+    """
+    model_prefix = model_name.split("/", 1)[0] if "/" in model_name else None
+    with _registry_lock:
+        limiter = _registry.get(model_name) or (_registry.get(model_prefix) if model_prefix else None)
+    if limiter is None and model_prefix and provider_config and provider_config.get("rate_limit"):
+        rate_limit = provider_config["rate_limit"]
+        with _registry_lock:
+            limiter = _registry.get(model_prefix)
+            if limiter is None:
+                limiter = RateLimiter(
+                    requests_per_minute=_shared_limit(rate_limit.get("requests_per_minute")),
+                    tokens_per_minute=_shared_limit(rate_limit.get("tokens_per_minute")),
+                )
+                _registry[model_prefix] = limiter
+    return limiter
+
+
+def estimate_tokens(model_name: str, messages: List[Dict[str, Any]], model_kwargs: Optional[Dict[str, Any]] = None) -> int:
+    """Estimate the tokens a call will use: the prompt plus the requested completion budget.
+
+    Args:
+        model_name: Model name as passed to `call_chat_model`
+        messages: Chat messages of the call
+        model_kwargs: Model parameters, whose `max_tokens` is counted as the completion budget
+    """
+    try:
+        import litellm
+
+        prompt_tokens = litellm.token_counter(model=model_name, messages=messages)
+    except Exception:
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // CHARS_PER_TOKEN
+    max_tokens = (model_kwargs or {}).get("max_tokens") or 0
+    return int(prompt_tokens) + int(max_tokens)
+
+
+def get_usage_tokens(response: Any) -> Optional[int]:
+    """Return the total tokens reported in the `usage` of a response, or None if absent."""
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    if usage is None:
+        return None
+    total = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+    return int(total) if total is not None else None
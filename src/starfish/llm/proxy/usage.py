@@ -0,0 +1,141 @@
+"""Token and cost accounting of the LLM calls made through `call_chat_model`.
+
+Calls are only accounted inside `track_usage()`, which the data factory opens around
+every task, so the usage of a task is known however deep in the user function the
+model is called. Child asyncio tasks and the thread pool share the tracker of the task
+that started them.
+
+Example:
+    with track_usage() as usage:
+        await call_chat_model("openai/gpt-4o-mini", messages)
+    print(usage.total_tokens, usage.cost)
+"""
+
+import contextvars
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from starfish.common.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class Usage:
+    """Tokens and cost of one or more LLM calls.
+
+    Attributes:
+        calls (int): Number of calls
+        prompt_tokens (int): Input tokens
+        completion_tokens (int): Output tokens
+        total_tokens (int): Input and output tokens
+        cost (float): Cost in USD, as priced by LiteLLM (0 for models without a price)
+    """
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    cost: float = 0.0
+
+    def add(self, other: "Usage") -> None:
+        """Add the usage of other calls to this one."""
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.total_tokens += other.total_tokens
+        self.cost += other.cost
+
+    def split(self, parts: int) -> List["Usage"]:
+        """Split the usage into `parts` shares, e.g. between the inputs of a micro-batch.
+
+        Token counts are spread as evenly as integers allow, so the shares add up to the total.
+        """
+        shares = []
+        for i in range(parts):
+            share = Usage(cost=self.cost / parts)
+            for name in ("calls", "prompt_tokens", "completion_tokens", "total_tokens"):
+                quotient, remainder = divmod(getattr(self, name), parts)
+                setattr(share, name, quotient + (1 if i < remainder else 0))
+            shares.append(share)
+        return shares
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the usage as a dict."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Usage":
+        """Create a Usage from its dict form, an empty one from None."""
+        return cls(**data) if data else cls()
+
+
+_current_usage: contextvars.ContextVar[Optional[Usage]] = contextvars.ContextVar("starfish_llm_usage", default=None)
+
+
+@contextmanager
+def track_usage() -> Iterator[Usage]:
+    """Account the LLM calls made in the enclosed block, including nested blocks, into a new Usage."""
+    usage = Usage()
+    parent = _current_usage.get()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+        if parent is not None:
+            parent.add(usage)
+
+
+def get_current_usage() -> Optional[Usage]:
+    """Return the tracker the calls made now are accounted to, None if they are not accounted."""
+    return _current_usage.get()
+
+
+def is_tracking_usage() -> bool:
+    """Return True if the calls made now are accounted."""
+    return _current_usage.get() is not None
+
+
+def record_usage(model_name: str, response: Any) -> None:
+    """Add the usage reported by a model response to the current tracker, if any."""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.add(usage_from_response(model_name, response))
+
+
+def usage_from_response(model_name: str, response: Any) -> Usage:
+    """Return the tokens reported in the `usage` of a response and their cost.
+
+    The cost is LiteLLM's price of the response; models LiteLLM has no price for cost 0.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+
+    def _get(name: str) -> int:
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        return int(value or 0)
+
+    result = Usage(calls=1)
+    if usage is not None:
+        result.prompt_tokens = _get("prompt_tokens")
+        result.completion_tokens = _get("completion_tokens")
+        result.total_tokens = _get("total_tokens") or result.prompt_tokens + result.completion_tokens
+    result.cost = _response_cost(model_name, response)
+    return result
+
+
+def _response_cost(model_name: str, response: Any) -> float:
+    """Return the cost LiteLLM computed for a response, or prices it; 0 if the model has no price."""
+    hidden_params = getattr(response, "_hidden_params", None) or {}
+    if hidden_params.get("response_cost") is not None:
+        return float(hidden_params["response_cost"])
+    try:
+        import litellm
+
+        return float(litellm.completion_cost(completion_response=response, model=model_name) or 0.0)
+    except Exception as e:
+        logger.debug(f"No price for model {model_name}: {e}")
+        return 0.0
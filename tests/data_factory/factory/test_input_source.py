@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import nest_asyncio
+import pytest
+
+from starfish.common.env_loader import load_env_file
+from starfish.data_factory.factory import data_factory, resume_from_checkpoint
+from starfish.data_factory.utils.errors import InputError, NoResumeSupportError
+from starfish.data_factory.utils.input_source import CSVSource, JSONLSource
+
+nest_asyncio.apply()
+load_env_file()
+
+
+@pytest.mark.asyncio
+async def test_generator_input_is_pulled_lazily():
+    """Test a generator as input data
+    - Input: Generator of 20 cities, max_concurrency 2
+    - Expected: All records processed, the generator is never read far ahead of the running tasks
+    """
+    pulled = []
+    finished = []
+    max_ahead = 0
+
+    def cities():
+        for i in range(20):
+            pulled.append(i)
+            yield {"city_name": f"{i}. City"}
+
+    @data_factory(max_concurrency=2)
+    async def test1(city_name, num_records_per_city):
+        nonlocal max_ahead
+        max_ahead = max(max_ahead, len(pulled) - len(finished))
+        await asyncio.sleep(0.01)
+        finished.append(city_name)
+        return [{"answer": f"{city_name} - {num_records_per_city}"}]
+
+    result = test1.run(cities(), num_records_per_city=1)
+    assert sorted(item["answer"] for item in result) == sorted(f"{i}. City - 1" for i in range(20))
+    # Two running tasks plus one record read ahead
+    assert max_ahead <= 3
+    assert test1.get_input_data() == []
+
+
+@pytest.mark.asyncio
+async def test_async_generator_input():
+    """Test an async generator as input data
+    - Input: Async generator of 5 cities
+    - Expected: All records processed with their input index
+    """
+
+    async def cities():
+        for i in range(5):
+            await asyncio.sleep(0)
+            yield {"city_name": f"{i}. City"}
+
+    @data_factory(max_concurrency=2)
+    async def test1(city_name):
+        return [{"answer": city_name}]
+
+    result = test1.run(data=cities())
+    assert len(result) == 5
+    assert sorted(test1.get_index_completed()) == list(range(5))
+
+
+@pytest.mark.asyncio
+async def test_lazy_input_parameter_mismatch(tmp_path):
+    """Test parameter validation on a lazy input
+    - Input: CSV file whose column does not match the function parameters
+    - Expected: InputError before the job starts
+    """
+    path = tmp_path / "cities.csv"
+    path.write_text("town\nNew York\n")
+
+    @data_factory(max_concurrency=2)
+    async def test1(city_name):
+        return [{"answer": city_name}]
+
+    with pytest.raises(InputError):
+        test1.run(CSVSource(str(path)))
+
+
+@pytest.mark.asyncio
+async def test_jsonl_source_resume(tmp_path):
+    """Test resuming a job reading a JSONL file
+    - Input: JSONL file of 5 cities, the first run stops at 2 completed records
+    - Expected: The resume reads on from the saved position and completes the remaining records
+    """
+    path = tmp_path / "cities.jsonl"
+    path.write_text("".join(json.dumps({"city_name": f"{i}. City"}) + "\n" for i in range(5)))
+
+    @data_factory(max_concurrency=1, target_count=2)
+    async def test1(city_name):
+        return [{"answer": city_name}]
+
+    first_result = test1.run(JSONLSource(str(path)))
+    assert len(first_result) == 2
+    master_job_id = test1.factory.config.master_job_id
+
+    resumed_result = resume_from_checkpoint(master_job_id, target_count=5)
+    answers = [item["answer"] for item in first_result + resumed_result]
+    assert sorted(answers) == sorted(f"{i}. City" for i in range(5))
+
+
+@pytest.mark.asyncio
+async def test_generator_input_cannot_resume_in_new_session():
+    """Test resuming a job reading a generator from storage
+    - Input: Generator of 3 cities
+    - Expected: NoResumeSupportError, a generator cannot be reopened
+    """
+
+    @data_factory(max_concurrency=1, target_count=1)
+    async def test1(city_name):
+        return [{"answer": city_name}]
+
+    test1.run({"city_name": f"{i}. City"} for i in range(3))
+    with pytest.raises(NoResumeSupportError):
+        resume_from_checkpoint(test1.factory.config.master_job_id)
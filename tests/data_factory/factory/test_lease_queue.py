@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+import uuid
+
+import nest_asyncio
+import pytest
+
+from starfish.common.env_loader import load_env_file
+from starfish.data_factory.constants import LOCAL_STORAGE_URI
+from starfish.data_factory.factory import data_factory
+from starfish.data_factory.storage.local.local_storage import LocalStorage
+from starfish.data_factory.storage.models import GenerationMasterJob, Project
+from starfish.data_factory.utils.checkpoint import checkpoint_path, read_checkpoint
+from starfish.data_factory.utils.errors import InputError
+from starfish.data_factory.utils.lease_queue import LeaseFeeder
+
+nest_asyncio.apply()
+load_env_file()
+
+
+async def _list_work_items(master_job_id):
+    storage = LocalStorage(LOCAL_STORAGE_URI)
+    await storage.setup()
+    try:
+        return await storage.list_work_items(master_job_id)
+    finally:
+        await storage.close()
+
+
+async def _save_master_job(storage, master_job_id):
+    project = Project(project_id=str(uuid.uuid4()), name="Lease Queue Project")
+    await storage.save_project(project)
+    await storage.log_master_job_start(
+        GenerationMasterJob(
+            master_job_id=master_job_id,
+            project_id=project.project_id,
+            name="Lease Queue Job",
+            status="running",
+            request_config_ref=storage.generate_request_config_path(master_job_id),
+            output_schema={"type": "object"},
+            storage_uri=LOCAL_STORAGE_URI,
+            target_record_count=4,
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_lease_queue_single_worker():
+    """Test a job run through the lease queue by the process that started it
+    - Input: 6 cities, lease_queue=True
+    - Expected: Every input is processed once and its work item committed by the worker
+    """
+
+    @data_factory(max_concurrency=3, lease_queue=True, worker_id="master-1")
+    async def test1(city_name):
+        await asyncio.sleep(0.01)
+        return [{"answer": city_name}]
+
+    result = test1.run(city_name=[f"{i}. City" for i in range(6)])
+    assert sorted(record["answer"] for record in result) == [f"{i}. City" for i in range(6)]
+
+    items = await _list_work_items(test1.factory.config.master_job_id)
+    assert [item.status for item in items] == ["done"] * 6
+    assert {item.lease_owner for item in items} == {"master-1"}
+    assert all(item.result_status == "completed" and len(item.output_refs) == 1 for item in items)
+
+
+@pytest.mark.asyncio
+async def test_lease_queue_reclaims_expired_leases():
+    """Test a worker joining a job whose previous worker crashed
+    - Input: A master job of 4 items, 2 of them leased by a worker that stopped renewing
+    - Expected: run_worker claims every item once the lease expired and commits its records
+    """
+    master_job_id = str(uuid.uuid4())
+    storage = LocalStorage(LOCAL_STORAGE_URI)
+    await storage.setup()
+    try:
+        await _save_master_job(storage, master_job_id)
+        crashed = LeaseFeeder(storage, master_job_id, worker_id="crashed-worker", lease_timeout=0.05)
+        await crashed.enqueue([{"idx_index": i, "city_name": f"{i}. City"} for i in range(4)])
+        await crashed.feed(asyncio.Queue(), 2)
+    finally:
+        await storage.close()
+    await asyncio.sleep(0.1)
+
+    @data_factory(max_concurrency=2, worker_id="worker-2")
+    async def test1(city_name):
+        return [{"answer": city_name}]
+
+    result = test1.run_worker(master_job_id)
+    assert sorted(record["answer"] for record in result) == [f"{i}. City" for i in range(4)]
+
+    items = await _list_work_items(master_job_id)
+    assert {item.lease_owner for item in items} == {"worker-2"}
+    assert [item.attempts for item in items] == [2, 2, 1, 1]
+
+    with pytest.raises(InputError):
+        test1.run_worker(str(uuid.uuid4()))
+
+
+@pytest.mark.asyncio
+async def test_lease_feeder_renews_leases_in_background():
+    """Test the renewal of the leases of a worker that stopped claiming
+    - Input: A started feeder holding 2 of 4 items with a 0.15s lease, no feed() for 0.4s
+    - Expected: Another worker claims only the 2 other items, and the held ones once released
+    """
+    master_job_id = str(uuid.uuid4())
+    storage = LocalStorage(LOCAL_STORAGE_URI)
+    await storage.setup()
+    try:
+        await _save_master_job(storage, master_job_id)
+        busy = LeaseFeeder(storage, master_job_id, worker_id="busy-worker", lease_timeout=0.15)
+        await busy.enqueue([{"idx_index": i, "city_name": f"{i}. City"} for i in range(4)])
+        await busy.start()
+        await busy.feed(asyncio.Queue(), 2)
+        await asyncio.sleep(0.4)
+
+        other = LeaseFeeder(storage, master_job_id, worker_id="other-worker", lease_timeout=0.15)
+        claimed = await other.feed(asyncio.Queue(), 4)
+        assert [record["idx_index"] for record in claimed] == [2, 3]
+
+        await busy.close()
+        assert busy._renew_task is None
+        claimed = await other.feed(asyncio.Queue(), 4)
+        assert [record["idx_index"] for record in claimed] == [0, 1]
+    finally:
+        await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_lease_queue_two_workers():
+    """Test a second worker joining a running job from another thread
+    - Input: 20 cities, 0.1s per call, the starting process and a worker with max_concurrency 2 each
+    - Expected: Both workers run items, and the starting process returns the records of both
+    """
+
+    @data_factory(max_concurrency=2, lease_queue=True, worker_id="master-1", show_progress=False)
+    async def master(city_name):
+        await asyncio.sleep(0.1)
+        return [{"answer": city_name, "worker": "master-1"}]
+
+    @data_factory(max_concurrency=2, worker_id="worker-2", show_progress=False)
+    async def worker(city_name):
+        await asyncio.sleep(0.1)
+        return [{"answer": city_name, "worker": "worker-2"}]
+
+    worker_result = []
+
+    def join_job():
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job_manager = master.factory.job_manager
+            if job_manager is not None and isinstance(job_manager.input_feeder, LeaseFeeder):
+                worker_result.extend(worker.run_worker(master.factory.config.master_job_id))
+                return
+            time.sleep(0.01)
+
+    thread = threading.Thread(target=join_job)
+    thread.start()
+    result = master.run(city_name=[f"{i}. City" for i in range(20)])
+    thread.join()
+
+    assert sorted(record["answer"] for record in result) == sorted(f"{i}. City" for i in range(20))
+    assert {record["worker"] for record in result} == {"master-1", "worker-2"}
+    assert worker_result and all(record["worker"] == "worker-2" for record in worker_result)
+    items = await _list_work_items(master.factory.config.master_job_id)
+    assert [item.status for item in items] == ["done"] * 20
+
+
+@pytest.mark.asyncio
+async def test_lease_queue_workers_do_not_checkpoint():
+    """Test the checkpoint of a job run by two workers
+    - Input: 8 cities, 0.05s per call, the starting process and a worker, a checkpoint after every result
+    - Expected: No process writes a checkpoint, each would only hold its own counters; the work items are the progress
+    """
+
+    @data_factory(max_concurrency=2, lease_queue=True, worker_id="master-1", show_progress=False, checkpoint_every=1)
+    async def master(city_name):
+        await asyncio.sleep(0.05)
+        return [{"answer": city_name}]
+
+    @data_factory(max_concurrency=2, worker_id="worker-2", show_progress=False, checkpoint_every=1)
+    async def worker(city_name):
+        await asyncio.sleep(0.05)
+        return [{"answer": city_name}]
+
+    def join_job():
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job_manager = master.factory.job_manager
+            if job_manager is not None and isinstance(job_manager.input_feeder, LeaseFeeder):
+                worker.run_worker(master.factory.config.master_job_id)
+                return
+            time.sleep(0.01)
+
+    thread = threading.Thread(target=join_job)
+    thread.start()
+    master.run(city_name=[f"{i}. City" for i in range(8)])
+    thread.join()
+
+    assert worker.factory.job_manager.checkpointer is None
+    assert master.factory.job_manager.checkpointer is None
+    path = checkpoint_path(master.factory.factory_storage, master.factory.config.master_job_id)
+    assert read_checkpoint(path) is None
+    assert master.factory.job_manager.completed_count == 8
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import urllib.request
+
+import nest_asyncio
+import pytest
+
+from starfish.common.env_loader import load_env_file
+from starfish.data_factory.factory import data_factory
+from starfish.data_factory.utils.errors import InputError
+from starfish.data_factory.utils.metrics_exporter import MetricsExporter
+
+nest_asyncio.apply()
+load_env_file()
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.read().decode()
+
+
+@pytest.mark.asyncio
+async def test_metrics_exporter_prometheus_and_file(tmp_path):
+    """Test the live metrics exporter
+    - Input: 4 cities, metrics_port=0 (any free port) and a metrics file; the last city scrapes the endpoint
+    - Expected: The scrape shows the counters and gauges of the running job, the file holds the final snapshot
+    """
+    metrics_file = tmp_path / "metrics.json"
+    scrapes = []
+
+    @data_factory(max_concurrency=1, metrics_port=0, metrics_file=str(metrics_file), show_progress=False)
+    async def test1(city_name):
+        if city_name == "Boston":
+            port = test1.factory.job_manager.metrics_exporter.port
+            scrapes.append(await asyncio.to_thread(_get, f"http://127.0.0.1:{port}/metrics"))
+        return [{"answer": city_name}]
+
+    test1.run(city_name=["New York", "Chicago", "Miami", "Boston"])
+
+    body = scrapes[0]
+    job_id = test1.factory.config.master_job_id
+    assert "# TYPE starfish_tasks_completed_total counter" in body
+    assert f'starfish_tasks_completed_total{{master_job_id="{job_id}"}} 3' in body
+    assert f'starfish_in_flight{{master_job_id="{job_id}"}} 1' in body
+    assert f'starfish_concurrency_limit{{master_job_id="{job_id}"}} 1' in body
+    assert 'phase="user_func",quantile="0.99"' in body
+
+    snapshot = json.loads(metrics_file.read_text())
+    assert snapshot["master_job_id"] == job_id
+    assert snapshot["counters"]["completed"] == 4
+    assert snapshot["gauges"]["in_flight"] == 0
+    assert snapshot["latency"]["user_func"]["count"] == 4
+
+
+def test_metrics_exporter_needs_a_target():
+    with pytest.raises(InputError):
+        MetricsExporter(job_manager=None)
@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import copy
+import cProfile
+import datetime
+import pstats
+import statistics
+import time
+import tracemalloc
+from asyncio import Queue
+
+import pytest
+
+from starfish.data_factory.constants import IDX, RECORD_STATUS, STATUS_COMPLETED, STATUS_FAILED, STORAGE_TYPE_IN_MEMORY
+from starfish.data_factory.job_manager import JobManager
+from starfish.data_factory.storage.in_memory.in_memory_storage import InMemoryStorage
+from starfish.data_factory.storage.models import Record
+from starfish.data_factory.utils.data_class import FactoryMasterConfig
+from starfish.data_factory.utils.output_buffer import OutputBuffer
+from starfish.data_factory.utils.retry import RetryPolicy
+from starfish.data_factory.utils.state import MutableSharedState
+
+# Default benchmark parameters - can be overridden via args
+DEFAULT_NUM_INPUTS = 50
+DEFAULT_CONCURRENCY = 50  # Every input gets a slot, so retries always find an empty queue
+DEFAULT_TASK_SLEEP = 0.01  # Simulated latency of the user function
+STOP_CHECK_SCALES = [10_000, 100_000]  # Number of mock tasks for the stop-condition benchmark run by pytest
+STOP_CHECK_CLI_SCALES = [*STOP_CHECK_SCALES, 1_000_000]  # --stop-check also runs a 1M-task job (about 15s)
+LEGACY_STOP_CHECK_MAX_TASKS = 10_000  # The legacy snapshot check is quadratic, only run it on small jobs
+OUTPUT_BUFFER_RESULTS = 50_000  # Number of task results for the output memory benchmark
+OUTPUT_BUFFER_IN_MEMORY = 5_000  # output_buffer_size used by the spilling run
+OUTPUT_RECORD_BYTES = 1_000  # Size of the mock record carried by each task result
+TASK_OVERHEAD_TASKS = 2_000  # Number of tasks for the per-task overhead benchmark
+TASK_OVERHEAD_FIELDS = 200  # Nested fields of the record each task receives and returns
+
+
+def parse_args():
+    """Parse command line arguments for the data factory benchmarks."""
+    parser = argparse.ArgumentParser(description="Data Factory Performance Benchmarks")
+    parser.add_argument("--num-inputs", type=int, default=DEFAULT_NUM_INPUTS, help=f"Number of inputs to dispatch (default: {DEFAULT_NUM_INPUTS})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help=f"max_concurrency of the job (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--task-sleep", type=float, default=DEFAULT_TASK_SLEEP, help=f"Mock user function latency (default: {DEFAULT_TASK_SLEEP})")
+    parser.add_argument("--stop-check", action="store_true", help="Run the stop-condition scaling benchmark instead of the dispatch benchmark")
+    parser.add_argument("--output-memory", action="store_true", help="Run the output buffer memory benchmark instead of the dispatch benchmark")
+    parser.add_argument("--task-overhead", action="store_true", help="Run the per-task copy overhead benchmark instead of the dispatch benchmark")
+    parser.add_argument("--profile", action="store_true", help="With --task-overhead, print the top functions of a cProfile run")
+    return parser.parse_args()
+
+
+def build_job_manager(user_func, num_inputs: int, concurrency: int, payload: dict = None, **config_kwargs) -> JobManager:
+    """Create a JobManager over in-memory storage with `num_inputs` queued inputs, each carrying `payload` if given."""
+    config_kwargs = {"job_run_stop_threshold": num_inputs + 1, **config_kwargs}
+    input_queue = Queue()
+    for i in range(num_inputs):
+        input_queue.put_nowait({IDX: i, "value": i} if payload is None else {IDX: i, "value": i, "payload": payload})
+    config = FactoryMasterConfig(
+        storage=STORAGE_TYPE_IN_MEMORY,
+        master_job_id="benchmark",
+        target_count=num_inputs,
+        max_concurrency=concurrency,
+        show_progress=False,
+        **config_kwargs,
+    )
+    return JobManager(master_job_config=config, state=MutableSharedState(), storage=InMemoryStorage(), user_func=user_func, input_data_queue=input_queue)
+
+
+def summarize(name: str, samples: list) -> dict:
+    """Print and return summary statistics (in milliseconds) for latency samples in seconds."""
+    ordered = sorted(samples)
+    stats = {
+        "count": len(ordered),
+        "mean_ms": statistics.mean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": ordered[len(ordered) // 2] * 1000 if ordered else 0.0,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+    print(f"  {name}: n={stats['count']} mean={stats['mean_ms']:.2f}ms p50={stats['p50_ms']:.2f}ms max={stats['max_ms']:.2f}ms")
+    return stats
+
+
+@pytest.mark.asyncio
+async def test_dispatch_latency(num_inputs=DEFAULT_NUM_INPUTS, concurrency=DEFAULT_CONCURRENCY, task_sleep=DEFAULT_TASK_SLEEP):
+    """Measure how long a requeued input waits before it is dispatched again.
+
+    Every input fails on its first attempt and succeeds on the second one, so the
+    tail of the job consists of retries put back by `_requeue_task`. The latency is
+    the time between the failed attempt finishing and the retry starting. The
+    shutdown latency is the time between the last task finishing and the
+    orchestration returning.
+    """
+    failed_at = {}
+    retry_latency = []
+    finished_at = []
+
+    async def mock_user_func(value):
+        if value not in failed_at:
+            await asyncio.sleep(task_sleep)
+            failed_at[value] = time.perf_counter()
+            raise ValueError(f"mock failure for {value}")
+        retry_latency.append(time.perf_counter() - failed_at[value])
+        await asyncio.sleep(task_sleep)
+        finished_at.append(time.perf_counter())
+        return [{"value": value}]
+
+    job_manager = build_job_manager(mock_user_func, num_inputs, concurrency)
+    # Failures go straight back to the input queue, without backoff, instead of being retried inside the task
+    job_manager.task_runner.max_retries = 0
+    job_manager.retry_policy = RetryPolicy(max_retries=0, base_delay=0)
+
+    start_time = time.perf_counter()
+    await job_manager._async_run_orchestration()
+    end_time = time.perf_counter()
+    total_time = end_time - start_time
+
+    print(f"\nDispatch latency ({num_inputs} inputs, concurrency {concurrency}, task sleep {task_sleep}s):")
+    stats = summarize("requeue -> retry start", retry_latency)
+    shutdown_stats = summarize("last completion -> job end", [end_time - max(finished_at)])
+    print(f"  total run time: {total_time:.3f}s")
+
+    assert job_manager.completed_count == num_inputs
+    # The dispatcher is woken by the requeue and by completions, not by a one second poll
+    assert stats["p50_ms"] < 500
+    assert shutdown_stats["max_ms"] < 500
+
+
+def legacy_is_job_to_stop(job_output: Queue, threshold: int) -> bool:
+    """The pre-tracker stop check: snapshot the whole output queue on every call."""
+    job_output_list = list(job_output._queue)
+    if len(job_output_list) == 0:
+        return False
+    items = [job_output_list[-1] for _ in range(min(threshold, len(job_output_list)))]
+    return len(items) == threshold and all(item[RECORD_STATUS] != STATUS_COMPLETED for item in items)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("num_tasks", STOP_CHECK_SCALES)
+async def test_stop_condition_scaling(num_tasks):
+    """Measure the per-task cost of the stop check as the number of finished tasks grows.
+
+    Simulates what `_handle_task_completion` and the dispatcher do for every task:
+    record the result, then evaluate `_is_job_to_stop`. One in ten mock tasks fails.
+    """
+
+    async def mock_user_func(value):
+        return [{"value": value}]
+
+    job_manager = build_job_manager(mock_user_func, 0, DEFAULT_CONCURRENCY, job_run_stop_threshold=3)
+    job_manager.job_config.target_count = num_tasks + 1  # Never reached, so every check runs in full
+
+    start_time = time.perf_counter()
+    for i in range(num_tasks):
+        task_status = STATUS_FAILED if i % 10 == 0 else STATUS_COMPLETED
+        job_manager.job_output.put_nowait({IDX: i, RECORD_STATUS: task_status, "output": [], "output_ref": [], "err": [{}]})
+        job_manager.stop_tracker.record(task_status)
+        job_manager.completed_count += task_status == STATUS_COMPLETED
+        assert not job_manager._is_job_to_stop()
+    tracker_time = time.perf_counter() - start_time
+
+    print(f"\nStop condition check ({num_tasks} tasks):")
+    print(f"  tracker: {tracker_time:.3f}s total, {tracker_time / num_tasks * 1e6:.2f}us per task")
+
+    if num_tasks <= LEGACY_STOP_CHECK_MAX_TASKS:
+        legacy_output = Queue()
+        start_time = time.perf_counter()
+        for i in range(num_tasks):
+            task_status = STATUS_FAILED if i % 10 == 0 else STATUS_COMPLETED
+            legacy_output.put_nowait({IDX: i, RECORD_STATUS: task_status})
+            legacy_is_job_to_stop(legacy_output, job_manager.job_config.job_run_stop_threshold)
+        legacy_time = time.perf_counter() - start_time
+        print(f"  legacy snapshot: {legacy_time:.3f}s total, {legacy_time / num_tasks * 1e6:.2f}us per task")
+    else:
+        print(f"  legacy snapshot: skipped (quadratic above {LEGACY_STOP_CHECK_MAX_TASKS} tasks)")
+
+
+def test_output_buffer_memory(num_results=OUTPUT_BUFFER_RESULTS, max_in_memory=OUTPUT_BUFFER_IN_MEMORY):
+    """Compare the peak memory of keeping every task result in memory with spilling to disk."""
+    payload = "x" * OUTPUT_RECORD_BYTES
+    print(f"\nOutput buffer memory ({num_results} results of ~{OUTPUT_RECORD_BYTES} bytes):")
+    peaks = {}
+    for name, size in [("in memory", 0), (f"spill past {max_in_memory}", max_in_memory)]:
+        tracemalloc.start()
+        buffer = OutputBuffer(max_in_memory=size)
+        start_time = time.perf_counter()
+        for i in range(num_results):
+            buffer.put_nowait({IDX: i, RECORD_STATUS: STATUS_COMPLETED, "output": [{"value": f"{payload}{i}"}], "output_ref": [], "err": [{}]})
+        write_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        completed = sum(1 for result in buffer if result[RECORD_STATUS] == STATUS_COMPLETED)
+        read_time = time.perf_counter() - start_time
+        peaks[name] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        buffer.close()
+        assert completed == num_results
+        print(f"  {name}: peak {peaks[name] / 1e6:.1f}MB, write {write_time:.3f}s, lazy read {read_time:.3f}s")
+
+    assert peaks[f"spill past {max_in_memory}"] < peaks["in memory"]
+
+
+def make_large_record(num_fields: int) -> dict:
+    """Build a nested record similar to a structured LLM response."""
+    return {f"field_{j}": {"text": f"value {j} " * 5, "scores": [j, j + 1, j + 2]} for j in range(num_fields)}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("zero_copy", [False, True])
+async def test_task_overhead(zero_copy, num_tasks=TASK_OVERHEAD_TASKS, num_fields=TASK_OVERHEAD_FIELDS):
+    """Measure the per-task overhead of the job manager around a no-op function with large records.
+
+    The function returns a prebuilt output, so the time per task is the framework's own
+    work: copying the input, evaluating hooks, building the result and the bookkeeping.
+    The output deep copy and the record metadata built from the whole output record, both
+    removed from the hot path, are timed separately against their replacement.
+    """
+    payload = make_large_record(num_fields)
+    output = [payload]
+
+    async def mock_user_func(value, payload):
+        return output
+
+    job_manager = build_job_manager(mock_user_func, num_tasks, DEFAULT_CONCURRENCY, payload=payload, zero_copy=zero_copy)
+    start_time = time.perf_counter()
+    await job_manager._async_run_orchestration()
+    per_task_us = (time.perf_counter() - start_time) / num_tasks * 1e6
+    assert job_manager.completed_count == num_tasks
+
+    start_time = time.perf_counter()
+    for _ in range(100):
+        copy.deepcopy(output)
+    output_copy_us = (time.perf_counter() - start_time) / 100 * 1e6
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    metadata = {"job_id": "job", "master_job_id": "master", "status": STATUS_COMPLETED, "output_ref": "ref", "end_time": now}
+    start_time = time.perf_counter()
+    for _ in range(1000):
+        Record(**{**payload, **metadata})
+    legacy_record_us = (time.perf_counter() - start_time) / 1000 * 1e6
+    start_time = time.perf_counter()
+    for _ in range(1000):
+        Record(record_uid="uid", **metadata)
+    record_us = (time.perf_counter() - start_time) / 1000 * 1e6
+
+    print(f"\nTask overhead (zero_copy={zero_copy}, {num_tasks} tasks, {num_fields} nested fields per record):")
+    print(f"  job manager: {per_task_us:.1f}us per task")
+    print(f"  output deepcopy removed from the hot path: {output_copy_us:.1f}us per task")
+    print(f"  record metadata: {legacy_record_us:.1f}us per record from the output record, {record_us:.1f}us from explicit fields")
+
+
+def profile_task_overhead(zero_copy: bool):
+    """Print the functions where the per-task overhead goes."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    asyncio.run(test_task_overhead(zero_copy))
+    profiler.disable()
+    print(f"\nTop functions (zero_copy={zero_copy}):")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+
+if __name__ == "__main__":
+    """Run directly for easier benchmarking outside pytest."""
+    args = parse_args()
+    if args.stop_check:
+        for scale in STOP_CHECK_CLI_SCALES:
+            asyncio.run(test_stop_condition_scaling(scale))
+    elif args.output_memory:
+        test_output_buffer_memory()
+    elif args.task_overhead:
+        for zero_copy in [False, True]:
+            if args.profile:
+                profile_task_overhead(zero_copy)
+            else:
+                asyncio.run(test_task_overhead(zero_copy))
+    else:
+        asyncio.run(test_dispatch_latency(num_inputs=args.num_inputs, concurrency=args.concurrency, task_sleep=args.task_sleep))
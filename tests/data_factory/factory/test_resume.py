@@ -1,13 +1,19 @@
 import asyncio
+import datetime
+import json
 import os
 import nest_asyncio
 import pytest
 
 from starfish.data_factory.factory import data_factory, resume_from_checkpoint
 from starfish.common.env_loader import load_env_file
-from starfish.data_factory.constants import STATUS_COMPLETED
+from starfish.data_factory.constants import LOCAL_STORAGE_URI, STATUS_COMPLETED
+from starfish.data_factory.storage.local.local_storage import LocalStorage
+from starfish.data_factory.utils.checkpoint import JobCheckpointer, write_checkpoint
 from starfish.data_factory.utils.errors import InputError, NoResumeSupportError, OutputError
 from starfish.data_factory.utils.mock import mock_llm_call
+from starfish.data_factory.utils.retry import RetryPolicy
+from starfish.llm.proxy.litellm_adapter import call_chat_model
 from starfish.llm.structured_llm import StructuredLLM
 
 nest_asyncio.apply()
@@ -176,3 +182,90 @@ async def test_resume_with_paramters():
     assert len(result) == 2
     result = resume_from_checkpoint(master_job_id, max_concurrency=30)
     assert len(result) == 2
+
+
+@pytest.mark.asyncio
+async def test_resume_after_kill_from_checkpoint():
+    """Test resuming a master job whose process was killed
+    - Input: 3 cities checkpointed after every result; the master job is then set back to running and the checkpointed
+      state changed, as if the process had died after the checkpoint
+    - Expected: The resume restores the state of the checkpoint and returns the records already in storage
+    """
+
+    @data_factory(max_concurrency=2, checkpoint_every=1, initial_state_values={"count": 0})
+    async def test1(city_name):
+        return [{"answer": city_name}]
+
+    test1.run(city_name=["1. New York", "2. Los Angeles", "3. Chicago"])
+    master_job_id = test1.factory.config.master_job_id
+    path = test1.factory.job_manager.checkpointer.path
+
+    storage = LocalStorage(LOCAL_STORAGE_URI)
+    await storage.setup()
+    await storage.update_master_job_status(master_job_id, "running", datetime.datetime.now(datetime.timezone.utc))
+    await storage.close()
+    with open(path) as f:
+        checkpoint = json.load(f)
+    checkpoint["state"]["count"] = 10
+    write_checkpoint(path, checkpoint)
+
+    result = resume_from_checkpoint(master_job_id)
+    assert len(result) == 3
+    # The resumed job checkpoints the state it restored when it stops
+    with open(path) as f:
+        assert json.load(f)["state"]["count"] == 10
+
+
+@pytest.mark.asyncio
+async def test_resume_keeps_budget_spend():
+    """Test the cost budget across resumes
+    - Input: 10 cities run one at a time, each making one mocked LLM call of $0.0000135, max_cost=0.00005
+    - Expected: The job stops after 3 tasks, and no resume runs another task since the spend of the previous
+      runs is restored, from the master job summary or from the checkpoint of a killed process; the summary
+      keeps the total spend
+    """
+
+    @data_factory(max_concurrency=1, max_cost=0.00005, checkpoint_every=1)
+    async def test1(city_name):
+        await call_chat_model("openai/gpt-4o-mini", [{"role": "user", "content": city_name}], {"mock_response": "a city"})
+        return [{"answer": city_name}]
+
+    assert len(test1.run(city_name=[f"{i}. City" for i in range(10)])) == 3
+    master_job_id = test1.factory.config.master_job_id
+
+    assert len(test1.resume()) == 3
+    assert len(resume_from_checkpoint(master_job_id)) == 3
+
+    storage = LocalStorage(LOCAL_STORAGE_URI)
+    await storage.setup()
+    await storage.update_master_job_status(master_job_id, "running", datetime.datetime.now(datetime.timezone.utc))
+    await storage.close()
+    assert len(resume_from_checkpoint(master_job_id)) == 3
+
+    await storage.setup()
+    master_job = await storage.get_master_job(master_job_id)
+    await storage.close()
+    assert master_job.summary["usage"]["calls"] == 3
+    assert master_job.summary["budget"]["task_count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_counts_final_results_only(monkeypatch):
+    """Test the record count of checkpoint_every
+    - Input: 3 cities, the first attempt of each failing and being retried
+    - Expected: Only the 3 final results are counted toward checkpoint_every, not the failed attempts
+    """
+    counted = []
+    monkeypatch.setattr(JobCheckpointer, "record_result", lambda self: counted.append(1))
+    attempts = set()
+
+    @data_factory(max_concurrency=1, checkpoint_every=1, job_run_stop_threshold=10, retry_policy=RetryPolicy(max_retries=0, base_delay=0.01))
+    async def test1(city_name):
+        if city_name not in attempts:
+            attempts.add(city_name)
+            raise ConnectionError("first attempt fails")
+        return [{"answer": city_name}]
+
+    assert len(test1.run(city_name=["1. New York", "2. Chicago", "3. Boston"])) == 3
+    assert test1.factory.job_manager.failed_count == 3
+    assert len(counted) == 3
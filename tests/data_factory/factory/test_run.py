@@ -1,12 +1,23 @@
+import asyncio
+import json
+import time
 import nest_asyncio
 import pytest
 import os
+import threading
+import uuid
 
 from starfish.data_factory.factory import data_factory
 from starfish.common.env_loader import load_env_file
-from starfish.data_factory.constants import STATUS_COMPLETED
+from starfish.data_factory.constants import STATUS_COMPLETED, STATUS_FILTERED
 from starfish.data_factory.utils.errors import InputError, OutputError
 from starfish.data_factory.utils.mock import mock_llm_call
+from starfish.data_factory.utils.circuit_breaker import CircuitBreakerPolicy
+from starfish.data_factory.utils.dedup import NearDuplicateHook
+from starfish.data_factory.utils.hooks import BatchedHook, ThreadedHook
+from starfish.data_factory.utils.result_cache import ResultCachePolicy
+from starfish.data_factory.utils.retry import RetryPolicy
+from starfish.llm.proxy.litellm_adapter import call_chat_model
 from starfish.llm.structured_llm import StructuredLLM
 
 nest_asyncio.apply()
@@ -247,6 +258,245 @@ async def test_case_job_run_stop_threshold():
     )
 
 
+@pytest.mark.asyncio
+async def test_case_batch_size():
+    """Test micro-batched invocation
+    - Input: List of dicts with city names
+    - batch_size: 3, so each call receives up to 3 city names as a list
+    - Expected: One record per input, every call gets at most 3 inputs
+    """
+    call_sizes = []
+
+    @data_factory(max_concurrency=2, batch_size=3)
+    async def test1(city_name, num_records_per_city):
+        call_sizes.append(len(city_name))
+        return [{"answer": f"{city} - {num}"} for city, num in zip(city_name, num_records_per_city)]
+
+    result = test1.run(
+        data=[{"city_name": f"{i}. City"} for i in range(7)],
+        num_records_per_city=1,
+    )
+    assert sorted(item["answer"] for item in result) == sorted(f"{i}. City - 1" for i in range(7))
+    assert sum(call_sizes) == 7
+    assert max(call_sizes) <= 3
+
+
+@pytest.mark.asyncio
+async def test_case_batch_size_different_keys():
+    """Test micro-batched invocation with inputs having different keys
+    - Input: List of dicts with city names, only the second one has a country
+    - batch_size: 2, so both inputs are passed in one call
+    - Expected: The country is passed for the second input and None for the first
+    """
+    calls = []
+
+    @data_factory(max_concurrency=1, batch_size=2)
+    async def test1(city_name, country=None):
+        calls.append(country)
+        return [{"answer": f"{city} - {c}"} for city, c in zip(city_name, country)]
+
+    result = test1.run(data=[{"city_name": "1. New York"}, {"city_name": "2. Paris", "country": "France"}])
+    assert calls == [[None, "France"]]
+    assert sorted(item["answer"] for item in result) == ["1. New York - None", "2. Paris - France"]
+
+
+@pytest.mark.asyncio
+async def test_case_batch_size_output_mismatch():
+    """Test micro-batched invocation returning the wrong number of outputs
+    - Input: List of dicts with city names
+    - batch_size: 2, but the function returns a single output per call
+    - Expected: Every input of the batch fails, so no records are generated
+    """
+
+    @data_factory(max_concurrency=1, batch_size=2)
+    async def test1(city_name):
+        return [{"answer": city_name[0]}]
+
+    with pytest.raises(OutputError):
+        test1.run(data=[{"city_name": "1. New York"}, {"city_name": "2. Los Angeles"}])
+
+
+@pytest.mark.asyncio
+async def test_case_output_buffer_spill():
+    """Test output spilling to disk
+    - Input: 6 cities, output_buffer_size of 2 task results
+    - Expected: Results and indices are still returned in full from the spill files
+    """
+
+    @data_factory(max_concurrency=2, output_buffer_size=2)
+    async def test1(city_name):
+        return [{"answer": city_name}]
+
+    result = test1.run(data=[{"city_name": f"{i}. City"} for i in range(6)])
+    assert sorted(item["answer"] for item in result) == sorted(f"{i}. City" for i in range(6))
+    assert sorted(test1.get_index_completed()) == list(range(6))
+    assert test1.factory.job_manager.job_output.spill_count > 0
+
+
+@pytest.mark.asyncio
+async def test_case_output_buffer_spill_error():
+    """Test output spilling of an unpicklable output
+    - Input: 10 cities, output_buffer_size of 2 task results, each output holds a lock
+    - Expected: The job stops with an OutputError instead of hanging
+    """
+
+    @data_factory(max_concurrency=2, output_buffer_size=2)
+    async def test1(city_name):
+        return [{"answer": city_name, "lock": threading.Lock()}]
+
+    with pytest.raises(OutputError, match="not picklable"):
+        await asyncio.wait_for(asyncio.to_thread(test1.run, data=[{"city_name": f"{i}. City"} for i in range(10)]), timeout=30)
+    assert test1.factory.job_manager.in_flight_count == 0
+
+
+@pytest.mark.asyncio
+async def test_case_zero_copy():
+    """Test zero-copy mode
+    - Input: List of dicts with a nested dict parameter
+    - zero_copy: True, the function receives read-only views
+    - Expected: Writing to the input fails, the output records are returned without storage metadata
+    """
+
+    @data_factory(max_concurrency=2, zero_copy=True, job_run_stop_threshold=10)
+    async def test1(city):
+        if city["name"] == "Chicago":
+            city["name"] = "changed"
+        return [{"answer": city["name"]}]
+
+    result = test1.run(data=[{"city": {"name": "New York"}}, {"city": {"name": "Chicago"}}])
+    assert result == [{"answer": "New York"}]
+    assert len(test1.get_index_dead_queue()) == 1
+    assert test1.get_input_data()[1]["city"]["name"] == "Chicago"
+
+
+@pytest.mark.asyncio
+async def test_case_auto_concurrency():
+    """Test adaptive concurrency
+    - Input: 30 cities
+    - max_concurrency: "auto" between 2 and 4
+    - Expected: All records processed, never more than the ceiling running at once
+    """
+    running = 0
+    peak = 0
+
+    @data_factory(max_concurrency="auto", concurrency_floor=2, concurrency_ceiling=4)
+    async def test1(city_name):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return [{"answer": city_name}]
+
+    result = test1.run(city_name=[f"{i}. City" for i in range(30)])
+    assert len(result) == 30
+    assert 2 <= peak <= 4
+    assert test1.factory.job_manager.semaphore.limit == 4
+
+
+@pytest.mark.asyncio
+async def test_case_non_retryable_error():
+    """Test error classification
+    - Input: 2 cities, one failing with an authentication error
+    - Expected: The failing input is attempted once and goes straight to the dead queue
+    """
+    attempts = []
+
+    class AuthenticationError(Exception):
+        pass
+
+    @data_factory(max_concurrency=2, retry_policy=RetryPolicy(base_delay=0.01))
+    async def test1(city_name):
+        attempts.append(city_name)
+        if city_name == "Chicago":
+            raise AuthenticationError("invalid api key")
+        return [{"answer": city_name}]
+
+    result = test1.run(city_name=["New York", "Chicago"])
+    assert result == [{"answer": "New York"}]
+    assert attempts.count("Chicago") == 1
+    assert test1.get_index_dead_queue() == [1]
+
+
+@pytest.mark.asyncio
+async def test_case_priority_hint():
+    """Test priority hints
+    - Input: 3 cities, the last one with the highest priority_hint, max_concurrency 1
+    - Expected: The prioritized city runs first, and the hint is not passed to the function
+    """
+    order = []
+
+    @data_factory(max_concurrency=1)
+    async def test1(city_name):
+        order.append(city_name)
+        return [{"answer": city_name}]
+
+    result = test1.run(data=[{"city_name": "New York"}, {"city_name": "Chicago"}, {"city_name": "Boston", "priority_hint": 10}])
+    assert len(result) == 3
+    assert order == ["Boston", "New York", "Chicago"]
+
+
+@pytest.mark.asyncio
+async def test_case_process_executor():
+    """Test the process executor
+    - Input: 8 numbers, executor "process" with 2 workers
+    - Expected: Every input is processed in a worker process, failures are retried in the parent job
+    """
+
+    @data_factory(max_concurrency=4, executor="process", workers=2, retry_policy=RetryPolicy(base_delay=0.01))
+    async def test1(number):
+        if number == 3:
+            raise ValueError("three is not allowed")
+        await asyncio.sleep(0.05)
+        return [{"square": number * number, "pid": os.getpid()}]
+
+    result = test1.run(number=list(range(8)))
+    assert sorted(item["square"] for item in result) == [n * n for n in range(8) if n != 3]
+    pids = {item["pid"] for item in result}
+    assert os.getpid() not in pids
+    assert len(pids) == 2
+    assert test1.get_index_dead_queue() == [3]
+    # The workers received the bytes saved with the request config, the function was pickled once
+    assert test1.factory.job_manager.func_pickle is test1.factory._pickle_func()
+
+
+@pytest.mark.asyncio
+async def test_case_process_executor_replaces_exited_worker(tmp_path):
+    """Test the process executor when a worker process exits
+    - Input: 4 numbers, executor "process" with 1 worker, the worker exits on its first call
+    - Expected: The worker is replaced and every input completes
+    """
+    marker = str(tmp_path / "exited")
+
+    @data_factory(max_concurrency=1, executor="process", workers=1, retry_policy=RetryPolicy(base_delay=0.01))
+    def test1(number):
+        if not os.path.exists(marker):
+            open(marker, "w").close()
+            os._exit(1)
+        return [{"square": number * number, "pid": os.getpid()}]
+
+    result = test1.run(number=list(range(4)))
+    assert sorted(item["square"] for item in result) == [0, 1, 4, 9]
+    assert test1.get_index_dead_queue() == []
+
+
+@pytest.mark.asyncio
+async def test_case_process_executor_budget():
+    """Test the cost budget with the process executor
+    - Input: 10 cities run one at a time in 1 worker process, each making one mocked LLM call of $0.0000135,
+      max_cost=0.00005
+    - Expected: The LLM calls made in the worker are accounted and the job stops after 3 tasks
+    """
+
+    @data_factory(max_concurrency=1, executor="process", workers=1, max_cost=0.00005)
+    async def test1(city_name):
+        await call_chat_model("openai/gpt-4o-mini", [{"role": "user", "content": city_name}], {"mock_response": "a city"})
+        return [{"answer": city_name}]
+
+    assert len(test1.run(city_name=[f"{i}. City" for i in range(10)])) == 3
+    assert test1.factory.job_manager.budget.usage.calls == 3
+
+
 @pytest.mark.asyncio
 async def test_case_reuse_run_different_factory():
     @data_factory(max_concurrency=10)
@@ -306,3 +556,265 @@ async def test_case_reuse_run_same_factory():
 #     result = test_pydantic_issue.run(city_name=["SF", "Shanghai"], num_records_per_city=2)
 #     # num of records not used right now
 #     assert len(result) == 2
+
+
+@pytest.mark.asyncio
+async def test_case_hedging():
+    """Test hedging of straggler tasks
+    - Input: 30 cities, the first call for "0. City" hanging for 5s, hedge_percentile=90
+    - Expected: The straggler is hedged, and the hedged attempt returns long before the hanging one
+    """
+    calls = []
+
+    @data_factory(max_concurrency=10, hedge_percentile=90, task_runner_timeout=10)
+    async def test1(city_name):
+        calls.append(city_name)
+        if city_name == "0. City" and calls.count(city_name) == 1:
+            await asyncio.sleep(5)
+        await asyncio.sleep(0.01)
+        return [{"answer": city_name}]
+
+    start = time.monotonic()
+    result = test1.run(city_name=[f"{i}. City" for i in range(30)])
+    assert len(result) == 30
+    assert time.monotonic() - start < 4
+    assert test1.factory.job_manager.hedger.hedged_count >= 1
+    assert test1.factory.job_manager.hedger.hedge_win_count >= 1
+
+
+@pytest.mark.asyncio
+async def test_case_get_metrics():
+    """Test per-phase latency metrics
+    - Input: 5 cities, 0.05s per call, one on_record_complete hook
+    - Expected: get_metrics reports every phase and the hook, with the user function near 0.05s
+    """
+
+    def keep(data, state):
+        return STATUS_COMPLETED
+
+    @data_factory(max_concurrency=5, on_record_complete=[keep])
+    async def test1(city_name):
+        await asyncio.sleep(0.05)
+        return [{"answer": city_name}]
+
+    assert test1.get_metrics() == {}
+    test1.run(city_name=[f"{i}. City" for i in range(5)])
+    metrics = test1.get_metrics()
+    assert set(metrics) == {"queue_wait", "user_func", "hooks", "storage_save", "hook:keep"}
+    assert metrics["user_func"]["count"] == 5
+    assert 0.04 <= metrics["user_func"]["p50"] <= metrics["user_func"]["max"]
+    assert metrics["hooks"]["count"] == 5
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_case_circuit_breaker_recovers():
+    """Test the circuit breaker closing again
+    - Input: 8 cities run one at a time, the first 4 calls failing with a rate limit error
+    - Expected: The breaker trips on the 3rd failure and on the failed probe, closes on the next probe, and every city completes
+    """
+    calls = []
+
+    # More attempts per input than failing calls, so no input reaches the dead queue whatever the order of retries
+    @data_factory(
+        max_concurrency=1,
+        dead_queue_threshold=5,
+        job_run_stop_threshold=20,
+        retry_policy=RetryPolicy(max_retries=0, base_delay=0.01),
+        circuit_breaker=CircuitBreakerPolicy(min_failures=3, cooldown=0.1, max_trips=3),
+    )
+    async def test1(city_name):
+        calls.append(city_name)
+        if len(calls) <= 4:
+            raise RateLimitError("quota exceeded")
+        return [{"answer": city_name}]
+
+    result = test1.run(city_name=[f"{i}. City" for i in range(8)])
+    assert len(result) == 8
+    breaker = test1.factory.job_manager.circuit_breaker
+    assert breaker.trip_count == 2 and breaker.state == "closed"
+    assert breaker.tripped_category == "quota"
+
+
+@pytest.mark.asyncio
+async def test_case_circuit_breaker_stops_job():
+    """Test the circuit breaker stopping a job
+    - Input: 10 cities, every call failing with a rate limit error, max_trips 2
+    - Expected: The job stops after the failed probe instead of running every input to the dead queue
+    """
+    calls = []
+
+    @data_factory(
+        max_concurrency=1,
+        dead_queue_threshold=10,
+        job_run_stop_threshold=20,
+        retry_policy=RetryPolicy(max_retries=0, base_delay=0.01),
+        circuit_breaker=CircuitBreakerPolicy(min_failures=3, cooldown=0.1, max_trips=2),
+    )
+    async def test1(city_name):
+        calls.append(city_name)
+        raise RateLimitError("quota exceeded")
+
+    with pytest.raises(OutputError):
+        test1.run(city_name=[f"{i}. City" for i in range(10)])
+    assert len(calls) == 4
+    assert test1.factory.job_manager.circuit_breaker.is_exhausted()
+
+
+@pytest.mark.asyncio
+async def test_case_max_tokens_budget():
+    """Test the token budget
+    - Input: 10 cities run one at a time, each making one mocked LLM call of 30 tokens, max_tokens=100
+    - Expected: The job stops after 3 tasks, since a 4th would exceed the budget, and every result carries its usage
+    """
+
+    @data_factory(max_concurrency=1, max_tokens=100)
+    async def test1(city_name):
+        await call_chat_model("openai/gpt-4o-mini", [{"role": "user", "content": city_name}], {"mock_response": "a city"})
+        return [{"answer": city_name}]
+
+    result = test1.run(city_name=[f"{i}. City" for i in range(10)])
+    assert len(result) == 3
+    job_manager = test1.factory.job_manager
+    assert job_manager.budget.usage.total_tokens == 90
+    assert job_manager.budget.usage.calls == 3
+    assert all(result["usage"]["total_tokens"] == 30 for result in job_manager.job_output)
+
+
+@pytest.mark.asyncio
+async def test_case_near_duplicate_hook():
+    """Test the built-in near-duplicate hook
+    - Input: 3 cities run one at a time, the first attempt of "1. City" repeating the answer of "0. City" with another casing
+    - Expected: The repeated answer is a duplicate and is generated again, so 3 distinct answers are returned
+    """
+    calls = []
+
+    @data_factory(max_concurrency=1, on_record_complete=[NearDuplicateHook(fields=["answer"])])
+    async def test1(city_name):
+        calls.append(city_name)
+        if city_name == "1. City" and calls.count(city_name) == 1:
+            return [{"answer": "THE CAPITAL OF 0. CITY IS A LARGE HARBOUR TOWN ON THE NORTHERN COAST"}]
+        return [{"answer": f"The capital of {city_name} is a large harbour town on the northern coast"}]
+
+    result = test1.run(city_name=[f"{i}. City" for i in range(3)])
+    assert sorted(record["answer"] for record in result) == [f"The capital of {i}. City is a large harbour town on the northern coast" for i in range(3)]
+    assert len(test1.get_output_duplicate()) == 1
+    assert calls.count("1. City") == 2
+
+
+@pytest.mark.asyncio
+async def test_case_near_duplicate_hook_skips_filtered_outputs():
+    """Test the near-duplicate hook with a filter hook after it
+    - Input: 2 cities run one at a time, the first output of each filtered by the next hook
+    - Expected: A filtered output is not indexed, so the retry returning the same answer is completed
+    """
+    filtered = set()
+
+    def filter_first_attempt(output, state):
+        if output[0]["answer"] in filtered:
+            return STATUS_COMPLETED
+        filtered.add(output[0]["answer"])
+        return STATUS_FILTERED
+
+    @data_factory(max_concurrency=1, on_record_complete=[NearDuplicateHook(fields=["answer"]), filter_first_attempt])
+    async def test1(city_name):
+        return [{"answer": f"The capital of {city_name} is a large harbour town on the northern coast"}]
+
+    result = test1.run(city_name=["0. City", "1. City"])
+    assert len(result) == 2
+    assert len(test1.get_output_filtered()) == 2
+    assert test1.get_output_duplicate() == []
+
+
+@pytest.mark.asyncio
+async def test_case_result_cache():
+    """Test the result cache across master jobs
+    - Input: 4 cities run twice, each run being a new master job, with a result cache of a version unique to the test
+    - Expected: The second run calls the function only for the new city and serves the others from the cache
+    """
+    calls = []
+
+    @data_factory(max_concurrency=2, result_cache=ResultCachePolicy(version=str(uuid.uuid4())))
+    async def test1(city_name):
+        calls.append(city_name)
+        return [{"answer": f"{city_name} answer"}]
+
+    first = test1.run(city_name=[f"{i}. City" for i in range(4)])
+    assert len(calls) == 4
+    second = test1.run(city_name=[f"{i}. City" for i in range(1, 5)])
+    assert calls[4:] == ["4. City"]
+    assert sorted(record["answer"] for record in second) == [f"{i}. City answer" for i in range(1, 5)]
+    assert test1.factory.job_manager.result_cache.hit_count == 3
+    assert len(first) == 4
+
+
+@pytest.mark.asyncio
+async def test_case_async_threaded_and_batched_hooks():
+    """Test the execution modes of the hooks
+    - Input: 8 cities, an async hook, a threaded hook and a batched hook filtering the odd cities; an async error hook
+    - Expected: The even cities are completed, the batched hook is called with several outputs, and every hook is timed
+    """
+    batch_sizes = []
+    errors = []
+
+    async def lookup(data, state):
+        await asyncio.sleep(0.01)
+        return STATUS_COMPLETED
+
+    def blocking_check(data, state):
+        time.sleep(0.01)
+        return STATUS_COMPLETED
+
+    def odd_filter(outputs, state):
+        batch_sizes.append(len(outputs))
+        return [STATUS_FILTERED if int(output[0]["answer"].split(".")[0]) % 2 else STATUS_COMPLETED for output in outputs]
+
+    async def log_error(err_str, state):
+        errors.append(err_str)
+
+    @data_factory(
+        max_concurrency=8,
+        dead_queue_threshold=1,
+        job_run_stop_threshold=20,
+        on_record_complete=[lookup, ThreadedHook(blocking_check), BatchedHook(odd_filter, max_wait=0.05)],
+        on_record_error=[log_error],
+    )
+    async def test1(city_name):
+        if city_name == "7. City":
+            raise ValueError("no such city")
+        return [{"answer": city_name}]
+
+    result = test1.run(city_name=[f"{i}. City" for i in range(8)])
+    assert sorted(record["answer"] for record in result) == [f"{i}. City" for i in range(0, 8, 2)]
+    assert max(batch_sizes) > 1
+    assert errors and all("no such city" in err for err in errors)
+    metrics = test1.get_metrics()
+    assert {"hook:lookup", "hook:blocking_check", "hook:odd_filter", "hook:log_error"} <= set(metrics)
+
+
+@pytest.mark.asyncio
+async def test_case_checkpoint():
+    """Test the atomic state operations with checkpoints by record count
+    - Input: 20 cities run concurrently, each counting itself and appending to a bounded list of the state
+    - Expected: No update is lost, and the checkpoint saved next to the master job holds the final state and counters
+    """
+
+    @data_factory(max_concurrency=10, checkpoint_interval=None, checkpoint_every=5)
+    async def test1(city_name):
+        await asyncio.sleep(0.01)
+        test1.state.incr("count")
+        test1.state.append("recent", city_name, max_len=5)
+        return [{"answer": city_name}]
+
+    test1.run(city_name=[f"{i}. City" for i in range(20)])
+    checkpointer = test1.factory.job_manager.checkpointer
+    assert test1.state.get("count") == 20
+    assert checkpointer.checkpoint_count >= 2
+    with open(checkpointer.path) as f:
+        checkpoint = json.load(f)
+    assert checkpoint["state"]["count"] == 20
+    assert len(checkpoint["state"]["recent"]) == 5
+    assert checkpoint["counters"]["completed_count"] == 20
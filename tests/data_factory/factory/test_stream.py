@@ -0,0 +1,105 @@
+import asyncio
+
+import nest_asyncio
+import pytest
+
+from starfish.common.env_loader import load_env_file
+from starfish.data_factory.factory import data_factory
+from starfish.data_factory.utils.errors import InputError
+
+nest_asyncio.apply()
+load_env_file()
+
+
+@pytest.mark.asyncio
+async def test_arun_stream_yields_while_running():
+    """Test streaming records before the job finishes
+    - Input: 6 cities, the last one is much slower than the others
+    - Expected: The fast records are received before the slow task completes, all records are streamed
+    """
+    finished = []
+
+    @data_factory(max_concurrency=6)
+    async def test1(city_name, sleep_time):
+        await asyncio.sleep(sleep_time)
+        finished.append(city_name)
+        return [{"answer": city_name}]
+
+    received = []
+    async for record in test1.arun_stream(
+        data=[{"city_name": f"{i}. City", "sleep_time": 0.5 if i == 5 else 0.01} for i in range(6)],
+    ):
+        received.append((record["answer"], len(finished)))
+
+    assert sorted(answer for answer, _ in received) == sorted(f"{i}. City" for i in range(6))
+    # The first record was consumed while the slow task was still running
+    assert received[0][1] < 6
+    assert received[-1][0] == "5. City"
+
+
+@pytest.mark.asyncio
+async def test_arun_stream_ordered():
+    """Test ordered streaming
+    - Input: 5 cities, lower indices take longer
+    - Expected: Records are yielded by ascending input index
+    """
+
+    @data_factory(max_concurrency=5)
+    async def test1(city_name, sleep_time):
+        await asyncio.sleep(sleep_time)
+        return [{"answer": city_name}]
+
+    received = [
+        record["answer"]
+        async for record in test1.arun_stream(
+            data=[{"city_name": f"{i}. City", "sleep_time": 0.05 * (5 - i)} for i in range(5)],
+            stream_ordered=True,
+        )
+    ]
+    assert received == [f"{i}. City" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_arun_stream_backpressure():
+    """Test that a slow consumer throttles the job
+    - Input: 10 cities, buffer of 1 record
+    - Expected: The job never runs more than a few records ahead of the consumer
+    """
+    started = []
+
+    @data_factory(max_concurrency=2)
+    async def test1(city_name):
+        started.append(city_name)
+        return [{"answer": city_name}]
+
+    consumed = 0
+    max_ahead = 0
+    async for _ in test1.arun_stream(data=[{"city_name": f"{i}. City"} for i in range(10)], stream_buffer_size=1):
+        consumed += 1
+        max_ahead = max(max_ahead, len(started) - consumed)
+        await asyncio.sleep(0.01)
+
+    assert consumed == 10
+    # One record in the buffer, plus at most one waiting publisher and one new task per slot
+    assert max_ahead <= 4
+
+
+@pytest.mark.asyncio
+async def test_run_stream_filter():
+    """Test synchronous streaming with a status filter
+    - Input: 4 cities, the function fails for the odd ones
+    - Expected: Only the error records of failed tasks are streamed
+    """
+
+    @data_factory(max_concurrency=2, job_run_stop_threshold=10)
+    async def test1(city_name, fail):
+        if fail:
+            raise ValueError(f"mock failure for {city_name}")
+        return [{"answer": city_name}]
+
+    failed = list(test1.run_stream(data=[{"city_name": f"{i}. City", "fail": i % 2 == 1} for i in range(4)], stream_filter="failed"))
+    assert len(failed) > 0
+    assert all("mock failure" in record["err_str"] for record in failed)
+
+    with pytest.raises(InputError):
+        test1.run_stream(data=[{"city_name": "1. New York", "fail": False}], stream_filter="unknown")
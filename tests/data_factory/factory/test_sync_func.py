@@ -0,0 +1,112 @@
+import threading
+import time
+
+import nest_asyncio
+import pytest
+
+from starfish.common.env_loader import load_env_file
+from starfish.data_factory.factory import data_factory
+from starfish.data_factory.thread_pool import ThreadPool, is_async_callable
+from starfish.data_factory.utils.errors import OutputError
+
+nest_asyncio.apply()
+load_env_file()
+
+
+@pytest.mark.asyncio
+async def test_sync_function_runs_in_threads():
+    """Test a synchronous function
+    - Input: 8 cities, blocking function sleeping 0.1s, max_concurrency 4
+    - Expected: Calls run in parallel worker threads, off the event loop thread
+    """
+    main_thread = threading.get_ident()
+    threads = set()
+
+    @data_factory(max_concurrency=4)
+    def test1(city_name):
+        threads.add(threading.get_ident())
+        time.sleep(0.1)
+        return [{"answer": city_name}]
+
+    start = time.monotonic()
+    result = test1.run(city_name=[f"{i}. City" for i in range(8)])
+    elapsed = time.monotonic() - start
+    assert len(result) == 8
+    assert main_thread not in threads
+    assert len(threads) > 1
+    # Serialized, the calls would take 0.8s
+    assert elapsed < 0.7
+
+
+@pytest.mark.asyncio
+async def test_sync_function_timeout():
+    """Test the timeout of a synchronous function
+    - Input: 2 cities, blocking function slower than task_runner_timeout
+    - Expected: Calls time out and no record is generated
+    """
+
+    @data_factory(max_concurrency=2, task_runner_timeout=0.05)
+    def test1(city_name):
+        time.sleep(0.2)
+        return [{"answer": city_name}]
+
+    with pytest.raises(OutputError):
+        test1.run(city_name=["New York", "Chicago"])
+
+
+@pytest.mark.asyncio
+async def test_thread_pool_drops_cancelled_calls():
+    """Test the thread pool counters when a queued call is cancelled
+    - Input: A pool of one thread, a blocking call and a second call cancelled while queued
+    - Expected: The queued call never runs and the counters return to zero
+    """
+    import asyncio
+
+    pool = ThreadPool(1)
+    calls = []
+
+    def work(name):
+        calls.append(name)
+        time.sleep(0.1)
+        return name
+
+    first = asyncio.ensure_future(pool.run(work, {"name": "first"}))
+    second = asyncio.ensure_future(pool.run(work, {"name": "second"}))
+    await asyncio.sleep(0.02)
+    assert pool.active == 1 and pool.queued == 1
+    second.cancel()
+    assert await first == "first"
+    await asyncio.sleep(0.02)
+    assert calls == ["first"]
+    assert pool.active == 0 and pool.queued == 0
+    pool.shutdown()
+
+
+def test_is_async_callable():
+    """Test the detection of async functions
+    - Input: Functions, partials and callable objects, sync and async
+    - Expected: Only those returning an awaitable are async
+    """
+    import functools
+
+    async def async_func(x):
+        return x
+
+    def sync_func(x):
+        return x
+
+    class AsyncCallable:
+        async def __call__(self, x):
+            return x
+
+    class SyncCallable:
+        def __call__(self, x):
+            return x
+
+    assert is_async_callable(async_func)
+    assert is_async_callable(functools.partial(async_func, 1))
+    assert is_async_callable(AsyncCallable())
+    assert not is_async_callable(sync_func)
+    assert not is_async_callable(functools.partial(sync_func, 1))
+    assert not is_async_callable(SyncCallable())
+    assert not is_async_callable(None)
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import nest_asyncio
+import pytest
+
+from starfish.common.env_loader import load_env_file
+from starfish.common.tracing import TraceFileExporter, add_span_hook, is_tracing, remove_span_hook, span
+from starfish.data_factory.factory import data_factory
+
+nest_asyncio.apply()
+load_env_file()
+
+
+def test_span_is_noop_without_hooks():
+    assert not is_tracing()
+    with span("untraced") as s:
+        assert s is None
+
+
+def test_spans_nest_and_record_errors():
+    spans = []
+    add_span_hook(spans.append)
+    try:
+        with pytest.raises(ValueError):
+            with span("outer", idx=1):
+                with span("inner"):
+                    raise ValueError("boom")
+    finally:
+        remove_span_hook(spans.append)
+
+    inner, outer = spans
+    assert inner.parent_id == outer.span_id and inner.trace_id == outer.trace_id
+    assert outer.parent_id is None and outer.attributes == {"idx": 1}
+    assert inner.error == "ValueError: boom"
+    assert outer.duration_ns >= inner.duration_ns
+
+
+@pytest.mark.asyncio
+async def test_trace_file_exporter(tmp_path):
+    """Test the trace of a job run
+    - Input: 3 cities, traced into a Chrome and an OTLP file
+    - Expected: Task, task runner and storage spans are exported, and the hooks are removed after
+    """
+
+    @data_factory(max_concurrency=3)
+    async def test1(city_name):
+        await asyncio.sleep(0.01)
+        return [{"answer": city_name}]
+
+    chrome_path, otlp_path = tmp_path / "trace.json", tmp_path / "trace_otlp.json"
+    with TraceFileExporter(str(chrome_path)), TraceFileExporter(str(otlp_path), format="otlp"):
+        test1.run(city_name=["New York", "Chicago", "Boston"])
+    assert not is_tracing()
+
+    events = json.loads(chrome_path.read_text())["traceEvents"]
+    names = [event["name"] for event in events if event["ph"] == "X"]
+    assert names.count("JobManager._run_single_task") == 3
+    assert names.count("TaskRunner.run_task") == 3
+    assert "LocalStorage.save_record_data" in names
+    assert "SQLiteMetadataHandler._write_lock.wait" in names
+
+    otlp_spans = json.loads(otlp_path.read_text())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    span_ids = {s["spanId"] for s in otlp_spans}
+    runner_spans = [s for s in otlp_spans if s["name"] == "TaskRunner.run_task"]
+    assert len(runner_spans) == 3 and all(s["parentSpanId"] in span_ids for s in runner_spans)
+
+    with pytest.raises(ValueError):
+        TraceFileExporter(str(chrome_path), format="jaeger")
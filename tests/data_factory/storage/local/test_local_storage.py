@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import hashlib
 import json
@@ -574,3 +575,53 @@ async def test_complete_workflow(storage):
     counts = await storage.count_records_for_master_job(master_job_id)
     assert counts["completed"] == 8
     assert counts["failed"] == 2
+
+
+# --- Lease Queue Tests ---
+
+
+@pytest.mark.asyncio
+async def test_work_item_leases(storage, test_master_job):
+    """Test that claims are exclusive until the lease expires."""
+    master_job_id = test_master_job.master_job_id
+    await storage.enqueue_work_items(master_job_id, [{"idx_index": i, "value": i} for i in range(5)])
+    # Enqueuing again keeps the stored items
+    await storage.enqueue_work_items(master_job_id, [{"idx_index": 0, "value": "changed"}])
+
+    first = await storage.claim_work_items(master_job_id, "worker-1", 3, lease_timeout=60)
+    second = await storage.claim_work_items(master_job_id, "worker-2", 10, lease_timeout=0.05)
+    assert [item["idx_index"] for item in first] == [0, 1, 2]
+    assert first[0]["value"] == 0
+    assert [item["idx_index"] for item in second] == [3, 4]
+    assert await storage.claim_work_items(master_job_id, "worker-3", 10, lease_timeout=60) == []
+    assert await storage.count_work_items(master_job_id) == {"leased": 5}
+
+    # worker-2 stops renewing: its items are claimed again once the lease expires
+    await asyncio.sleep(0.1)
+    reclaimed = await storage.claim_work_items(master_job_id, "worker-3", 10, lease_timeout=60)
+    assert [item["idx_index"] for item in reclaimed] == [3, 4]
+    items = await storage.list_work_items(master_job_id, status_filter=["leased"])
+    assert {item.item_idx: item.lease_owner for item in items} == {0: "worker-1", 1: "worker-1", 2: "worker-1", 3: "worker-3", 4: "worker-3"}
+    assert items[3].attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_work_item_commit_and_release(storage, test_master_job):
+    """Test committing results (first commit wins) and releasing leases."""
+    master_job_id = test_master_job.master_job_id
+    await storage.enqueue_work_items(master_job_id, [{"idx_index": i} for i in range(3)])
+    await storage.claim_work_items(master_job_id, "worker-1", 3, lease_timeout=60)
+
+    await storage.complete_work_items(master_job_id, "worker-1", [(0, "completed", ["ref-0"]), (1, "failed", [])])
+    # A late duplicate of item 0 does not overwrite the first result
+    await storage.complete_work_items(master_job_id, "worker-2", [(0, "completed", ["ref-late"])])
+    await storage.release_work_items(master_job_id, "worker-1", [2])
+
+    assert await storage.count_work_items(master_job_id) == {"done": 2, "pending": 1}
+    done = await storage.list_work_items(master_job_id, status_filter=["done"])
+    assert [(item.item_idx, item.lease_owner, item.result_status, item.output_refs) for item in done] == [
+        (0, "worker-1", "completed", ["ref-0"]),
+        (1, "worker-1", "failed", []),
+    ]
+    released = await storage.claim_work_items(master_job_id, "worker-2", 10, lease_timeout=60)
+    assert released == [{"idx_index": 2}]
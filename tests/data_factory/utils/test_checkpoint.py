@@ -0,0 +1,89 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from starfish.data_factory.constants import IDX
+from starfish.data_factory.storage.in_memory.in_memory_storage import InMemoryStorage
+from starfish.data_factory.utils.budget import UsageBudget
+from starfish.data_factory.utils.checkpoint import JobCheckpointer, create_checkpointer, read_checkpoint, write_checkpoint
+from starfish.data_factory.utils.errors import InputError
+from starfish.data_factory.utils.state import MutableSharedState
+from starfish.llm.proxy.usage import Usage
+
+
+def _job_manager():
+    dead_queue = asyncio.Queue()
+    dead_queue.put_nowait({IDX: 4, "city_name": "x"})
+    return SimpleNamespace(
+        master_job_id="master-1",
+        total_count=3,
+        completed_count=2,
+        failed_count=1,
+        filtered_count=0,
+        duplicate_count=0,
+        dead_queue_count=1,
+        dead_queue=dead_queue,
+        state=MutableSharedState({"count": 2}),
+        budget=UsageBudget(max_cost=1),
+        input_feeder=None,
+    )
+
+
+def test_write_is_atomic_and_read_back(tmp_path):
+    path = str(tmp_path / "indexes" / "checkpoint.json")
+    assert read_checkpoint(path) is None
+    write_checkpoint(path, {"state": {"count": 1}})
+    write_checkpoint(path, {"state": {"count": 2}})
+    assert read_checkpoint(path) == {"state": {"count": 2}}
+    # No temporary file is left behind
+    assert [p.name for p in (tmp_path / "indexes").iterdir()] == ["checkpoint.json"]
+    with open(path, "w") as f:
+        f.write('{"state": ')
+    assert read_checkpoint(path) is None
+
+
+def test_write_rejects_values_json_would_change(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    write_checkpoint(path, {"state": {"seen": ["a"]}})
+    with pytest.raises(TypeError, match=r"checkpoint\['state'\]\['seen'\] is a set"):
+        write_checkpoint(path, {"state": {"seen": {"a", "b"}}})
+    with pytest.raises(TypeError, match=r"\['pair'\]\[1\] is a tuple"):
+        write_checkpoint(path, {"state": {"pair": [1, (2, 3)]}})
+    # The previous checkpoint is kept
+    assert read_checkpoint(path) == {"state": {"seen": ["a"]}}
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_by_record_count(tmp_path):
+    job_manager = _job_manager()
+    checkpointer = JobCheckpointer(job_manager, str(tmp_path / "checkpoint.json"), every=2)
+    await checkpointer.start()
+    checkpointer.record_result()
+    await asyncio.sleep(0.05)
+    assert checkpointer.checkpoint_count == 0
+    checkpointer.record_result()
+    await asyncio.sleep(0.05)
+    assert checkpointer.checkpoint_count == 1
+
+    job_manager.state.incr("count")
+    job_manager.state.add_to_reservoir("sample", 1, size=1)
+    job_manager.state.add_to_reservoir("sample", 2, size=1)
+    job_manager.budget.record(Usage(calls=1, total_tokens=30, cost=0.5))
+    await checkpointer.stop()
+    assert checkpointer.checkpoint_count == 2
+    with open(checkpointer.path) as f:
+        checkpoint = json.load(f)
+    assert checkpoint["state"]["count"] == 3
+    assert checkpoint["reservoir_counts"] == {"sample": 2}
+    assert checkpoint["counters"]["completed_count"] == 2
+    assert checkpoint["dead_queue"] == [4]
+    assert checkpoint["budget"] == {"usage": Usage(calls=1, total_tokens=30, cost=0.5).to_dict(), "task_count": 1}
+
+
+def test_disabled_without_index_files():
+    job_manager = _job_manager()
+    assert create_checkpointer(job_manager, InMemoryStorage(), interval=60) is None
+    with pytest.raises(InputError):
+        JobCheckpointer(job_manager, "checkpoint.json", interval=0)
@@ -0,0 +1,36 @@
+import time
+
+from starfish.data_factory.utils.circuit_breaker import BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker, CircuitBreakerPolicy
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(CircuitBreakerPolicy(min_failures=2, cooldown=0.01, max_trips=3))
+    breaker.record("rate_limit", "0")
+    breaker.record("rate_limit", "1")
+    assert breaker.state == BREAKER_OPEN
+    time.sleep(0.02)
+    assert breaker.allow_dispatch()
+    assert breaker.state == BREAKER_HALF_OPEN
+    breaker.on_dispatch("5")
+    return breaker
+
+
+def test_only_the_probe_closes_the_breaker():
+    breaker = _half_open_breaker()
+    # A task dispatched before the trip finishes while the probe runs
+    breaker.record(None, "2")
+    assert breaker.state == BREAKER_HALF_OPEN
+    assert not breaker.allow_dispatch()
+    breaker.record(None, "5")
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.consecutive_trips == 0
+
+
+def test_only_the_probe_trips_the_breaker_again():
+    breaker = _half_open_breaker()
+    breaker.record("rate_limit", "3")
+    assert breaker.state == BREAKER_HALF_OPEN
+    assert breaker.consecutive_trips == 1
+    breaker.record("rate_limit", "5")
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.consecutive_trips == 2
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from starfish.data_factory.constants import STATUS_COMPLETED, STATUS_FAILED
+from starfish.data_factory.utils.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimiter, create_concurrency_limiter
+from starfish.data_factory.utils.errors import InputError
+
+
+def test_adaptive_limit_grows_on_healthy_windows():
+    limiter = AdaptiveConcurrencyLimiter(floor=1, ceiling=5, initial=2)
+    for _ in range(50):
+        limiter.record(STATUS_COMPLETED, latency=0.1)
+    assert limiter.limit == 5
+    assert limiter.peak_limit == 5
+    assert limiter.increase_count == 3
+
+
+def test_adaptive_limit_halves_on_overload_and_respects_floor():
+    limiter = AdaptiveConcurrencyLimiter(floor=2, ceiling=20, initial=16)
+    limiter.record(STATUS_FAILED, err_str="Request timed out")
+    assert limiter.limit == 8
+    # Further overload signals during the cooldown window are ignored
+    limiter.record(STATUS_FAILED, err_str="429 Too Many Requests")
+    assert limiter.limit == 8
+    for _ in range(20):
+        limiter.record(STATUS_FAILED, err_str="rate limit exceeded")
+    assert limiter.limit == 2
+    assert limiter.decrease_count == 3
+
+
+def test_adaptive_limit_holds_when_latency_grows():
+    limiter = AdaptiveConcurrencyLimiter(floor=1, ceiling=10, initial=2)
+    limiter.record(STATUS_COMPLETED, latency=0.1)
+    limiter.record(STATUS_COMPLETED, latency=0.1)
+    assert limiter.limit == 3
+    for _ in range(3):
+        limiter.record(STATUS_COMPLETED, latency=1.0)
+    assert limiter.limit == 3
+
+
+def test_limiter_blocks_at_limit():
+    async def run():
+        limiter = ConcurrencyLimiter(1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.in_use == 1
+
+    asyncio.run(run())
+
+
+def test_create_concurrency_limiter():
+    assert isinstance(create_concurrency_limiter("auto", floor=1, ceiling=4), AdaptiveConcurrencyLimiter)
+    assert create_concurrency_limiter(3).limit == 3
+    with pytest.raises(InputError):
+        create_concurrency_limiter(0)
+    with pytest.raises(InputError):
+        create_concurrency_limiter("fast")
+    with pytest.raises(InputError):
+        create_concurrency_limiter("auto", floor=5, ceiling=2)
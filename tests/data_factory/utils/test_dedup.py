@@ -0,0 +1,107 @@
+import pytest
+
+from starfish.data_factory.constants import STATUS_COMPLETED, STATUS_DUPLICATE
+from starfish.data_factory.storage.local.local_storage import LocalStorage
+from starfish.data_factory.utils.dedup import MinHashLSH, NearDuplicateHook, shingles
+from starfish.data_factory.utils.errors import InputError
+
+TEXT = "Gradient descent updates the weights of a model in the direction that reduces the loss on the training data"
+
+
+def test_index_finds_near_duplicates_only():
+    index = MinHashLSH(threshold=0.7)
+    first = index.signature(shingles(TEXT))
+    assert index.query(first) is None
+    assert index.insert(first) == 0
+
+    near = index.signature(shingles(TEXT + " set"))
+    assert index.query(near) == 0
+    other = index.signature(shingles("Overfitting happens when a model memorizes noise in a small training set instead of the signal"))
+    assert index.query(other) is None
+    assert len(index) == 1
+
+
+def test_hook_rejects_duplicates_within_and_across_outputs():
+    hook = NearDuplicateHook(fields=["answer"])
+    output = [{"question": "q1", "answer": TEXT}]
+    assert hook(output, None) == STATUS_COMPLETED
+    # Only the answer field is compared, with the outputs checked and not yet committed too
+    assert hook([{"question": "another question", "answer": TEXT.upper()}], None) == STATUS_DUPLICATE
+    hook.commit(output)
+    assert hook([{"question": "another question", "answer": TEXT.upper()}], None) == STATUS_DUPLICATE
+    unrelated = "An unrelated answer about tokenizers and vocabularies"
+    assert hook([{"answer": unrelated}, {"answer": unrelated.lower()}], None) == STATUS_DUPLICATE
+    # Nothing of a duplicate output is indexed
+    assert len(hook.index) == 1
+    assert hook.duplicate_count == 3
+
+
+def test_hook_indexes_committed_outputs_only():
+    hook = NearDuplicateHook(fields=["answer"])
+    filtered = [{"answer": TEXT}]
+    assert hook(filtered, None) == STATUS_COMPLETED
+    # Another hook filtered the output: it is not indexed and its answer can be generated again
+    hook.discard(filtered)
+    assert len(hook.index) == 0
+    retried = [{"answer": TEXT}]
+    assert hook(retried, None) == STATUS_COMPLETED
+    hook.commit(retried)
+    assert len(hook.index) == 1
+    assert hook([{"answer": TEXT}], None) == STATUS_DUPLICATE
+
+
+def test_index_file_is_reloaded_and_checked(tmp_path):
+    path = str(tmp_path / "index.minhash")
+    index = MinHashLSH(path=path)
+    index.insert(index.signature(shingles(TEXT)))
+    index.close()
+    # A record cut short by a crash is dropped on reload
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02")
+
+    reloaded = MinHashLSH(path=path)
+    assert len(reloaded) == 1
+    assert reloaded.query(reloaded.signature(shingles(TEXT))) == 0
+    reloaded.close()
+
+    with pytest.raises(InputError):
+        MinHashLSH(num_perm=64, path=path)
+
+
+def test_hook_index_is_persisted_next_to_master_job(tmp_path):
+    storage = LocalStorage(f"file://{tmp_path}")
+    hook = NearDuplicateHook()
+    hook.open(storage, "master-1")
+    output = [{"answer": TEXT}]
+    assert hook(output) == STATUS_COMPLETED
+    hook.commit(output)
+    hook.close()
+
+    # A resumed run keeps deduplicating against the outputs of the earlier runs
+    resumed = NearDuplicateHook()
+    resumed.open(storage, "master-1")
+    assert resumed([{"answer": TEXT}]) == STATUS_DUPLICATE
+    resumed.open(storage, "master-2")
+    assert resumed([{"answer": TEXT}]) == STATUS_COMPLETED
+    resumed.close()
+
+
+def test_workers_of_a_lease_queue_share_the_index(tmp_path):
+    storage = LocalStorage(f"file://{tmp_path}")
+    first, second = NearDuplicateHook(), NearDuplicateHook()
+    first.open(storage, "master-1", worker_id="host:1")
+    second.open(storage, "master-1", worker_id="host:2")
+    output = [{"answer": TEXT}]
+    assert first(output) == STATUS_COMPLETED
+    first.commit(output)
+    # The other worker sees the records committed since it opened its index
+    assert second([{"answer": TEXT}]) == STATUS_DUPLICATE
+    assert first.index.path != second.index.path
+    first.close()
+    second.close()
+
+    # A later run without lease queue loads the files of every worker
+    resumed = NearDuplicateHook()
+    resumed.open(storage, "master-1")
+    assert len(resumed.index) == 1
+    resumed.close()
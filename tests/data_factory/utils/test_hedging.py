@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from starfish.data_factory.utils.errors import InputError
+from starfish.data_factory.utils.hedging import TaskHedger, create_task_hedger
+from starfish.data_factory.utils.histogram import LatencyHistogram
+
+
+def test_histogram_percentiles_within_bucket_width():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    for i in range(1, 101):
+        histogram.record(i / 10)
+    assert histogram.count == 100
+    assert histogram.mean() == pytest.approx(5.05)
+    assert histogram.percentile(50) == pytest.approx(5.0, rel=0.05)
+    assert histogram.percentile(99) == pytest.approx(9.9, rel=0.05)
+    assert histogram.percentile(100) == 10.0
+
+
+def _hedger_with_samples(latency: float, **kwargs) -> TaskHedger:
+    hedger = TaskHedger(percentile=90, min_samples=5, **kwargs)
+    for _ in range(5):
+        hedger.latencies.record(latency)
+    return hedger
+
+
+@pytest.mark.asyncio
+async def test_hedged_attempt_wins_and_straggler_is_cancelled():
+    hedger = _hedger_with_samples(0.02)
+    calls = []
+    cancelled = []
+
+    async def attempt():
+        calls.append(len(calls))
+        try:
+            # The first attempt straggles, the hedged one is fast
+            await asyncio.sleep(5 if len(calls) == 1 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return len(calls)
+
+    assert await hedger.run(attempt) == 2
+    assert cancelled == [True]
+    assert (hedger.hedged_count, hedger.hedge_win_count, hedger.in_flight) == (1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_before_enough_samples_or_over_the_cap():
+    hedger = TaskHedger(percentile=90, max_in_flight=1, min_samples=5)
+    assert hedger.hedge_delay() is None
+
+    async def attempt():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert await hedger.run(attempt) == "ok"
+    assert hedger.hedged_count == 0
+
+    hedger = _hedger_with_samples(0.01, max_in_flight=1)
+    results = await asyncio.gather(*[hedger.run(attempt) for _ in range(3)])
+    assert results == ["ok"] * 3
+    # Only one duplicate may run at a time, and all three tasks straggled together
+    assert hedger.hedged_count == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_survives_a_failed_attempt():
+    hedger = _hedger_with_samples(0.01)
+    calls = []
+
+    async def attempt():
+        calls.append(None)
+        if len(calls) == 1:
+            await asyncio.sleep(0.05)
+            raise ValueError("first attempt failed")
+        await asyncio.sleep(0.1)
+        return "second"
+
+    assert await hedger.run(attempt) == "second"
+
+    async def failing():
+        await asyncio.sleep(0.02)
+        raise ValueError("always fails")
+
+    with pytest.raises(ValueError):
+        await hedger.run(failing)
+
+
+def test_hedger_validation():
+    assert create_task_hedger(None) is None
+    with pytest.raises(InputError):
+        create_task_hedger(100)
+    with pytest.raises(InputError):
+        create_task_hedger(95, max_in_flight=0)
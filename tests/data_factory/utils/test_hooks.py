@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pytest
+
+from starfish.data_factory.utils.errors import InputError, OutputError
+from starfish.data_factory.utils.hooks import BatchedHook, ThreadedHook, hook_name
+
+
+@pytest.mark.asyncio
+async def test_threaded_hook_runs_off_the_event_loop():
+    def check(output, state):
+        return threading.current_thread() is threading.main_thread()
+
+    hook = ThreadedHook(check)
+    assert hook_name(hook) == "check"
+    assert await hook([{}], None) is False
+
+    async def async_check(output, state):
+        return True
+
+    with pytest.raises(InputError):
+        ThreadedHook(async_check)
+
+
+@pytest.mark.asyncio
+async def test_batched_hook_groups_concurrent_outputs():
+    calls = []
+
+    async def check(outputs, state):
+        calls.append(list(outputs))
+        return [f"status {output}" for output in outputs]
+
+    hook = BatchedHook(check, max_batch_size=3, max_wait=0.05)
+    statuses = await asyncio.gather(*[hook(i, None) for i in range(5)])
+    # Full batches are flushed at once, the rest after max_wait
+    assert statuses == [f"status {i}" for i in range(5)]
+    assert calls == [[0, 1, 2], [3, 4]]
+    assert hook.batch_count == 2
+
+
+@pytest.mark.asyncio
+async def test_batched_hook_failure_fails_every_output_of_the_batch():
+    hook = BatchedHook(lambda outputs, state: ["only one"], max_wait=0.01)
+    results = await asyncio.gather(hook(1, None), hook(2, None), return_exceptions=True)
+    assert all(isinstance(result, OutputError) for result in results)
+
+
+def test_batched_hook_reset_drops_the_batch_of_a_stopped_job():
+    batches = []
+
+    def check(outputs, state):
+        batches.append(outputs)
+        return ["completed"] * len(outputs)
+
+    hook = BatchedHook(check, max_batch_size=2, max_wait=60)
+
+    async def stopped_job():
+        task = asyncio.create_task(hook("first", None))
+        await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(stopped_job())
+    assert hook._timer is not None and len(hook._pending) == 1
+
+    # The job manager resets the hook when the next job starts
+    hook.max_wait = 0.01
+    hook.reset()
+
+    async def next_job():
+        return await asyncio.wait_for(hook("second", None), 1)
+
+    assert asyncio.run(next_job()) == "completed"
+    assert batches == [["second"]]
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+
+from starfish.data_factory.constants import PRIORITY
+from starfish.data_factory.utils.errors import InputError
+from starfish.data_factory.utils.input_scheduler import InputScheduler
+
+
+def drain(scheduler):
+    items = []
+    while not scheduler.empty():
+        items.append(scheduler.get_nowait()["name"])
+    return items
+
+
+def fill(scheduler):
+    for name in ("fresh1", "fresh2"):
+        scheduler.put_nowait({"name": name})
+    for name in ("retry1", "retry2"):
+        scheduler.put_nowait({"name": name}, retry=True)
+
+
+def test_schedule_policies():
+    scheduler = InputScheduler("retries_first")
+    fill(scheduler)
+    assert drain(scheduler) == ["retry1", "retry2", "fresh1", "fresh2"]
+
+    scheduler = InputScheduler("fresh_first")
+    fill(scheduler)
+    assert drain(scheduler) == ["fresh1", "fresh2", "retry1", "retry2"]
+
+    scheduler = InputScheduler("interleaved")
+    fill(scheduler)
+    assert drain(scheduler) == ["retry1", "fresh1", "retry2", "fresh2"]
+
+    with pytest.raises(InputError):
+        InputScheduler("random")
+
+
+def test_priority_hint_orders_inputs():
+    scheduler = InputScheduler()
+    scheduler.put_nowait({"name": "low"})
+    scheduler.put_nowait({"name": "high", PRIORITY: 5})
+    scheduler.put_nowait({"name": "default"})
+    assert drain(scheduler) == ["high", "low", "default"]
+
+
+def test_delayed_retry_is_held_until_ready():
+    async def run():
+        scheduler = InputScheduler()
+        scheduler.put_nowait({"name": "retry"}, retry=True, delay=0.05)
+        assert scheduler.empty()
+        assert scheduler.delayed_count() == 1
+        assert 0 < scheduler.next_ready_in() <= 0.05
+        start = time.monotonic()
+        item = await scheduler.get()
+        assert item["name"] == "retry"
+        assert time.monotonic() - start >= 0.04
+        assert scheduler.delayed_count() == 0
+
+    asyncio.run(run())
+
+
+def test_last_wait_counts_from_ready_time():
+    async def run():
+        scheduler = InputScheduler()
+        scheduler.put_nowait({"name": "fresh"})
+        scheduler.put_nowait({"name": "retry"}, retry=True, delay=0.05)
+        await asyncio.sleep(0.06)
+        assert scheduler.get_nowait()["name"] == "retry"
+        assert scheduler.last_wait < 0.05
+        assert scheduler.get_nowait()["name"] == "fresh"
+        assert scheduler.last_wait >= 0.05
+
+    asyncio.run(run())
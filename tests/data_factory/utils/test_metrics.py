@@ -0,0 +1,31 @@
+import pytest
+
+from starfish.data_factory.utils.metrics import METRIC_PHASES, JobMetrics
+
+
+def test_job_metrics_summary():
+    metrics = JobMetrics()
+    assert metrics.summary() == {}
+    assert metrics.format_summary() == ""
+    for i in range(1, 101):
+        metrics.record("user_func", i / 100)
+    with metrics.time("hooks"):
+        pass
+
+    summary = metrics.summary()
+    assert set(summary) == {"user_func", "hooks"}
+    assert set(METRIC_PHASES) >= set(summary)
+    assert summary["user_func"]["count"] == 100
+    assert summary["user_func"]["p50"] == pytest.approx(0.5, rel=0.05)
+    assert summary["user_func"]["p99"] == pytest.approx(0.99, rel=0.05)
+    assert summary["user_func"]["max"] == 1.0
+    assert summary["hooks"]["count"] == 1
+    assert metrics.format_summary().startswith("user_func p50=")
+
+
+def test_job_metrics_time_records_on_error():
+    metrics = JobMetrics()
+    with pytest.raises(ValueError):
+        with metrics.time("storage_save"):
+            raise ValueError("save failed")
+    assert metrics.summary()["storage_save"]["count"] == 1
@@ -0,0 +1,64 @@
+import asyncio
+import datetime
+import os
+import threading
+
+import pytest
+
+from starfish.data_factory.constants import IDX, RECORD_STATUS, STATUS_COMPLETED
+from starfish.data_factory.utils.errors import OutputError
+from starfish.data_factory.utils.output_buffer import OutputBuffer
+
+
+def make_result(i):
+    return {IDX: i, RECORD_STATUS: STATUS_COMPLETED, "output": [{"value": i}], "output_ref": [], "err": [{}]}
+
+
+def test_output_buffer_spills_and_keeps_order():
+    buffer = OutputBuffer(max_in_memory=3)
+    for i in range(10):
+        buffer.put_nowait(make_result(i))
+    assert buffer.qsize() == 10
+    assert buffer.spill_count > 0
+    # No more than max_in_memory results are held in memory
+    assert len(buffer._memory) <= 3
+    assert [result[IDX] for result in buffer] == list(range(10))
+    assert make_result(4) in buffer
+
+
+def test_output_buffer_without_limit_never_spills():
+    buffer = OutputBuffer()
+    for i in range(10):
+        asyncio.run(buffer.put(make_result(i)))
+    assert buffer.spill_count == 0
+    assert [result[IDX] for result in buffer] == list(range(10))
+
+
+def test_output_buffer_close_removes_spill_dir():
+    buffer = OutputBuffer(max_in_memory=1)
+    for i in range(3):
+        buffer.put_nowait(make_result(i))
+    spill_dir = buffer._spill_dir
+    assert os.path.isdir(spill_dir)
+    buffer.close()
+    assert not os.path.exists(spill_dir)
+    assert buffer.empty()
+
+
+def test_output_buffer_spill_keeps_types():
+    buffer = OutputBuffer(max_in_memory=1)
+    results = [
+        {IDX: 0, "output": [{"pair": (1, 2), "day": datetime.date(2024, 1, 31), "by_id": {1: "a", 2: "b"}}]},
+        make_result(1),
+    ]
+    for result in results:
+        buffer.put_nowait(result)
+    assert buffer.spill_count > 0
+    assert list(buffer) == results
+
+
+def test_output_buffer_rejects_unpicklable_output():
+    buffer = OutputBuffer(max_in_memory=1)
+    buffer.put_nowait(make_result(0))
+    with pytest.raises(OutputError):
+        buffer.put_nowait({IDX: 1, "output": [{"lock": threading.Lock()}]})
@@ -0,0 +1,52 @@
+import pytest
+
+from starfish.data_factory.constants import IDX
+from starfish.data_factory.storage.in_memory.in_memory_storage import InMemoryStorage
+from starfish.data_factory.storage.local.local_storage import LocalStorage
+from starfish.data_factory.utils.errors import InputError
+from starfish.data_factory.utils.result_cache import ResultCache, ResultCachePolicy, function_fingerprint, input_fingerprint
+
+
+def test_fingerprints_follow_code_and_input_not_index():
+    def first(city):
+        return [{"answer": city}]
+
+    def same(city):
+        return [{"answer": city}]
+
+    def changed(city):
+        return [{"answer": city.upper()}]
+
+    assert function_fingerprint(first) != function_fingerprint(changed)
+    # The qualified name is part of the fingerprint
+    assert function_fingerprint(first) != function_fingerprint(same)
+    assert input_fingerprint({"city": "Paris", "n": 1, IDX: 0}) == input_fingerprint({IDX: 7, "n": 1, "city": "Paris"})
+    assert input_fingerprint({"city": "Paris"}) != input_fingerprint({"city": "Rome"})
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used(tmp_path):
+    storage = LocalStorage(f"file://{tmp_path}")
+    await storage.setup()
+    # Room for about two outputs of this size
+    cache = ResultCache(storage, input_fingerprint, ResultCachePolicy(version="v1", max_size_mb=250 / (1024 * 1024)))
+    output = [{"answer": "x" * 100}]
+    try:
+        await cache.put({"city": "a"}, output)
+        await cache.put({"city": "b"}, output)
+        assert await cache.get({"city": "a"}) == output
+        await cache.put({"city": "c"}, output)
+        # b was the least recently used
+        assert await cache.get({"city": "b"}) is None
+        assert await cache.get({"city": "a"}) == output
+        assert await cache.get({"city": "c"}) == output
+        assert (cache.hit_count, cache.miss_count) == (3, 1)
+        # Another version of the function does not see these outputs
+        assert await ResultCache(storage, input_fingerprint, ResultCachePolicy(version="v2")).get({"city": "a"}) is None
+    finally:
+        await storage.close()
+
+
+def test_cache_requires_capable_storage():
+    with pytest.raises(InputError):
+        ResultCache(InMemoryStorage(), input_fingerprint, ResultCachePolicy())
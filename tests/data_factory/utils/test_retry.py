@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from starfish.data_factory.task_runner import TaskRunner
+from starfish.data_factory.utils.errors import OutputError, TimeoutErrorAsyncio
+from starfish.data_factory.utils.retry import RetryPolicy, categorize_error, classify_error, get_retry_after
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class AuthenticationError(Exception):
+    pass
+
+
+def wrapped(error):
+    """Raise `error` wrapped in a RuntimeError as call_chat_model does, and return the outer error."""
+    try:
+        try:
+            raise error
+        except Exception as e:
+            raise RuntimeError(f"Error executing model: {e}") from e
+    except RuntimeError as outer:
+        return outer
+
+
+def test_classify_error():
+    assert classify_error(TimeoutErrorAsyncio())
+    assert classify_error(HTTPError(429))
+    assert classify_error(HTTPError(503))
+    assert not classify_error(HTTPError(400))
+    assert not classify_error(HTTPError(401))
+    # The cause of a wrapped error decides
+    assert not classify_error(wrapped(AuthenticationError("invalid api key")))
+    assert classify_error(wrapped(HTTPError(500)))
+    # Unknown errors are retried
+    assert classify_error(ValueError("flaky"))
+
+
+def test_categorize_error():
+    assert categorize_error(TimeoutErrorAsyncio()) == "timeout"
+    assert categorize_error(HTTPError(429)) == "quota"
+    assert categorize_error(HTTPError(503)) == "server"
+    assert categorize_error(HTTPError(404)) == "bad_request"
+    assert categorize_error(wrapped(AuthenticationError("invalid api key"))) == "auth"
+    assert categorize_error(OutputError("bad output")) == "contract"
+    assert categorize_error(ValueError("flaky")) == "valueerror"
+
+
+def test_backoff_grows_exponentially_and_honors_retry_after():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=False)
+    assert [policy.get_delay(attempt) for attempt in range(1, 5)] == [1.0, 2.0, 4.0, 5.0]
+    jittered = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    assert all(0 <= jittered.get_delay(3) <= 4.0 for _ in range(20))
+    error = wrapped(HTTPError(429, headers={"retry-after": "3"}))
+    assert get_retry_after(error) == 3.0
+    assert policy.get_delay(1, error) == 3.0
+
+
+def test_task_runner_retries_timeouts_but_not_auth_errors():
+    policy = RetryPolicy(max_retries=2, base_delay=0.01, jitter=False)
+    calls = {"timeout": 0, "auth": 0}
+
+    async def slow():
+        calls["timeout"] += 1
+        await asyncio.sleep(1)
+
+    async def unauthorized():
+        calls["auth"] += 1
+        raise AuthenticationError("invalid api key")
+
+    runner = TaskRunner(timeout=0.01, retry_policy=policy)
+    with pytest.raises(TimeoutErrorAsyncio):
+        asyncio.run(runner.run_task(slow, {}, 0))
+    with pytest.raises(AuthenticationError):
+        asyncio.run(runner.run_task(unauthorized, {}, 0))
+    assert calls == {"timeout": 3, "auth": 1}
@@ -0,0 +1,81 @@
+import asyncio
+import random
+import threading
+
+import pytest
+
+from starfish.data_factory.utils.state import MutableSharedState
+
+
+def test_concurrent_updates_are_not_lost():
+    state = MutableSharedState()
+
+    def work(worker):
+        for i in range(1000):
+            state.incr("count")
+            state.append("items", (worker, i))
+            state.append("recent", i, max_len=10)
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state.get("count") == 8000
+    assert len(state.get_list("items")) == 8000
+    assert len(state.get("recent")) == 10
+
+
+def test_setdefault_reservoir_and_type_check():
+    state = MutableSharedState({"name": "job"})
+    assert state.setdefault("topics", {}) == {}
+    assert state.setdefault("topics", {"ignored": 1}) == {}
+    for i in range(1000):
+        state.add_to_reservoir("sample", i, size=20)
+    sample = state.get_list("sample")
+    assert len(sample) == 20 and len(set(sample)) == 20
+    # A uniform sample reaches past the first values offered
+    assert max(sample) >= 20
+    with pytest.raises(TypeError):
+        state.append("name", "value")
+
+
+def test_reservoir_stays_uniform_when_restored():
+    random.seed(0)
+    state = MutableSharedState()
+    for i in range(1000):
+        state.add_to_reservoir("sample", i, size=20)
+    assert state.reservoir_counts() == {"sample": 1000}
+
+    # As a resumed job restores it from a checkpoint
+    restored = MutableSharedState(state.snapshot(), reservoir_counts=state.reservoir_counts())
+    for i in range(1000, 2000):
+        restored.add_to_reservoir("sample", i, size=20)
+    assert restored.reservoir_counts() == {"sample": 2000}
+    # About half of the sample comes from each half of the values, not nearly all from the last one
+    assert 4 <= sum(1 for value in restored.get_list("sample") if value < 1000) <= 16
+
+
+@pytest.mark.asyncio
+async def test_alock_serializes_updates_across_awaits():
+    state = MutableSharedState({"value": 0})
+
+    async def update():
+        async with state.alock("value"):
+            value = state.get("value")
+            await asyncio.sleep(0)
+            state.set("value", value + 1)
+
+    await asyncio.gather(*(update() for _ in range(50)))
+    assert state.get("value") == 50
+
+
+def test_snapshot_copies_containers():
+    state = MutableSharedState()
+    state.append("items", 1)
+    state.set("name", "job")
+    snapshot = state.snapshot()
+    state.append("items", 2)
+    # The snapshot does not share the lists of the state
+    assert snapshot == {"items": [1], "name": "job"}
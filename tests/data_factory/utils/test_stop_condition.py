@@ -0,0 +1,33 @@
+from starfish.data_factory.constants import STATUS_COMPLETED, STATUS_DUPLICATE, STATUS_FAILED, STATUS_FILTERED
+from starfish.data_factory.utils.stop_condition import StopConditionTracker
+
+
+def test_stop_condition_needs_full_window_of_not_completed():
+    tracker = StopConditionTracker(window_size=3)
+    tracker.record(STATUS_COMPLETED)
+    tracker.record(STATUS_COMPLETED)
+    tracker.record(STATUS_FAILED)
+    # Only the latest status is not completed, the previous ones must not be ignored
+    assert not tracker.is_consecutive_not_completed()
+
+    tracker.record(STATUS_DUPLICATE)
+    assert not tracker.is_consecutive_not_completed()
+    tracker.record(STATUS_FILTERED)
+    assert tracker.is_consecutive_not_completed()
+
+
+def test_stop_condition_resets_after_completion():
+    tracker = StopConditionTracker(window_size=2)
+    for status in [STATUS_FAILED, STATUS_FAILED, STATUS_COMPLETED, STATUS_FAILED]:
+        tracker.record(status)
+    assert not tracker.is_consecutive_not_completed()
+    tracker.record(STATUS_FAILED)
+    assert tracker.is_consecutive_not_completed()
+    assert tracker.total_count == 5
+
+
+def test_stop_condition_disabled_for_non_positive_window():
+    tracker = StopConditionTracker(window_size=0)
+    for _ in range(10):
+        tracker.record(STATUS_FAILED)
+    assert not tracker.is_consecutive_not_completed()
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+
+from starfish.llm.proxy import litellm_adapter
+from starfish.llm.proxy.rate_limiter import (
+    RateLimiter,
+    clear_rate_limits,
+    get_rate_limiter,
+    get_rate_limits,
+    set_rate_limit,
+    share_rate_limits,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    clear_rate_limits()
+    yield
+    clear_rate_limits()
+
+
+def test_requests_per_minute_delays_calls_beyond_the_burst():
+    limiter = RateLimiter(requests_per_minute=60)
+    delays = [limiter.reserve() for _ in range(62)]
+    assert delays[:60] == [0.0] * 60
+    # One request per second once the burst is used up, in call order
+    assert delays[60] == pytest.approx(1.0, abs=0.05)
+    assert delays[61] == pytest.approx(2.0, abs=0.05)
+
+
+def test_tokens_are_reconciled_with_actual_usage():
+    limiter = RateLimiter(tokens_per_minute=600)
+    assert limiter.reserve(600) == 0.0
+    assert limiter.reserve(10) == pytest.approx(1.0, abs=0.05)
+    # The first call used 100 tokens only: 500 are given back
+    limiter.reconcile(600, 100)
+    assert limiter.reserve(100) == 0.0
+
+
+def test_registry_resolves_model_then_provider():
+    provider_limiter = set_rate_limit("openai", requests_per_minute=100)
+    model_limiter = set_rate_limit("openai/gpt-4o-mini", tokens_per_minute=1000)
+    assert get_rate_limiter("openai/gpt-4o-mini") is model_limiter
+    assert get_rate_limiter("openai/gpt-4o") is provider_limiter
+    assert get_rate_limiter("anthropic/claude-3") is None
+    set_rate_limit("openai")
+    assert get_rate_limiter("openai/gpt-4o") is None
+
+
+def test_registry_uses_provider_config():
+    config = {"api_base": "$HYPERBOLIC_API_BASE", "rate_limit": {"requests_per_minute": 10}}
+    limiter = get_rate_limiter("hyperbolic/llama", config)
+    assert limiter.requests_per_minute == 10
+    # Shared by every model of the provider
+    assert get_rate_limiter("hyperbolic/qwen", config) is limiter
+
+
+def test_call_chat_model_waits_for_rate_limit(monkeypatch):
+    calls = []
+
+    async def fake_route(model_name, model_prefix, messages, model_kwargs):
+        calls.append(time.monotonic())
+        return {"usage": {"total_tokens": 5}}
+
+    monkeypatch.setattr(litellm_adapter, "_route_chat_model", fake_route)
+    set_rate_limit("test", requests_per_minute=120)
+    limiter = get_rate_limiter("test/model")
+    limiter._requests.level = 0
+
+    async def run():
+        messages = [{"role": "user", "content": "hi"}]
+        return await asyncio.gather(*(litellm_adapter.call_chat_model("test/model", messages) for _ in range(2)))
+
+    start = time.monotonic()
+    responses = asyncio.run(run())
+    assert len(responses) == 2
+    # Two requests per second: the second call waits about one second
+    assert max(calls) - start >= 0.9
+
+
+def test_cancelled_waiters_give_back_their_reservation():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000)
+    for _ in range(60):
+        limiter.reserve(100)
+
+    async def run():
+        waiters = [asyncio.wait_for(limiter.acquire(100), timeout=0.2) for _ in range(10)]
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+
+    asyncio.run(run())
+    # Only the next request is waited for, not the ten that were cancelled
+    assert limiter.reserve(100) <= 1.0
+
+
+def test_worker_processes_share_the_limits_of_the_parent():
+    set_rate_limit("openai", requests_per_minute=100, tokens_per_minute=10_000)
+    limits = get_rate_limits()
+    assert limits == {"openai": {"requests_per_minute": 100, "tokens_per_minute": 10_000}}
+    try:
+        share_rate_limits(limits, 4)
+        limiter = get_rate_limiter("openai/gpt-4o")
+        assert (limiter.requests_per_minute, limiter.tokens_per_minute) == (25, 2_500)
+        # Limits set or configured in the worker are divided too
+        assert set_rate_limit("anthropic", requests_per_minute=40).requests_per_minute == 10
+        assert get_rate_limiter("hyperbolic/llama", {"rate_limit": {"requests_per_minute": 8}}).requests_per_minute == 2
+    finally:
+        share_rate_limits({}, 1)
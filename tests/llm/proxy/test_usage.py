@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from starfish.llm.proxy.litellm_adapter import call_chat_model
+from starfish.llm.proxy.usage import Usage, is_tracking_usage, track_usage
+
+MESSAGES = [{"role": "user", "content": "hello there"}]
+# LiteLLM returns this text without calling the provider, with a usage of 10 prompt and 20 completion tokens
+MOCK_KWARGS = {"mock_response": "hi, a response"}
+
+
+@pytest.mark.asyncio
+async def test_track_usage_accounts_calls_and_cost():
+    assert not is_tracking_usage()
+    with track_usage() as outer:
+        await call_chat_model("openai/gpt-4o-mini", MESSAGES, MOCK_KWARGS)
+        with track_usage() as inner:
+            # Calls of child tasks count for the block that started them
+            await asyncio.gather(*[call_chat_model("openai/gpt-4o-mini", MESSAGES, MOCK_KWARGS) for _ in range(2)])
+    assert inner.calls == 2 and inner.total_tokens == 60
+    assert outer.calls == 3 and outer.prompt_tokens == 30 and outer.completion_tokens == 60
+    assert outer.cost > 0
+    # Outside of a block, calls are not accounted
+    await call_chat_model("openai/gpt-4o-mini", MESSAGES, MOCK_KWARGS)
+    assert outer.calls == 3
+
+
+def test_usage_split_adds_up():
+    shares = Usage(calls=1, prompt_tokens=10, completion_tokens=5, total_tokens=15, cost=0.3).split(4)
+    assert [share.total_tokens for share in shares] == [4, 4, 4, 3]
+    assert sum(share.calls for share in shares) == 1
+    assert sum(share.cost for share in shares) == pytest.approx(0.3)
+    assert Usage.from_dict(shares[0].to_dict()) == shares[0]